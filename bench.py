@@ -0,0 +1,385 @@
+"""
+Benchmarks for the rig and mesh build stages along the axes that grow with
+the work: bone count (replicated skeletons), cylinder segment count,
+subdivision level, clip length and number of characters.
+
+Runs inside Blender:
+
+    blender -b --python bench.py -- --out bench.json
+
+or headless on any machine with NumPy, in which case bpy_stub.py stands in
+for bpy (timings then measure the scripts' Python-side cost only, and stages
+that need Blender's evaluation, like subdivision, are reported as skipped):
+
+    python bench.py --out bench.json --baseline previous.json
+
+Results are written as JSON. With --baseline, every (stage, axis, value)
+found in both files is compared on its best time and the run exits with
+status 1 if any of them got slower than --threshold times the baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Make the sibling modules importable when run from Blender's text editor or --python.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import bpy
+    STUB = False
+except ImportError:
+    import bpy_stub
+    bpy = bpy_stub.install()
+    STUB = True
+
+import body
+import cache
+import crowd
+import gait
+import mesh
+import rig
+import skeleton
+import weights
+
+# Values measured along each axis; QUICK_AXES is used with --quick
+AXES = {
+    "bones": (1, 4, 16, 64),
+    "segments": (8, 16, 32, 64, 128),
+    "subdivision": (0, 1, 2, 3),
+    "clip_frames": (24, 240, 2400),
+    "characters": (1, 10, 100, 500),
+}
+QUICK_AXES = {
+    "bones": (1, 4),
+    "segments": (8, 32),
+    "subdivision": (0, 1),
+    "clip_frames": (24, 240),
+    "characters": (1, 10),
+}
+
+# Per-key keyframe_insert is only timed up to this clip length
+LEGACY_KEYING_MAX_FRAMES = 240
+
+# A stage counts as regressed when it is this many times slower than the baseline
+DEFAULT_THRESHOLD = 1.25
+
+# Stages faster than this (seconds) in both runs are too noisy to compare
+NOISE_FLOOR = 1e-3
+
+
+# -------------------------------
+# Scene and input helpers
+# -------------------------------
+def reset_scene():
+    """Starts from an empty scene."""
+    if STUB:
+        bpy.reset()
+    else:
+        bpy.ops.wm.read_factory_settings(use_empty=True)
+
+
+def replicated_skeleton(copies, spacing=1.0):
+    """
+    Returns (bones, ik_constraints) holding `copies` side-by-side copies of
+    the biped skeleton. Copy 0 keeps the original names, so the body parts
+    and clips still apply to it; copy k gets a '_k' suffix on every bone.
+    """
+    bones, constraints = [], []
+    for k in range(copies):
+        suffix = f"_{k}" if k else ""
+        offset = (k * spacing, 0.0, 0.0)
+        for bone in skeleton.BONES:
+            bones.append(bone._replace(
+                name=bone.name + suffix,
+                head=tuple(a + b for a, b in zip(bone.head, offset)),
+                tail=tuple(a + b for a, b in zip(bone.tail, offset)),
+                parent=bone.parent + suffix if bone.parent else None))
+        for spec in skeleton.IK_CONSTRAINTS:
+            constraints.append(spec._replace(
+                name=spec.name + suffix, owner=spec.owner + suffix,
+                target=spec.target + suffix, pole=spec.pole + suffix))
+    return bones, constraints
+
+
+def _build_character(segments=body.CYLINDER_SEGMENTS):
+    """Fresh scene with the rig and a weighted body mesh; returns (rig_obj, mesh_obj)."""
+    reset_scene()
+    rig_obj = rig.build_armature()
+    geometry, skin_weights = _body_arrays(rig_obj, segments)
+    mesh_obj = mesh.create_mesh_from_arrays("AlignedHumanMesh", geometry)
+    mesh.parent_to_rig(mesh_obj, rig_obj, geometry, skin_weights=skin_weights)
+    return rig_obj, mesh_obj
+
+
+def _body_arrays(rig_obj, segments):
+    positions = mesh.bone_positions(rig_obj)
+    parents, deform = mesh.bone_hierarchy(rig_obj)
+    geometry = body.build_body(positions, segments=segments)
+    return geometry, weights.compute_weights(geometry, positions, parents, deform)
+
+
+# -------------------------------
+# Measurement
+# -------------------------------
+def measure(run, setup=None, repeats=3):
+    """
+    Times run(state) `repeats` times, each after a fresh setup() (not timed).
+    Returns the list of wall-clock durations in seconds.
+    """
+    durations = []
+    for _ in range(repeats):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        run(state)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def record(results, stage, axis, value, durations, **extra):
+    entry = {
+        "stage": stage,
+        "axis": axis,
+        "value": value,
+        "best": min(durations),
+        "median": statistics.median(durations),
+        "repeats": len(durations),
+    }
+    entry.update(extra)
+    results.append(entry)
+    print(f"{stage:<32} {axis}={value:<6} best {entry['best'] * 1000:10.2f} ms")
+    return entry
+
+
+def skip(results, stage, axis, value, reason):
+    results.append({"stage": stage, "axis": axis, "value": value, "skipped": reason})
+    print(f"{stage:<32} {axis}={value:<6} skipped ({reason})")
+
+
+# -------------------------------
+# Benchmarks, one per axis
+# -------------------------------
+def bench_bones(results, values, repeats):
+    """rig.py stages against the number of bones."""
+    for copies in values:
+        bones, constraints = replicated_skeleton(copies)
+        count = len(bones)
+
+        record(results, "rig.build_armature", "bones", count, measure(
+            lambda _: rig.build_armature(bones, constraints), reset_scene, repeats))
+
+        def built():
+            reset_scene()
+            return rig.build_armature(bones, constraints)
+
+        record(results, "rig.update_armature (no change)", "bones", count, measure(
+            lambda rig_obj: rig.update_armature(rig_obj, bones, constraints), built, repeats))
+
+        moved = [bone._replace(head=tuple(c + 0.01 for c in bone.head),
+                               tail=tuple(c + 0.01 for c in bone.tail)) for bone in bones]
+        record(results, "rig.update_armature (all moved)", "bones", count, measure(
+            lambda rig_obj: rig.update_armature(rig_obj, moved, constraints), built, repeats))
+
+        record(results, "mesh.bone_positions", "bones", count, measure(
+            mesh.bone_positions, built, repeats))
+
+
+def bench_segments(results, values, repeats):
+    """mesh.py stages against the cylinder segment count."""
+    reset_scene()
+    rig_obj = rig.build_armature()
+    positions = mesh.bone_positions(rig_obj)
+    parents, deform = mesh.bone_hierarchy(rig_obj)
+    for segments in values:
+        geometry = body.build_body(positions, segments=segments)
+        size = {"vertices": len(geometry["vertices"]), "faces": len(geometry["loop_starts"])}
+
+        record(results, "body.build_body", "segments", segments, measure(
+            lambda _: body.build_body(positions, segments=segments), repeats=repeats), **size)
+        record(results, "body.build_body (surface)", "segments", segments, measure(
+            lambda _: body.build_body(positions, segments=segments, mode='SURFACE'), repeats=repeats))
+        record(results, "weights.compute_weights", "segments", segments, measure(
+            lambda _: weights.compute_weights(geometry, positions, parents, deform), repeats=repeats), **size)
+        skin_weights = weights.compute_weights(geometry, positions, parents, deform)
+
+        def fresh_rig():
+            reset_scene()
+            return rig.build_armature()
+
+        record(results, "mesh.create_mesh_from_arrays", "segments", segments, measure(
+            lambda _: mesh.create_mesh_from_arrays("AlignedHumanMesh", geometry), fresh_rig, repeats), **size)
+
+        def unparented():
+            rig_obj = fresh_rig()
+            return rig_obj, mesh.create_mesh_from_arrays("AlignedHumanMesh", geometry)
+
+        record(results, "mesh.parent_to_rig", "segments", segments, measure(
+            lambda state: mesh.parent_to_rig(state[1], state[0], geometry, skin_weights=skin_weights),
+            unparented, repeats), **size)
+
+        with tempfile.TemporaryDirectory() as directory:
+            store = cache.ArtifactCache(directory)
+            cache.load_or_build(positions, parents, deform, segments=segments, cache=store)
+            record(results, "cache.load_or_build (hit)", "segments", segments, measure(
+                lambda _: cache.load_or_build(positions, parents, deform, segments=segments, cache=store),
+                repeats=repeats), **size)
+
+
+def bench_subdivision(results, values, repeats):
+    """Evaluating the Armature + Subsurf modifier stack against the subdivision level."""
+    if STUB:
+        for levels in values:
+            skip(results, "subsurf evaluation", "subdivision", levels, "needs Blender")
+        return
+    rig_obj, mesh_obj = _build_character()
+    subsurf = mesh_obj.modifiers.new("Subsurf", type='SUBSURF')
+    for levels in values:
+        subsurf.levels = levels
+
+        def evaluate(_):
+            depsgraph = bpy.context.evaluated_depsgraph_get()
+            depsgraph.update()
+            evaluated = mesh_obj.evaluated_get(depsgraph)
+            evaluated.to_mesh()
+            evaluated.to_mesh_clear()
+
+        def invalidate():
+            mesh_obj.data.update()
+
+        record(results, "subsurf evaluation", "subdivision", levels,
+               measure(evaluate, invalidate, repeats))
+
+
+def bench_clip_frames(results, values, repeats):
+    """Keyframing against the clip length, in bulk and (for short clips) per key."""
+    for frames in values:
+        frame_numbers = np.arange(1, frames + 1, dtype=np.float32)
+        clip = gait.generate(gait.WALK, frame_numbers)[0]
+
+        def fresh_rig():
+            reset_scene()
+            return rig.build_armature()
+
+        record(results, "mesh.write_clip_fcurves", "clip_frames", frames, measure(
+            lambda rig_obj: mesh.write_clip_fcurves(rig_obj, gait.GAIT_BONES, frame_numbers, clip),
+            fresh_rig, repeats), keys=int(clip.size))
+
+        if frames > LEGACY_KEYING_MAX_FRAMES:
+            skip(results, "mesh.set_bone_rotation (per key)", "clip_frames", frames,
+                 f"longer than {LEGACY_KEYING_MAX_FRAMES} frames")
+            continue
+
+        def per_key(rig_obj):
+            pose_bones = rig_obj.pose.bones
+            for f, frame in enumerate(frame_numbers):
+                for b, name in enumerate(gait.GAIT_BONES):
+                    mesh.set_bone_rotation(pose_bones, name, frame, clip[f, b])
+
+        record(results, "mesh.set_bone_rotation (per key)", "clip_frames", frames, measure(
+            per_key, fresh_rig, repeats), keys=int(clip.size))
+
+
+def bench_characters(results, values, repeats):
+    """crowd.py against the number of characters."""
+    for count in values:
+        record(results, "crowd.create_crowd", "characters", count, measure(
+            lambda state: crowd.create_crowd(count, *state, seed=0),
+            _build_character, repeats))
+
+
+BENCHMARKS = {
+    "bones": bench_bones,
+    "segments": bench_segments,
+    "subdivision": bench_subdivision,
+    "clip_frames": bench_clip_frames,
+    "characters": bench_characters,
+}
+
+
+# -------------------------------
+# Reports
+# -------------------------------
+def environment():
+    return {
+        "backend": "bpy_stub" if STUB else "blender",
+        "blender": getattr(bpy.app, "version_string", None),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def run(axes=AXES, repeats=3):
+    """Runs the benchmarks for the given {axis: values}; returns the report dict."""
+    results = []
+    for axis, values in axes.items():
+        BENCHMARKS[axis](results, values, repeats)
+    return {"environment": environment(), "results": results}
+
+
+def compare(report, baseline, threshold=DEFAULT_THRESHOLD, floor=NOISE_FLOOR):
+    """
+    Compares a report with a baseline report. Returns a list of
+    (stage, axis, value, baseline best, current best, ratio) for every stage
+    that got slower than threshold times its baseline.
+    """
+    def timed(entries):
+        return {(e["stage"], e["axis"], e["value"]): e["best"] for e in entries if "best" in e}
+
+    previous = timed(baseline["results"])
+    regressions = []
+    for key, best in timed(report["results"]).items():
+        old = previous.get(key)
+        if old is None or max(old, best) < floor:
+            continue
+        ratio = best / max(old, 1e-12)
+        if ratio > threshold:
+            regressions.append(key + (old, best, ratio))
+    return regressions
+
+
+def parse_args(argv):
+    # Blender passes its own arguments; the script's come after '--'
+    if "--" in argv:
+        argv = argv[argv.index("--") + 1:]
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", default="bench.json", help="where to write the JSON report")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown ratio counted as a regression")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--quick", action="store_true", help="smaller values on every axis")
+    parser.add_argument("--axes", nargs="+", choices=sorted(AXES), help="only run these axes")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    axes = QUICK_AXES if args.quick else AXES
+    if args.axes:
+        axes = {axis: axes[axis] for axis in args.axes}
+
+    report = run(axes, args.repeats)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Benchmark report written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["environment"].get("backend") != report["environment"]["backend"]:
+            print("Warning: baseline was recorded with a different backend")
+        regressions = compare(report, baseline, args.threshold)
+        for stage, axis, value, old, new, ratio in regressions:
+            print(f"REGRESSION {stage} {axis}={value}: {old * 1000:.2f} ms -> {new * 1000:.2f} ms ({ratio:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline")
@@ -0,0 +1,608 @@
+"""
+Body mesh geometry for the biped, computed with NumPy only (no bpy).
+
+In 'PARTS' mode every limb is a capped cylinder between two bone end points
+and the head is a UV sphere, matching the primitives mesh.py used to add one
+by one. In 'SURFACE' mode the body is one closed surface: the parts that
+continue each other (upper arm and forearm, thigh, shin and foot) are swept
+as one tube per chain that shares a mitred ring at every joint, the legs
+branch off the torso's bottom ring, the arms leave through holes cut in its
+side and the head continues it above a neck ring, so no caps, interior
+faces or overlapping shells are left inside the body; ring count and ring
+resolution follow each part's length and radius. All parts are generated
+directly in rig space and concatenated into a single set of vertex and
+polygon arrays that can be written to one mesh datablock in bulk.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+# Defaults of bpy.ops.mesh.primitive_cylinder_add / primitive_uv_sphere_add
+CYLINDER_SEGMENTS = 32
+SPHERE_SEGMENTS = 32
+SPHERE_RINGS = 16
+
+# 'PARTS': one closed primitive per part, 'SURFACE': one closed surface joining them
+BODY_MODES = ('PARTS', 'SURFACE')
+
+# 'SURFACE' mode density: target edge length around the tubes and spacing of
+# the rings along them, in rig units
+EDGE_LENGTH = 0.06
+RING_SPACING = 0.25
+MIN_SEGMENTS = 12
+
+# 'SURFACE' mode: the head joins the trunk at the ring where its radius is this
+# fraction of the head radius
+NECK_RATIO = 0.5
+
+# name:   name of the mesh part
+# start:  (bone name, 'head' or 'tail') where the part starts
+# end:    (bone name, 'head' or 'tail') where the part ends
+# radius: cylinder or sphere radius
+# shape:  'CYLINDER' spans start..end, 'SPHERE' is centred between start and end
+Part = namedtuple("Part", "name start end radius shape")
+
+BODY_PARTS = [
+    # Torso: from Pelvis head to Chest tail
+    Part("Torso", ("Pelvis", "head"), ("Chest", "tail"), 0.2, 'CYLINDER'),
+    # Head: sphere at the midpoint of the Head bone (using Neck tail to Head tail)
+    Part("Head", ("Neck", "tail"), ("Head", "tail"), 0.2, 'SPHERE'),
+    # Arms: Upper Arm and Forearm
+    Part("Left_Upper_Arm_Mesh", ("Left_Upper_Arm", "head"), ("Left_Upper_Arm", "tail"), 0.08, 'CYLINDER'),
+    Part("Left_Forearm_Mesh", ("Left_Forearm", "head"), ("Left_Forearm", "tail"), 0.07, 'CYLINDER'),
+    Part("Right_Upper_Arm_Mesh", ("Right_Upper_Arm", "head"), ("Right_Upper_Arm", "tail"), 0.08, 'CYLINDER'),
+    Part("Right_Forearm_Mesh", ("Right_Forearm", "head"), ("Right_Forearm", "tail"), 0.07, 'CYLINDER'),
+    # Legs: Thigh and Shin
+    Part("Left_Thigh_Mesh", ("Left_Thigh", "head"), ("Left_Thigh", "tail"), 0.1, 'CYLINDER'),
+    Part("Left_Shin_Mesh", ("Left_Shin", "head"), ("Left_Shin", "tail"), 0.09, 'CYLINDER'),
+    Part("Right_Thigh_Mesh", ("Right_Thigh", "head"), ("Right_Thigh", "tail"), 0.1, 'CYLINDER'),
+    Part("Right_Shin_Mesh", ("Right_Shin", "head"), ("Right_Shin", "tail"), 0.09, 'CYLINDER'),
+    # Feet (only built if the rig includes them)
+    Part("Left_Foot_Mesh", ("Left_Foot", "head"), ("Left_Foot", "tail"), 0.08, 'CYLINDER'),
+    Part("Right_Foot_Mesh", ("Right_Foot", "head"), ("Right_Foot", "tail"), 0.08, 'CYLINDER'),
+]
+
+
+def rotation_from_z(directions):
+    """
+    Returns (N, 3, 3) rotation matrices taking the +Z axis onto each of the
+    (N, 3) directions along the shortest arc, like
+    Vector((0, 0, 1)).rotation_difference(direction). Directions opposite to
+    +Z get a half turn around X.
+    """
+    d = np.asarray(directions, dtype=np.float64)
+    d = d / np.linalg.norm(d, axis=-1, keepdims=True)
+    # Rodrigues' formula for the rotation from z to d: axis z x d, cos = d.z
+    axis = np.stack([-d[:, 1], d[:, 0], np.zeros(len(d))], axis=-1)
+    cos = d[:, 2]
+    k = np.zeros((len(d), 3, 3))
+    k[:, 0, 2] = axis[:, 1]
+    k[:, 1, 2] = -axis[:, 0]
+    k[:, 2, 0] = -axis[:, 1]
+    k[:, 2, 1] = axis[:, 0]
+    opposite = cos < -1.0 + 1e-9
+    scale = np.where(opposite, 0.0, 1.0 / np.where(opposite, 1.0, 1.0 + cos))
+    rot = np.eye(3) + k + (k @ k) * scale[:, None, None]
+    rot[opposite] = np.diag([1.0, -1.0, -1.0])
+    return rot
+
+
+def cylinders_between_points(starts, ends, radii, segments=CYLINDER_SEGMENTS):
+    """
+    Builds capped cylinders spanning each start -> end pair, all at once.
+    Returns (vertices (N * 2 * segments, 3), polygons) where polygons is a
+    list of per-polygon vertex index arrays grouped as (quads, caps):
+    quads (N * segments, 4) for the sides and caps (N * 2, segments) for the
+    bottom and top n-gons.
+    """
+    starts = np.asarray(starts, dtype=np.float64).reshape(-1, 3)
+    ends = np.asarray(ends, dtype=np.float64).reshape(-1, 3)
+    radii = np.broadcast_to(np.asarray(radii, dtype=np.float64), (len(starts),))
+    count = len(starts)
+
+    angles = 2.0 * np.pi * np.arange(segments) / segments
+    ring = np.stack([np.cos(angles), np.sin(angles), np.zeros(segments)], axis=-1)
+    rot = rotation_from_z(ends - starts)
+
+    # (N, segments, 3) ring offsets in rig space, then bottom ring at start, top at end
+    offsets = np.einsum('nij,sj->nsi', rot, ring) * radii[:, None, None]
+    verts = np.stack([starts[:, None, :] + offsets, ends[:, None, :] + offsets], axis=1)
+
+    base = (np.arange(count) * 2 * segments)[:, None]
+    s = np.arange(segments)
+    s_next = (s + 1) % segments
+    quads = np.stack([s, s_next, segments + s_next, segments + s], axis=-1)
+    quads = (quads[None] + base[:, :, None]).reshape(-1, 4)
+    bottom = base + s[::-1]
+    top = base + segments + s
+    caps = np.stack([bottom, top], axis=1).reshape(-1, segments)
+    return verts.reshape(-1, 3), (quads, caps)
+
+
+def uv_spheres(centers, radii, segments=SPHERE_SEGMENTS, rings=SPHERE_RINGS):
+    """
+    Builds UV spheres like primitive_uv_sphere_add, all at once.
+    Returns (vertices (N * V, 3), (quads, tris)).
+    """
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+    radii = np.broadcast_to(np.asarray(radii, dtype=np.float64), (len(centers),))
+    count = len(centers)
+
+    theta = np.pi * np.arange(1, rings) / rings
+    phi = 2.0 * np.pi * np.arange(segments) / segments
+    sin_t = np.sin(theta)[:, None]
+    body = np.stack([
+        sin_t * np.cos(phi)[None, :],
+        sin_t * np.sin(phi)[None, :],
+        np.broadcast_to(np.cos(theta)[:, None], (rings - 1, segments)),
+    ], axis=-1).reshape(-1, 3)
+    unit = np.concatenate([[[0.0, 0.0, 1.0]], body, [[0.0, 0.0, -1.0]]])
+    per_sphere = len(unit)
+
+    verts = centers[:, None, :] + unit[None] * radii[:, None, None]
+
+    s = np.arange(segments)
+    s_next = (s + 1) % segments
+    row = 1 + np.arange(rings - 2)[:, None] * segments
+    quads = np.stack([row + s, row + segments + s, row + segments + s_next, row + s_next], axis=-1).reshape(-1, 4)
+    last = 1 + (rings - 2) * segments
+    top = np.stack([np.zeros(segments, dtype=np.int64), 1 + s, 1 + s_next], axis=-1)
+    bottom = np.stack([np.full(segments, per_sphere - 1), last + s_next, last + s], axis=-1)
+    tris = np.concatenate([top, bottom])
+
+    base = (np.arange(count) * per_sphere)[:, None, None]
+    quads = (quads[None] + base).reshape(-1, 4)
+    tris = (tris[None] + base).reshape(-1, 3)
+    return verts.reshape(-1, 3), (quads, tris)
+
+
+def _part_points(parts, positions):
+    """Resolves part start/end points, skipping parts whose bones are missing."""
+    def point(ref):
+        bone_name, end = ref
+        head, tail = positions[bone_name]
+        return np.asarray(head if end == "head" else tail, dtype=np.float64)
+
+    resolved = []
+    for part in parts:
+        if part.start[0] not in positions or part.end[0] not in positions:
+            continue
+        resolved.append((part, point(part.start), point(part.end)))
+    return resolved
+
+
+def _ring_resolution(radius, edge_length, segments, min_segments=MIN_SEGMENTS):
+    """Segments around a ring of the given radius: a multiple of 4 in [min_segments, segments]."""
+    around = int(np.ceil(2.0 * np.pi * radius / edge_length / 4.0)) * 4
+    return int(np.clip(around, min_segments, max(segments, min_segments)))
+
+
+def swept_tube(points, radii, segments, start=None):
+    """
+    Builds one capped tube through the ring centres `points` (R, 3) with the
+    given ring radii (R,). Interior rings lie in the plane bisecting the two
+    segments that meet there and are widened along the bend, so both segments
+    keep their radius through the joint. Ring frames are carried along the
+    tube from one ring to the next, so it does not twist; `start` is the
+    direction of the first vertex of the first ring (any by default).
+    Returns (vertices (R * segments, 3), (quads, caps)) like cylinders_between_points().
+    """
+    points = np.asarray(points, dtype=np.float64)
+    radii = np.asarray(radii, dtype=np.float64)
+    count = len(points)
+    d = np.diff(points, axis=0)
+    d /= np.linalg.norm(d, axis=-1, keepdims=True)
+
+    tangents = np.concatenate([d[:1], d[:-1] + d[1:], d[-1:]])
+    folded = np.linalg.norm(tangents, axis=-1) < 1e-6
+    tangents[folded] = np.concatenate([d[:1], d])[folded]
+    tangents /= np.linalg.norm(tangents, axis=-1, keepdims=True)
+
+    angles = 2.0 * np.pi * np.arange(segments) / segments
+    u = rotation_from_z(tangents[:1])[0][:, 0]
+    if start is not None and np.linalg.norm(np.cross(start, tangents[0])) > 1e-9:
+        u = np.asarray(start, dtype=np.float64)
+    verts = np.empty((count, segments, 3))
+    for i, (center, t) in enumerate(zip(points, tangents)):
+        u = u - np.dot(u, t) * t
+        u /= np.linalg.norm(u)
+        v = np.cross(t, u)
+        offsets = (np.cos(angles)[:, None] * u + np.sin(angles)[:, None] * v) * radii[i]
+        if 0 < i < count - 1:
+            # Mitre: stretch along the bend by 1 / cos(half the bend angle)
+            cos_half = max(np.dot(t, d[i]), 0.5)
+            bend = d[i] - np.dot(d[i], t) * t
+            norm = np.linalg.norm(bend)
+            if norm > 1e-9:
+                bend /= norm
+                offsets += np.outer(offsets @ bend, bend) * (1.0 / cos_half - 1.0)
+        verts[i] = center + offsets
+
+    s = np.arange(segments)
+    s_next = (s + 1) % segments
+    row = (np.arange(count - 1) * segments)[:, None]
+    quads = np.stack([row + s, row + s_next, row + segments + s_next, row + segments + s], axis=-1).reshape(-1, 4)
+    caps = np.stack([s[::-1], (count - 1) * segments + s])
+    return verts.reshape(-1, 3), (quads, caps)
+
+
+def limb_chains(resolved):
+    """
+    Groups resolved cylinder parts into chains where each part starts where
+    the previous one ends (and nothing else branches off there).
+    Returns a list of [(part, start, end), ...] chains.
+    """
+    def same(a, b):
+        return np.linalg.norm(a - b) < 1e-6
+
+    successors = {i: [j for j, (_, b_start, _) in enumerate(resolved) if same(a_end, b_start)]
+                  for i, (_, _, a_end) in enumerate(resolved)}
+    predecessors = {j: [i for i in successors if j in successors[i]] for j in range(len(resolved))}
+    linked = {i: succ[0] for i, succ in successors.items()
+              if len(succ) == 1 and len(predecessors[succ[0]]) == 1}
+    heads = [i for i in range(len(resolved)) if i not in linked.values()]
+
+    chains = []
+    for i in heads:
+        chain = [resolved[i]]
+        while i in linked:
+            i = linked[i]
+            chain.append(resolved[i])
+        chains.append(chain)
+    return chains
+
+
+def _chain_rings(chain, ring_spacing):
+    """Ring centres, radii and the part (index into chain) of every ring of a chain."""
+    points, radii, owners = [], [], []
+    for k, (part, start, end) in enumerate(chain):
+        spans = max(1, int(np.ceil(np.linalg.norm(end - start) / ring_spacing)))
+        t = np.arange(spans)[:, None] / spans
+        points.extend(start + t * (end - start))
+        radii.extend([part.radius] * spans)
+        owners.extend([k] * spans)
+        if k:
+            # Joint ring between this part and the previous one
+            radii[-spans] = (part.radius + chain[k - 1][0].radius) / 2.0
+    part, _, end = chain[-1]
+    points.append(end)
+    radii.append(part.radius)
+    owners.append(len(chain) - 1)
+    return np.array(points), np.array(radii), np.array(owners)
+
+
+def _pack(pieces):
+    """
+    Concatenates (vertices, polygon groups, per-vertex part index) pieces into
+    the build_body() arrays.
+    """
+    all_verts, groups, part_index = [], [], []
+    offset = 0
+    for verts, polys, index in pieces:
+        all_verts.append(verts)
+        groups.extend(poly + offset for poly in polys)
+        part_index.append(index)
+        offset += len(verts)
+
+    loop_totals = np.concatenate([np.full(len(g), g.shape[1]) for g in groups]).astype(np.int32)
+    loop_starts = np.zeros(len(loop_totals), dtype=np.int32)
+    np.cumsum(loop_totals[:-1], out=loop_starts[1:])
+    return {
+        "vertices": np.concatenate(all_verts).astype(np.float32),
+        "loop_vertices": np.concatenate([g.ravel() for g in groups]).astype(np.int32),
+        "loop_starts": loop_starts,
+        "loop_totals": loop_totals,
+        "part_index": np.concatenate(part_index).astype(np.int32),
+    }
+
+
+# -------------------------------
+# 'SURFACE' mode
+# -------------------------------
+class _Surface:
+    """Vertices, polygon groups and per-vertex parts of a surface built piece by piece."""
+
+    def __init__(self):
+        self.verts, self.groups, self.index, self.part_names = [], [], [], []
+        self.count = 0
+
+    def part(self, name):
+        self.part_names.append(name)
+        return len(self.part_names) - 1
+
+    def add(self, verts, parts):
+        """Appends vertices (..., 3) and their part indices, returns the index of the first."""
+        verts = np.asarray(verts, dtype=np.float64).reshape(-1, 3)
+        first = self.count
+        self.verts.append(verts)
+        self.index.append(np.broadcast_to(np.asarray(parts), (len(verts),)))
+        self.count += len(verts)
+        return first
+
+    def faces(self, *groups):
+        self.groups.extend(np.asarray(group, dtype=np.int64) for group in groups if len(group))
+
+    def geometry(self):
+        """The build_body() arrays, without the vertices no polygon uses (inside the holes)."""
+        used = np.zeros(self.count, dtype=bool)
+        for group in self.groups:
+            used[group.ravel()] = True
+        remap = np.cumsum(used) - 1
+        geometry = _pack([(np.concatenate(self.verts)[used], [remap[group] for group in self.groups],
+                           np.concatenate(self.index)[used])])
+        geometry["part_names"] = self.part_names
+        return geometry
+
+
+def _clearance(radius, cos):
+    """
+    Distance along a limb from where its axis leaves a surface to its first
+    ring, so that the whole ring is outside: cos is the cosine between the
+    limb and the surface normal.
+    """
+    cos = max(cos, 0.3)
+    return radius * np.sqrt(1.0 - cos * cos) / cos + 0.25 * radius
+
+
+def _add_tube(surface, chain, ring_spacing, around, loop=None, loop_start=None):
+    """
+    Adds the tube of a chain (see swept_tube()), capped at its end. With
+    `loop`, `around` existing vertex indices running the same way round as
+    the tube, its start is bridged to that loop (whose first vertex is at
+    `loop_start`) instead of capped.
+    """
+    first = len(surface.part_names)
+    for part, _, _ in chain:
+        surface.part(part.name)
+    points, radii, owners = _chain_rings(chain, ring_spacing)
+    start = None if loop is None else loop_start - points[0]
+    verts, (quads, caps) = swept_tube(points, radii, around, start)
+    base = surface.add(verts, np.repeat(first + owners, around))
+    surface.faces(quads + base, caps[1:] + base)
+    if loop is None:
+        surface.faces(caps[:1] + base)
+    else:
+        s = np.arange(around)
+        s_next = (s + 1) % around
+        loop = np.asarray(loop)
+        surface.faces(np.stack([loop[s], loop[s_next], base + s_next, base + s], axis=-1))
+
+
+def _join_trunk(surface, chains, trunk, spheres, edge_length, ring_spacing, segments, min_segments):
+    """
+    Builds the trunk chain as a grid of rings and joins what starts inside
+    it: the two chains leaving its bottom centre downwards (the legs) split
+    its bottom ring along a seam, the chains starting inside it elsewhere
+    (the arms) leave through holes cut in its side, and the sphere above it
+    (the head) continues it from a neck ring.
+    Returns the indices of the joined chains and spheres.
+    """
+    part, bottom, top = chains[trunk][0]
+    length = np.linalg.norm(top - bottom)
+    t = (top - bottom) / length
+    radius = part.radius
+
+    def radial(p):
+        w = p - bottom
+        return w - np.dot(w, t) * t
+
+    def direction(start, end):
+        return (end - start) / np.linalg.norm(end - start)
+
+    # Legs: two chains leaving the bottom centre downwards, to either side
+    down = [i for i, chain in enumerate(chains) if i != trunk
+            and np.linalg.norm(chain[0][1] - bottom) < 1e-6
+            and np.dot(direction(chain[0][1], chain[0][2]), t) < 0.0]
+    sides = [radial(direction(chains[i][0][1], chains[i][0][2])) for i in down]
+    legs = []
+    if len(down) == 2 and min(np.linalg.norm(side) for side in sides) > 1e-6 and np.dot(*sides) < 0.0:
+        legs = down
+        u = sides[0] / np.linalg.norm(sides[0]) - sides[1] / np.linalg.norm(sides[1])
+        u /= np.linalg.norm(u)
+    else:
+        u = rotation_from_z(t[None])[0][:, 0]
+    v = np.cross(t, u)
+
+    around = _ring_resolution(radius, edge_length, segments, min_segments)
+    step = 2.0 * np.pi / around
+
+    # Arms: chains starting inside the trunk, each leaving through a hole of
+    # `columns` segments and `rows` rings around the point its axis exits at
+    holes = []
+    for i, chain in enumerate(chains):
+        limb, start, end = chain[0]
+        height = np.dot(start - bottom, t)
+        if i == trunk or i in legs or not (0.0 < height < length and np.linalg.norm(radial(start)) < radius):
+            continue
+        d = direction(start, end)
+        q0, qd = radial(start), d - np.dot(d, t) * t
+        a, b, c = np.dot(qd, qd), 2.0 * np.dot(q0, qd), np.dot(q0, q0) - radius * radius
+        if a < 1e-9:
+            continue
+        out = (-b + np.sqrt(b * b - 4.0 * a * c)) / (2.0 * a)
+        limb_radius = max(p.radius for p, _, _ in chain)
+        sin = np.sqrt(a)
+        ring = out + _clearance(limb_radius, sin)
+        exit_point = start + out * d
+        height = np.dot(exit_point - bottom, t)
+        half_height = min(limb_radius / sin, 2.0 * limb_radius)
+        lo, hi = height - half_height, height + half_height
+        if ring >= np.linalg.norm(end - start) or lo <= 0.0 or hi >= length:
+            continue
+        columns = max(1, int(round(2.0 * np.arcsin(min(limb_radius / radius, 0.95)) / step)))
+        angle = np.arctan2(np.dot(radial(exit_point), v), np.dot(radial(exit_point), u))
+        first = int(np.round(angle / step - columns / 2.0))
+        taken = set((first + np.arange(columns + 1)) % around)
+        if any(lo <= other_hi and other_lo <= hi and taken & set((k + np.arange(n + 1)) % around)
+               for _, _, other_lo, other_hi, k, n, _ in holes):
+            continue
+        wanted = _ring_resolution(limb_radius, edge_length, segments, min_segments)
+        rows = max(1, wanted // 2 - columns)
+        holes.append((i, start + ring * d, lo, hi, first, columns, rows))
+
+    # Ring heights: evenly spaced, with the rows of every hole in place of
+    # the evenly spaced rings they would crowd
+    spans = max(1, int(np.ceil(length / ring_spacing)))
+    heights = [np.linspace(0.0, length, spans + 1)]
+    for _, _, lo, hi, _, _, rows in holes:
+        gap = 0.5 * min(ring_spacing, (hi - lo) / rows)
+        heights[0] = heights[0][(heights[0] <= 0.0) | (heights[0] >= length)
+                                | (heights[0] < lo - gap) | (heights[0] > hi + gap)]
+        heights.append(np.linspace(lo, hi, rows + 1))
+    heights = np.sort(np.concatenate(heights))
+    heights = heights[np.concatenate([[True], np.diff(heights) > 1e-7 * length])]
+    count = len(heights)
+
+    torso = surface.part(part.name)
+    angles = step * np.arange(around)
+    ring = np.cos(angles)[:, None] * u + np.sin(angles)[:, None] * v
+    rings = bottom + heights[:, None, None] * t + radius * ring[None]
+    base = surface.add(rings, torso)
+
+    s = np.arange(around)
+    s_next = (s + 1) % around
+    row = base + (np.arange(count - 1) * around)[:, None]
+    quads = np.stack([row + s, row + s_next, row + around + s_next, row + around + s], axis=-1)
+    keep = np.ones((count - 1, around), dtype=bool)
+    for i, ring_start, lo, hi, first, columns, rows in holes:
+        i0, i1 = int(np.argmin(np.abs(heights - lo))), int(np.argmin(np.abs(heights - hi)))
+        k = (first + np.arange(columns)) % around
+        keep[i0:i1, k] = False
+        # Hole boundary, running like the faces it replaces
+        c = np.arange(columns)
+        r = np.arange(i1 - i0)
+        grid = np.concatenate([
+            i0 * around + (first + c) % around,
+            (i0 + r) * around + (first + columns) % around,
+            i1 * around + (first + columns - c) % around,
+            (i1 - r) * around + first % around,
+        ])
+        _add_tube(surface, [(chains[i][0][0], ring_start, chains[i][0][2])] + chains[i][1:],
+                  ring_spacing, len(grid), base + grid, rings.reshape(-1, 3)[grid[0]])
+    surface.faces(quads[keep])
+
+    if legs:
+        # Each leg starts from half the bottom ring and the seam across it
+        quarter = around // 4
+        seam = bottom + np.linspace(-radius, radius, around // 2 + 1)[1:-1, None] * v
+        seam = surface.add(seam, torso) + np.arange(len(seam))
+        for leg, side, arc in ((legs[0], 1.0, quarter), (legs[1], -1.0, 3 * quarter)):
+            loop = np.concatenate([base + (arc - np.arange(2 * quarter + 1)) % around,
+                                   seam if side > 0.0 else seam[::-1]])
+            thigh, _, end = chains[leg][0]
+            hip = bottom + side * min(thigh.radius, radius / 2.0) * u
+            d = direction(hip, end)
+            ring_start = hip + d * _clearance(max(p.radius for p, _, _ in chains[leg]), -np.dot(d, t))
+            _add_tube(surface, [(thigh, ring_start, end)] + chains[leg][1:],
+                      ring_spacing, around, loop, rings[0, arc])
+    else:
+        surface.faces(base + s[None, ::-1])
+
+    # Head: the first sphere above the trunk whose neck ring clears its top
+    neck = np.arcsin(NECK_RATIO)
+    joined = []
+    for j, (head, a, b) in enumerate(spheres):
+        centre = (a + b) / 2.0
+        lift = np.dot(centre - bottom, t) - head.radius * np.cos(neck)
+        if lift > length and np.linalg.norm(radial(centre)) < radius / 2.0:
+            joined.append(j)
+            break
+    if joined:
+        lats = max(1, int(round((np.pi - neck) / step)))
+        theta = neck + (np.pi - neck) * np.arange(lats) / lats
+        head_rings = (centre - head.radius * np.cos(theta)[:, None, None] * t
+                      + head.radius * np.sin(theta)[:, None, None] * ring[None])
+        head_part = surface.part(head.name)
+        head_base = surface.add(head_rings, head_part)
+        pole = surface.add(centre + head.radius * t, head_part)
+        row = np.concatenate([[base + (count - 1) * around], head_base + np.arange(lats) * around])[:, None]
+        surface.faces(np.stack([row[:-1] + s, row[:-1] + s_next, row[1:] + s_next, row[1:] + s], axis=-1).reshape(-1, 4),
+                      np.stack([row[-1] + s, row[-1] + s_next, np.full(around, pole)], axis=-1))
+    else:
+        surface.faces(base + (count - 1) * around + s[None])
+    return [trunk] + legs + [hole[0] for hole in holes], joined
+
+
+def build_surface(positions, parts=BODY_PARTS, segments=CYLINDER_SEGMENTS,
+                  edge_length=EDGE_LENGTH, ring_spacing=RING_SPACING, min_segments=MIN_SEGMENTS):
+    """
+    'SURFACE' mode of build_body(): the trunk (the thickest single-part
+    chain) with the legs, arms and head joined to it (see _join_trunk()),
+    one capped swept tube per other limb chain and one UV sphere per other
+    sphere part, at a density set by edge_length (around) and ring_spacing
+    (along), with min_segments and segments as the limits around.
+    """
+    resolved = _part_points(parts, positions)
+    cylinders = [(p, a, b) for p, a, b in resolved if p.shape == 'CYLINDER']
+    spheres = [(p, a, b) for p, a, b in resolved if p.shape == 'SPHERE']
+    chains = limb_chains(cylinders)
+
+    surface = _Surface()
+    joined_chains, joined_spheres = [], []
+    singles = [i for i, chain in enumerate(chains) if len(chain) == 1]
+    if singles:
+        trunk = max(singles, key=lambda i: chains[i][0][0].radius)
+        joined_chains, joined_spheres = _join_trunk(surface, chains, trunk, spheres, edge_length,
+                                                    ring_spacing, segments, min_segments)
+    for i, chain in enumerate(chains):
+        if i not in joined_chains:
+            radius = max(part.radius for part, _, _ in chain)
+            _add_tube(surface, chain, ring_spacing, _ring_resolution(radius, edge_length, segments, min_segments))
+    for j, (part, a, b) in enumerate(spheres):
+        if j not in joined_spheres:
+            around = _ring_resolution(part.radius, edge_length, segments, min_segments)
+            verts, (quads, tris) = uv_spheres([(a + b) / 2.0], [part.radius], around, around // 2)
+            base = surface.add(verts, surface.part(part.name))
+            surface.faces(quads + base, tris + base)
+    return surface.geometry()
+
+
+def build_body(positions, parts=BODY_PARTS, segments=CYLINDER_SEGMENTS,
+               sphere_segments=SPHERE_SEGMENTS, sphere_rings=SPHERE_RINGS, mode='PARTS',
+               edge_length=EDGE_LENGTH, ring_spacing=RING_SPACING, min_segments=MIN_SEGMENTS):
+    """
+    Builds the whole body as one set of arrays in rig space.
+
+    positions maps bone name -> (head, tail), e.g. skeleton.rest_positions()
+    or the bone positions read from BipedRig. mode is one of BODY_MODES;
+    in 'SURFACE' mode segments is the upper limit around each tube, the
+    density follows edge_length, ring_spacing and min_segments and the
+    sphere settings are derived from the radius (see build_surface()).
+    Returns a dict with:
+      vertices      (V, 3) float32
+      loop_vertices (L,) int32, the vertex index of every polygon corner
+      loop_starts   (P,) int32, first loop of every polygon
+      loop_totals   (P,) int32, corner count of every polygon
+      part_index    (V,) int32, index into part_names for every vertex
+      part_names    list of the generated part names
+    """
+    if mode == 'SURFACE':
+        return build_surface(positions, parts, segments, edge_length, ring_spacing, min_segments)
+    if mode != 'PARTS':
+        raise ValueError(f"Unknown body mode '{mode}'")
+
+    resolved = _part_points(parts, positions)
+    cylinders = [(p, a, b) for p, a, b in resolved if p.shape == 'CYLINDER']
+    spheres = [(p, a, b) for p, a, b in resolved if p.shape == 'SPHERE']
+
+    chunks = []
+    if cylinders:
+        verts, polys = cylinders_between_points(
+            [a for _, a, _ in cylinders], [b for _, _, b in cylinders],
+            [p.radius for p, _, _ in cylinders], segments)
+        chunks.append((verts, polys, [p.name for p, _, _ in cylinders]))
+    if spheres:
+        verts, polys = uv_spheres(
+            [(a + b) / 2.0 for _, a, b in spheres], [p.radius for p, _, _ in spheres],
+            sphere_segments, sphere_rings)
+        chunks.append((verts, polys, [p.name for p, _, _ in spheres]))
+
+    pieces, part_names = [], []
+    for verts, polys, names in chunks:
+        per_part = len(verts) // len(names)
+        pieces.append((verts, polys, np.repeat(np.arange(len(part_names), len(part_names) + len(names)), per_part)))
+        part_names.extend(names)
+
+    geometry = _pack(pieces)
+    geometry["part_names"] = part_names
+    return geometry
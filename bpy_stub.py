@@ -0,0 +1,696 @@
+"""
+Lightweight local stand-in for the parts of bpy used by rig.py, mesh.py and
+crowd.py, so the build scripts can be exercised and benchmarked headless on a
+machine without Blender (see bench.py).
+
+It models data, not behaviour: armatures, edit/pose bones, meshes, vertex
+groups, actions with F-curves, NLA strips and the handful of operators the
+scripts call. Nothing is evaluated or drawn. Timings taken against it measure
+the Python-side cost of the scripts, not Blender's own work.
+"""
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+
+
+# -------------------------------
+# Shared helpers
+# -------------------------------
+class _CustomProps:
+    """ID-style custom properties: obj["key"] = value, obj.get("key")."""
+
+    def _props(self):
+        if "_custom" not in self.__dict__:
+            self.__dict__["_custom"] = {}
+        return self.__dict__["_custom"]
+
+    def __getitem__(self, key):
+        return self._props()[key]
+
+    def __setitem__(self, key, value):
+        self._props()[key] = value
+
+    def __contains__(self, key):
+        return key in self._props()
+
+    def get(self, key, default=None):
+        return self._props().get(key, default)
+
+
+class _Collection(list):
+    """bpy_prop_collection look-alike: index by position or name, foreach_get/set."""
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            for item in self:
+                if item.name == key:
+                    return item
+            raise KeyError(key)
+        return list.__getitem__(self, key)
+
+    def get(self, name, default=None):
+        for item in self:
+            if item.name == name:
+                return item
+        return default
+
+    def keys(self):
+        return [item.name for item in self]
+
+    def find(self, name):
+        for i, item in enumerate(self):
+            if item.name == name:
+                return i
+        return -1
+
+    def foreach_get(self, attr, seq):
+        if not len(self):
+            return
+        values = np.array([np.ravel(getattr(item, attr)) for item in self])
+        seq[:] = values.ravel()
+
+    def foreach_set(self, attr, seq):
+        if not len(self):
+            return
+        values = np.asarray(seq).reshape(len(self), -1)
+        for item, value in zip(self, values):
+            setattr(item, attr, value.copy() if len(value) > 1 else value[0].item())
+
+
+def _unique_name(existing, name):
+    if name not in existing:
+        return name
+    i = 1
+    while f"{name}.{i:03d}" in existing:
+        i += 1
+    return f"{name}.{i:03d}"
+
+
+# -------------------------------
+# ID datablocks
+# -------------------------------
+class ID(_CustomProps):
+    def __init__(self, name):
+        self.name = name
+        self.use_fake_user = False
+
+    @property
+    def users(self):
+        count = int(self.use_fake_user)
+        for obj in data.objects:
+            count += obj.data is self
+            if obj.animation_data is not None:
+                count += obj.animation_data.action is self
+                count += sum(strip.action is self for track in obj.animation_data.nla_tracks
+                             for strip in track.strips)
+        return count
+
+    @property
+    def id_data(self):
+        return self
+
+
+class _IDCollection(_Collection):
+    def __init__(self, factory):
+        super().__init__()
+        self._factory = factory
+
+    def new(self, name, *args, **kwargs):
+        item = self._factory(_unique_name(set(self.keys()), name), *args, **kwargs)
+        self.append(item)
+        return item
+
+    def remove(self, item, do_unlink=True):
+        self[:] = [other for other in self if other is not item]
+        if isinstance(item, Object):
+            for collection in [context.scene.collection] + list(data.collections):
+                collection.objects.unlink_silent(item)
+
+
+# -------------------------------
+# Armatures
+# -------------------------------
+class EditBone:
+    def __init__(self, name):
+        self.name = name
+        self.head = np.zeros(3, dtype=np.float32)
+        self.tail = np.zeros(3, dtype=np.float32)
+        self.parent = None
+        self.use_deform = True
+        self.use_connect = False
+        self.roll = 0.0
+
+    def __setattr__(self, attr, value):
+        if attr in ("head", "tail"):
+            value = np.array(value, dtype=np.float32).reshape(3)
+        object.__setattr__(self, attr, value)
+
+
+class Bone:
+    def __init__(self, name, head, tail, use_deform):
+        self.name = name
+        self.head_local = np.array(head, dtype=np.float32)
+        self.tail_local = np.array(tail, dtype=np.float32)
+        self.use_deform = use_deform
+        self.parent = None
+
+
+class _EditBones(_Collection):
+    def new(self, name):
+        bone = EditBone(_unique_name(set(self.keys()), name))
+        self.append(bone)
+        return bone
+
+    def remove(self, bone):
+        for other in self:
+            if other.parent is bone:
+                other.parent = bone.parent
+        self[:] = [other for other in self if other is not bone]
+
+
+class Armature(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.bones = _Collection()
+        self.edit_bones = _EditBones()
+        self.revision = 0
+
+    def _enter_edit(self):
+        edit = {}
+        self.edit_bones[:] = []
+        for bone in self.bones:
+            edit_bone = self.edit_bones.new(bone.name)
+            edit_bone.head = bone.head_local
+            edit_bone.tail = bone.tail_local
+            edit_bone.use_deform = bone.use_deform
+            edit[bone.name] = edit_bone
+        for bone in self.bones:
+            if bone.parent is not None:
+                edit[bone.name].parent = edit[bone.parent.name]
+
+    def _leave_edit(self):
+        # Zero-length bones are dropped, as in Blender
+        kept = [b for b in self.edit_bones if np.linalg.norm(b.tail - b.head) > 1e-6]
+        bones = {b.name: Bone(b.name, b.head, b.tail, b.use_deform) for b in kept}
+        for b in kept:
+            if b.parent is not None and b.parent.name in bones:
+                bones[b.name].parent = bones[b.parent.name]
+        self.bones[:] = list(bones.values())
+        self.edit_bones[:] = []
+        self.revision += 1
+
+
+class Constraint(_CustomProps):
+    def __init__(self, type):
+        self.type = type
+        self.name = type
+        self.target = None
+        self.subtarget = ""
+        self.pole_target = None
+        self.pole_subtarget = ""
+        self.chain_count = 0
+        self.pole_angle = 0.0
+        self.influence = 1.0
+        self.mute = False
+
+
+class _Constraints(_Collection):
+    def new(self, type):
+        constraint = Constraint(type)
+        constraint.name = _unique_name(set(self.keys()), type)
+        self.append(constraint)
+        return constraint
+
+    def remove(self, constraint):
+        self[:] = [other for other in self if other is not constraint]
+
+
+class PoseBone:
+    def __init__(self, owner, bone):
+        self.id_data = owner
+        self.name = bone.name
+        self.bone = bone
+        self.rotation_mode = 'QUATERNION'
+        self.rotation_euler = [0.0, 0.0, 0.0]
+        self.rotation_quaternion = [1.0, 0.0, 0.0, 0.0]
+        self.location = [0.0, 0.0, 0.0]
+        self.constraints = _Constraints()
+
+    def keyframe_insert(self, data_path, index=-1, frame=0.0, group=None):
+        obj = self.id_data
+        anim_data = obj.animation_data or obj.animation_data_create()
+        if anim_data.action is None:
+            anim_data.action = data.actions.new(f"{obj.name}Action")
+        values = getattr(self, data_path)
+        path = f'pose.bones["{self.name}"].{data_path}'
+        for i, value in enumerate(values):
+            if index >= 0 and i != index:
+                continue
+            fcurve = anim_data.action.fcurves.find(path, index=i)
+            if fcurve is None:
+                fcurve = anim_data.action.fcurves.new(path, index=i, action_group=group or self.name)
+            fcurve.insert(frame, value)
+        return True
+
+
+class Pose:
+    def __init__(self, owner):
+        self._owner = owner
+        self._bones = _Collection()
+        self._revision = -1
+
+    @property
+    def bones(self):
+        armature = self._owner.data
+        if self._revision != armature.revision:
+            current = {pb.name: pb for pb in self._bones}
+            rebuilt = _Collection()
+            for bone in armature.bones:
+                pose_bone = current.get(bone.name) or PoseBone(self._owner, bone)
+                pose_bone.bone = bone
+                rebuilt.append(pose_bone)
+            self._bones = rebuilt
+            self._revision = armature.revision
+        return self._bones
+
+
+# -------------------------------
+# Meshes
+# -------------------------------
+class _ArrayCollection:
+    """Array-backed element collection (vertices, loops, polygons, keyframe points)."""
+
+    _fields = {}
+
+    def __init__(self):
+        self._arrays = {name: np.zeros((0,) + shape, dtype=dtype)
+                        for name, (dtype, shape) in self._fields.items()}
+
+    def __len__(self):
+        return len(next(iter(self._arrays.values())))
+
+    def add(self, count):
+        for name, (dtype, shape) in self._fields.items():
+            extra = np.zeros((count,) + shape, dtype=dtype)
+            self._arrays[name] = np.concatenate([self._arrays[name], extra])
+
+    def clear(self):
+        for name in self._arrays:
+            self._arrays[name] = self._arrays[name][:0]
+
+    def foreach_set(self, attr, seq):
+        array = self._arrays[attr]
+        array[...] = np.asarray(seq, dtype=array.dtype).reshape(array.shape)
+
+    def foreach_get(self, attr, seq):
+        seq[:] = self._arrays[attr].ravel()
+
+
+class MeshVertices(_ArrayCollection):
+    _fields = {"co": (np.float32, (3,))}
+
+
+class MeshLoops(_ArrayCollection):
+    _fields = {"vertex_index": (np.int32, ())}
+
+
+class MeshPolygons(_ArrayCollection):
+    _fields = {"loop_start": (np.int32, ()), "loop_total": (np.int32, ())}
+
+
+class Mesh(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.vertices = MeshVertices()
+        self.loops = MeshLoops()
+        self.polygons = MeshPolygons()
+
+    def update(self, calc_edges=False):
+        pass
+
+    def validate(self, verbose=False):
+        return False
+
+
+class VertexGroup:
+    def __init__(self, name, index):
+        self.name = name
+        self.index = index
+        self.weights = {}
+
+    def add(self, index, weight, type):
+        for i in index:
+            self.weights[int(i)] = weight
+
+
+class _VertexGroups(_Collection):
+    def new(self, name="Group"):
+        group = VertexGroup(_unique_name(set(self.keys()), name), len(self))
+        self.append(group)
+        return group
+
+
+class Modifier(_CustomProps):
+    def __init__(self, name, type):
+        self.name = name
+        self.type = type
+        self.object = None
+        self.levels = 1
+        self.render_levels = 2
+
+
+class _Modifiers(_Collection):
+    def new(self, name, type):
+        modifier = Modifier(_unique_name(set(self.keys()), name), type)
+        self.append(modifier)
+        return modifier
+
+
+# -------------------------------
+# Animation
+# -------------------------------
+class KeyframePoints(_ArrayCollection):
+    _fields = {"co": (np.float32, (2,)), "interpolation": (np.int32, ())}
+
+    def insert(self, frame, value):
+        co = self._arrays["co"]
+        existing = np.flatnonzero(co[:, 0] == frame)
+        if len(existing):
+            co[existing[0], 1] = value
+            return
+        self.add(1)
+        self._arrays["co"][-1] = (frame, value)
+        self._arrays["interpolation"][-1] = 2
+
+
+class FCurve:
+    def __init__(self, data_path, index, group):
+        self.data_path = data_path
+        self.array_index = index
+        self.group = group
+        self.auto_smoothing = 'NONE'
+        self.keyframe_points = KeyframePoints()
+
+    def insert(self, frame, value):
+        self.keyframe_points.insert(frame, value)
+        self.update()
+
+    def update(self):
+        arrays = self.keyframe_points._arrays
+        order = np.argsort(arrays["co"][:, 0], kind='stable')
+        for name in arrays:
+            arrays[name] = arrays[name][order]
+
+
+class _FCurves(list):
+    def find(self, data_path, index=0):
+        for fcurve in self:
+            if fcurve.data_path == data_path and fcurve.array_index == index:
+                return fcurve
+        return None
+
+    def new(self, data_path, index=0, action_group=""):
+        fcurve = FCurve(data_path, index, action_group)
+        self.append(fcurve)
+        return fcurve
+
+
+class Action(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.fcurves = _FCurves()
+
+
+class NlaStrip:
+    def __init__(self, name, start, action):
+        self.name = name
+        self.action = action
+        self.frame_start = float(start)
+        self.action_frame_start = 0.0
+        self.action_frame_end = 0.0
+        self.scale = 1.0
+        self.repeat = 1.0
+
+    @property
+    def frame_start_ui(self):
+        return self.frame_start
+
+    @frame_start_ui.setter
+    def frame_start_ui(self, value):
+        # Moves the strip, keeping its length (Blender 3.3+)
+        self.frame_start = float(value)
+
+
+class _NlaStrips(_Collection):
+    def new(self, name, start, action):
+        strip = NlaStrip(name, start, action)
+        self.append(strip)
+        return strip
+
+
+class NlaTrack:
+    def __init__(self):
+        self.name = "NlaTrack"
+        self.strips = _NlaStrips()
+
+
+class _NlaTracks(_Collection):
+    def new(self, prev=None):
+        track = NlaTrack()
+        self.append(track)
+        return track
+
+
+class AnimData:
+    def __init__(self):
+        self.action = None
+        self.nla_tracks = _NlaTracks()
+
+
+# -------------------------------
+# Objects, collections and context
+# -------------------------------
+class Object(ID):
+    def __init__(self, name, object_data):
+        super().__init__(name)
+        self.data = object_data
+        self.type = {Armature: 'ARMATURE', Mesh: 'MESH'}.get(type(object_data), 'EMPTY')
+        self.mode = 'OBJECT'
+        self.parent = None
+        self.location = [0.0, 0.0, 0.0]
+        self.rotation_euler = [0.0, 0.0, 0.0]
+        self.modifiers = _Modifiers()
+        self.vertex_groups = _VertexGroups()
+        self.animation_data = None
+        self.pose = Pose(self) if isinstance(object_data, Armature) else None
+        self._selected = False
+
+    @property
+    def matrix_world(self):
+        """Only the translation is modelled (parent offsets added, rotations ignored)."""
+        translation = np.array(self.location, dtype=np.float64)
+        if self.parent is not None:
+            translation += self.parent.matrix_world.translation
+        return SimpleNamespace(translation=translation)
+
+    def animation_data_create(self):
+        if self.animation_data is None:
+            self.animation_data = AnimData()
+        return self.animation_data
+
+    def select_set(self, state):
+        self._selected = bool(state)
+
+    def select_get(self):
+        return self._selected
+
+    def copy(self):
+        """Linked duplicate: shares the data, copies pose, modifiers and animation data."""
+        dup = Object(_unique_name(set(data.objects.keys()), self.name), self.data)
+        data.objects.append(dup)
+        dup.parent = self.parent
+        dup.location = list(self.location)
+        dup.rotation_euler = list(self.rotation_euler)
+        dup._props().update(self._props())
+        for modifier in self.modifiers:
+            copied = dup.modifiers.new(modifier.name, modifier.type)
+            copied.__dict__.update({k: v for k, v in modifier.__dict__.items() if k != "name"})
+        for group in self.vertex_groups:
+            dup.vertex_groups.new(group.name).weights = dict(group.weights)
+        if self.pose is not None:
+            for src, dst in zip(self.pose.bones, dup.pose.bones):
+                dst.rotation_mode = src.rotation_mode
+                for constraint in src.constraints:
+                    copied = dst.constraints.new(constraint.type)
+                    copied.__dict__.update(constraint.__dict__)
+        if self.animation_data is not None:
+            dup.animation_data_create().action = self.animation_data.action
+        return dup
+
+
+class _CollectionObjects(_Collection):
+    def link(self, obj):
+        if obj not in self:
+            self.append(obj)
+
+    def unlink(self, obj):
+        self.remove(obj)
+
+    def unlink_silent(self, obj):
+        self[:] = [other for other in self if other is not obj]
+
+
+class Collection(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.objects = _CollectionObjects()
+        self.children = _CollectionObjects()
+
+
+class _LayerObjects:
+    def __init__(self):
+        self.active = None
+
+
+class _ViewLayer:
+    def __init__(self):
+        self.objects = _LayerObjects()
+
+
+class _Scene(_CustomProps):
+    def __init__(self):
+        self.collection = Collection("Scene Collection")
+        self.camera = None
+        self.render = SimpleNamespace(resolution_x=1920, resolution_y=1080, resolution_percentage=100)
+        self.frame_start = 1
+        self.frame_end = 250
+
+
+class _Context:
+    def __init__(self):
+        self.scene = _Scene()
+        self.view_layer = _ViewLayer()
+
+    @property
+    def collection(self):
+        return self.scene.collection
+
+    @property
+    def object(self):
+        return self.view_layer.objects.active
+
+    @property
+    def active_object(self):
+        return self.view_layer.objects.active
+
+
+class _Data:
+    def __init__(self):
+        self.armatures = _IDCollection(Armature)
+        self.objects = _IDCollection(Object)
+        self.meshes = _IDCollection(Mesh)
+        self.actions = _IDCollection(Action)
+        self.collections = _IDCollection(Collection)
+
+
+# -------------------------------
+# Operators
+# -------------------------------
+def _mode_set(mode='OBJECT'):
+    obj = context.view_layer.objects.active
+    if obj is None or obj.mode == mode:
+        return {'FINISHED'}
+    if obj.mode == 'EDIT' and obj.type == 'ARMATURE':
+        obj.data._leave_edit()
+    if mode == 'EDIT' and obj.type == 'ARMATURE':
+        obj.data._enter_edit()
+    obj.mode = mode
+    return {'FINISHED'}
+
+
+def _select_all(action='TOGGLE'):
+    for obj in context.scene.collection.objects:
+        obj.select_set(action in ('SELECT', 'TOGGLE'))
+    return {'FINISHED'}
+
+
+def _delete(use_global=False, confirm=True):
+    for obj in [obj for obj in data.objects if obj.select_get()]:
+        data.objects.remove(obj)
+    if context.view_layer.objects.active not in data.objects:
+        context.view_layer.objects.active = None
+    return {'FINISHED'}
+
+
+def _parent_set(type='OBJECT', keep_transform=False):
+    parent = context.view_layer.objects.active
+    for obj in data.objects:
+        if obj is parent or not obj.select_get():
+            continue
+        obj.parent = parent
+        if type.startswith('ARMATURE'):
+            modifier = obj.modifiers.new("Armature", 'ARMATURE')
+            modifier.object = parent
+            if type == 'ARMATURE_AUTO':
+                for bone in parent.data.bones:
+                    if bone.use_deform:
+                        obj.vertex_groups.new(bone.name)
+    return {'FINISHED'}
+
+
+def _operator(func):
+    """Makes a plain function look like a bpy.ops operator (callable with .poll())."""
+    func.poll = lambda: True
+    return func
+
+
+ops = SimpleNamespace(
+    object=SimpleNamespace(
+        mode_set=_operator(_mode_set),
+        select_all=_operator(_select_all),
+        delete=_operator(_delete),
+        parent_set=_operator(_parent_set),
+    ),
+)
+
+
+# -------------------------------
+# Types (only what the scripts look up)
+# -------------------------------
+def _enum(names):
+    items = {name: SimpleNamespace(identifier=name, value=i) for i, name in enumerate(names)}
+    return SimpleNamespace(enum_items=items)
+
+
+types = SimpleNamespace(
+    Keyframe=SimpleNamespace(bl_rna=SimpleNamespace(properties={
+        "interpolation": _enum(["CONSTANT", "LINEAR", "BEZIER"]),
+    })),
+)
+
+def _persistent(func):
+    """bpy.app.handlers.persistent: marks a handler to be kept when a new file is loaded."""
+    func._bpy_persistent = True
+    return func
+
+
+app = SimpleNamespace(version=(0, 0, 0), version_string="bpy_stub", background=True,
+                      handlers=SimpleNamespace(frame_change_pre=[], render_pre=[], persistent=_persistent))
+
+data = _Data()
+context = _Context()
+
+
+def reset():
+    """Starts from an empty scene, like reading factory settings with use_empty=True."""
+    global data, context
+    data = _Data()
+    context = _Context()
+
+
+def install():
+    """Registers this module as 'bpy' so `import bpy` in the build scripts resolves to it."""
+    module = sys.modules[__name__]
+    sys.modules["bpy"] = module
+    return module
@@ -0,0 +1,421 @@
+"""
+BVH motion capture import and retargeting onto the BipedRig (NumPy only, no bpy).
+
+A BVH file is read as a HIERARCHY of joints (offsets and channel lists)
+followed by one MOTION line per frame. The header is small and parsed
+whole; the motion lines are streamed in chunks of CHUNK_FRAMES frames, so a
+take of any length is processed with bounded memory.
+
+Joints are matched to the rig's bones through JOINT_MAP, case-insensitively
+and ignoring namespace prefixes ("mixamorig:Hips") and underscores, so the
+common Mixamo, CMU and Poser-style names as well as the rig's own names
+(Pelvis, Spine, Chest, Left_Thigh, ...) are recognized. Retargeting copies
+the world orientation of every matched joint onto its bone:
+
+    Q[bone]     = D[joint] @ A[bone]
+    basis[bone] = R[bone]^T @ Q[parent]^T @ Q[bone] @ R[bone]
+
+D is the joint's world rotation (the product of the local rotations down
+the hierarchy) converted to the rig's Z-up axes, A the rest-pose correction
+turning the rig bone's rest direction onto the joint's rest direction (so a
+T-posed take drives a rig modelled in an A-pose) and R the bone's rest
+orientation. Unmatched bones follow their parent. Everything is vectorized
+over the frames of a chunk and over the bones.
+
+Only rotations are transferred; root translation is not keyed. The result
+is written as one rotation_euler clip per file into a clips.py library,
+streamed chunk by chunk into the preallocated memory-mapped file, and can
+be keyed in bulk with mesh.add_revised_animations(rig, library_path=path).
+The IK constraints of the rig override the imported leg and arm rotations
+unless they are muted.
+
+Many files are imported in parallel by import_many() on a process pool.
+"""
+import argparse
+import itertools
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+import clips
+import fk
+import gait
+import ik
+
+# Motion lines parsed at once
+CHUNK_FRAMES = 4096
+
+# Key times closer than this (in frames) to a whole frame are snapped to it
+FRAME_SNAP = 1e-3
+
+# BVH axes (Y up, facing +Z) -> rig axes (Z up, facing +Y, left at -X)
+BVH_TO_RIG = np.array([[-1.0, 0.0, 0.0],
+                       [0.0, 0.0, 1.0],
+                       [0.0, 1.0, 0.0]])
+
+# name:     joint name ("<parent>/End" for End Site markers)
+# parent:   index of the parent joint, -1 for the root
+# offset:   (3,) offset from the parent joint in the rest pose
+# channels: channel names, e.g. ("Xposition", ..., "Zrotation", "Xrotation", "Yrotation")
+# column:   column of the joint's first channel in the motion rows
+# end_site: whether the joint is an End Site marker
+Joint = namedtuple("Joint", "name parent offset channels column end_site")
+
+# joints:     Joint tuples, parents before children
+# frames:     number of motion frames
+# frame_time: seconds per frame
+# channels:   number of values per motion row
+Header = namedtuple("Header", "joints frames frame_time channels")
+
+# -------------------------------
+# Joint names
+# -------------------------------
+_CENTER = {
+    "Pelvis": ("Hips", "Hip", "Pelvis", "Root"),
+    "Spine": ("Spine", "LowerBack", "Abdomen", "Spine1"),
+    "Chest": ("Spine2", "Spine1", "Chest", "UpperChest", "Spine3"),
+    "Neck": ("Neck", "Neck1"),
+    "Head": ("Head",),
+}
+
+# {0}: "Left" / "Right", {1}: "l" / "r"
+_LIMBS = {
+    "{0}_Upper_Arm": ("{0}Arm", "{0}UpperArm", "{0}UpArm", "{0}Shoulder2", "{1}Shldr"),
+    "{0}_Forearm": ("{0}ForeArm", "{0}LowArm", "{0}LowerArm", "{0}Elbow", "{1}ForeArm"),
+    "{0}_Hand": ("{0}Hand", "{0}Wrist", "{1}Hand"),
+    "{0}_Thigh": ("{0}UpLeg", "{0}Thigh", "{0}UpperLeg", "{0}Hip", "{1}Thigh"),
+    "{0}_Shin": ("{0}Leg", "{0}Shin", "{0}LowLeg", "{0}LowerLeg", "{0}Knee", "{1}Shin"),
+    "{0}_Foot": ("{0}Foot", "{0}Ankle", "{1}Foot"),
+}
+
+# Rig bone -> BVH joint names tried in order (the first one present and not
+# already taken by an earlier bone wins)
+JOINT_MAP = dict(_CENTER)
+for _side, _prefix in (("Left", "l"), ("Right", "r")):
+    for _bone, _candidates in _LIMBS.items():
+        JOINT_MAP[_bone.format(_side)] = tuple(c.format(_side, _prefix) for c in _candidates)
+
+
+def _normalized_name(name):
+    return name.rsplit(":", 1)[-1].replace("_", "").replace(" ", "").lower()
+
+
+def match_joints(header, bone_names, joint_map=JOINT_MAP):
+    """Maps rig bone names to BVH joint indices: {bone name: joint index}."""
+    lookup = {}
+    for j, joint in enumerate(header.joints):
+        if not joint.end_site:
+            lookup.setdefault(_normalized_name(joint.name), j)
+    matched, used = {}, set()
+    for bone in bone_names:
+        for candidate in joint_map.get(bone, (bone,)):
+            j = lookup.get(_normalized_name(candidate))
+            if j is not None and j not in used:
+                matched[bone] = j
+                used.add(j)
+                break
+    return matched
+
+
+# -------------------------------
+# Parsing
+# -------------------------------
+def read_header(f):
+    """
+    Parses the HIERARCHY section and the frame count and frame time lines of
+    an open BVH text file, leaving the file at the first motion line.
+    """
+    tokens = []
+    for line in f:
+        if line.strip().upper() == "MOTION":
+            break
+        tokens.extend(line.split())
+    else:
+        raise ValueError("BVH file has no MOTION section")
+
+    joints, stack, pending = [], [], None
+    column = 0
+    it = iter(tokens)
+    for token in it:
+        if token in ("ROOT", "JOINT"):
+            pending = next(it)
+        elif token == "End":
+            next(it)  # "Site"
+            pending = f"{joints[stack[-1]]['name']}/End"
+        elif token == "{":
+            if pending is None:
+                raise ValueError("BVH hierarchy has a block without a joint")
+            joints.append({"name": pending, "parent": stack[-1] if stack else -1, "offset": (0.0, 0.0, 0.0),
+                           "channels": (), "column": column, "end_site": pending.endswith("/End")})
+            stack.append(len(joints) - 1)
+            pending = None
+        elif token == "}":
+            stack.pop()
+        elif token == "OFFSET":
+            joints[stack[-1]]["offset"] = tuple(float(next(it)) for _ in range(3))
+        elif token == "CHANNELS":
+            channels = tuple(next(it) for _ in range(int(next(it))))
+            joints[stack[-1]]["channels"] = channels
+            joints[stack[-1]]["column"] = column
+            column += len(channels)
+    if not joints or stack:
+        raise ValueError("BVH hierarchy is empty or unbalanced")
+
+    frames = frame_time = None
+    while frames is None or frame_time is None:
+        line = f.readline()
+        if not line:
+            raise ValueError("BVH file ends before the frame count and frame time")
+        key, _, value = line.partition(":")
+        if key.strip().lower() == "frames":
+            frames = int(value)
+        elif key.strip().lower() == "frame time":
+            frame_time = float(value)
+
+    joints = [Joint(j["name"], j["parent"], np.array(j["offset"]), j["channels"], j["column"], j["end_site"])
+              for j in joints]
+    return Header(joints, frames, frame_time, column)
+
+
+def read_motion(f, header, chunk_frames=CHUNK_FRAMES):
+    """Yields (first frame index, (n, channels) float64 rows) chunks of the motion lines."""
+    done = 0
+    while done < header.frames:
+        lines = list(itertools.islice(f, min(chunk_frames, header.frames - done)))
+        if not lines:
+            raise ValueError(f"BVH motion ends after {done} of {header.frames} frames")
+        values = np.array(" ".join(lines).split(), dtype=np.float64)
+        if values.size % header.channels:
+            raise ValueError(f"BVH motion near frame {done} does not have {header.channels} values per frame")
+        rows = values.reshape(-1, header.channels)
+        if len(rows):
+            yield done, rows
+            done += len(rows)
+
+
+# -------------------------------
+# Rotations
+# -------------------------------
+def _axis_rotations(axis, angles):
+    """(..., 3, 3) rotations by `angles` radians around the X, Y or Z axis (0, 1, 2)."""
+    c, s = np.cos(angles), np.sin(angles)
+    i, j = (axis + 1) % 3, (axis + 2) % 3
+    mat = np.zeros(angles.shape + (3, 3))
+    mat[..., axis, axis] = 1.0
+    mat[..., i, i] = c
+    mat[..., j, j] = c
+    mat[..., i, j] = -s
+    mat[..., j, i] = s
+    return mat
+
+
+class Skeleton:
+    """
+    Rest data of a BVH hierarchy prepared for batched evaluation: parent
+    indices, depth levels, rest positions and the motion columns of the
+    rotation channels grouped by rotation order.
+    """
+
+    def __init__(self, header):
+        self.header = header
+        self.parents = np.array([joint.parent for joint in header.joints])
+        self.levels = fk.depth_levels(self.parents)
+        self.positions = np.zeros((len(header.joints), 3))
+        for level in self.levels:
+            offsets = np.array([header.joints[j].offset for j in level])
+            parents = self.parents[level]
+            self.positions[level] = np.where((parents >= 0)[:, None], self.positions[parents], 0.0) + offsets
+
+        # rotation order -> (joint indices, (n, 3) motion columns)
+        groups = {}
+        for j, joint in enumerate(header.joints):
+            order = tuple("XYZ".index(name[0].upper()) for name in joint.channels if name.lower().endswith("rotation"))
+            if order:
+                columns = [joint.column + c for c, name in enumerate(joint.channels)
+                           if name.lower().endswith("rotation")]
+                indices, cols = groups.setdefault(order, ([], []))
+                indices.append(j)
+                cols.append(columns)
+        self.rotation_groups = [(order, np.array(indices), np.array(cols)) for order, (indices, cols) in groups.items()]
+
+    def world_rotations(self, rows):
+        """(F, J, 3, 3) world rotations of every joint for motion rows (F, channels), in BVH axes."""
+        local = np.broadcast_to(np.eye(3), (len(rows), len(self.parents), 3, 3)).copy()
+        for order, indices, columns in self.rotation_groups:
+            angles = np.radians(rows[:, columns])
+            rot = _axis_rotations(order[0], angles[..., 0])
+            for k in range(1, len(order)):
+                rot = rot @ _axis_rotations(order[k], angles[..., k])
+            local[:, indices] = rot
+
+        world = np.empty_like(local)
+        for level in self.levels:
+            parents = self.parents[level]
+            roots = parents < 0
+            world[:, level[roots]] = local[:, level[roots]]
+            if (~roots).any():
+                world[:, level[~roots]] = world[:, parents[~roots]] @ local[:, level[~roots]]
+        return world
+
+    def is_descendant(self, joint, ancestor):
+        while joint >= 0:
+            joint = self.parents[joint]
+            if joint == ancestor:
+                return True
+        return False
+
+
+class Retarget:
+    """
+    Maps the world rotations of a BVH skeleton onto a fk.Rig. bones lists the
+    keyed bones (matched ones, in rig order); basis() and euler() return
+    their local rotations for a chunk of motion rows.
+    """
+
+    def __init__(self, header, rig=None, joint_map=JOINT_MAP, axes=BVH_TO_RIG):
+        self.rig = rig or fk.Rig()
+        self.skeleton = Skeleton(header)
+        self.axes = np.asarray(axes, dtype=np.float64)
+        rig = self.rig
+        matched = match_joints(header, rig.names, joint_map)
+        if not matched:
+            raise ValueError("No BVH joint matches a rig bone")
+        self.bones = [name for name in rig.names if name in matched]
+        bones = [rig.index[name] for name in self.bones]
+        self.joints = np.array([matched[name] for name in self.bones])
+
+        # Rest-pose correction: rig bone direction -> BVH joint direction (in rig axes)
+        positions = self.skeleton.positions @ self.axes.T
+        rig_directions = rig.tails[bones] - rig.heads[bones]
+        bvh_directions = rig_directions.copy()
+        for k, (b, j) in enumerate(zip(bones, self.joints)):
+            end = self._direction_joint(matched, b, j)
+            if end is not None:
+                bvh_directions[k] = positions[end] - positions[j]
+        self.correction = ik.rotation_between(rig_directions, bvh_directions)
+
+        # Nearest matched ancestor of each keyed bone (len(bones) for none: identity)
+        slot = {b: k for k, b in enumerate(bones)}
+        parent_slots = []
+        for b in bones:
+            p = rig.parents[b]
+            while p >= 0 and p not in slot:
+                p = rig.parents[p]
+            parent_slots.append(slot.get(p, len(bones)))
+        self.parent_slots = np.array(parent_slots)
+        self.rest = rig.rest[bones, :3, :3]
+
+    def _direction_joint(self, matched, bone, joint):
+        """BVH joint marking the far end of the joint matched to `bone`, or None."""
+        rig, skeleton = self.rig, self.skeleton
+        for child in np.flatnonzero(rig.parents == bone):
+            name = rig.names[child]
+            if name in matched and np.allclose(rig.heads[child], rig.tails[bone]):
+                k = matched[name]
+                if skeleton.is_descendant(k, joint) and not np.allclose(skeleton.positions[k], skeleton.positions[joint]):
+                    return k
+        for k in np.flatnonzero(skeleton.parents == joint):
+            if np.any(skeleton.header.joints[k].offset != 0.0):
+                return k
+        return None
+
+    def basis(self, rows):
+        """(F, b, 3, 3) local rotations of the keyed bones for motion rows (F, channels)."""
+        world = self.skeleton.world_rotations(rows)[:, self.joints]
+        q = self.axes @ world @ self.axes.T @ self.correction
+        q = np.concatenate([q, np.broadcast_to(np.eye(3), (len(rows), 1, 3, 3))], axis=1)
+        parent = q[:, self.parent_slots]
+        rest_t = np.swapaxes(self.rest, -1, -2)
+        return rest_t @ np.swapaxes(parent, -1, -2) @ q[:, :-1] @ self.rest
+
+    def euler(self, rows, previous=None):
+        """
+        (F, b, 3) Euler XYZ rotations of the keyed bones, unwrapped along the
+        frames and continuing from `previous` (b, 3), the last frame of the
+        preceding chunk.
+        """
+        euler = fk.mat3_to_euler(self.basis(rows))
+        if previous is None:
+            return np.unwrap(euler, axis=0)
+        return np.unwrap(np.concatenate([previous[None], euler]), axis=0)[1:]
+
+
+# -------------------------------
+# Import
+# -------------------------------
+def key_times(count, frame_time, fps=gait.FPS, snap=FRAME_SNAP):
+    """
+    Scene frame offsets (count,) of the BVH frames. Offsets within `snap` of
+    a whole frame are put on it, so a frame time written with a few digits
+    (0.0416667 at 24 fps) keys whole frames and does not end a frame late.
+    """
+    times = np.arange(count) * frame_time * fps
+    nearest = np.round(times)
+    return np.where(np.abs(times - nearest) <= snap, nearest, times)
+
+
+def import_bvh(path, out_path=None, name=None, rig=None, joint_map=JOINT_MAP, frame_start=1, fps=gait.FPS,
+               chunk_frames=CHUNK_FRAMES):
+    """
+    Retargets one BVH file onto the rig and writes it as a one-clip library
+    (default: next to the BVH file, with the .bpc extension). Keys land on
+    frame_start + time * fps, one per BVH frame. Returns the library path.
+    """
+    name = name or os.path.splitext(os.path.basename(path))[0]
+    out_path = out_path or os.path.splitext(path)[0] + ".bpc"
+    with open(path) as f:
+        header = read_header(f)
+        retarget = Retarget(header, rig, joint_map)
+        times = key_times(header.frames, header.frame_time, fps)
+        layout = clips.ClipLayout(name, frame_start, int(np.ceil(frame_start + times[-1])) if len(times) else frame_start,
+                                  retarget.bones, 3, header.frames, "rotation_euler")
+        frames, tracks = clips.allocate_library(out_path, [layout]).get(name, (None, None))
+        if frames is None:
+            return out_path
+        frames[:] = frame_start + times
+        previous = None
+        for start, rows in read_motion(f, header, chunk_frames):
+            euler = retarget.euler(rows, previous)
+            tracks[:, :, start:start + len(rows)] = np.transpose(euler, (1, 2, 0))
+            previous = euler[-1]
+        frames.base.flush()
+    return out_path
+
+
+def import_many(paths, out_dir=None, workers=None, **kwargs):
+    """
+    Imports BVH files in parallel, one file per task on a process pool of
+    `workers` processes (all cores by default, 1 imports in this process).
+    Each file is written to its own library in out_dir (default: next to the
+    file); keyword arguments go to import_bvh(). Returns the library paths.
+    """
+    outputs = [os.path.join(out_dir, os.path.splitext(os.path.basename(path))[0] + ".bpc") if out_dir else None
+               for path in paths]
+    run = partial(_import_one, kwargs=kwargs)
+    if workers == 1 or len(paths) <= 1:
+        return [run(path, out) for path, out in zip(paths, outputs)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run, paths, outputs))
+
+
+def _import_one(path, out_path, kwargs):
+    return import_bvh(path, out_path, **kwargs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retarget BVH files onto the BipedRig as clip libraries.")
+    parser.add_argument("paths", nargs="+", help="BVH files")
+    parser.add_argument("--out-dir", help="directory for the .bpc libraries (default: next to each file)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--fps", type=float, default=gait.FPS, help="scene frame rate the keys are placed at")
+    parser.add_argument("--chunk", type=int, default=CHUNK_FRAMES, help="motion lines parsed at once")
+    args = parser.parse_args()
+
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+    for path, out in zip(args.paths, import_many(args.paths, args.out_dir, args.workers, fps=args.fps,
+                                                 chunk_frames=args.chunk)):
+        print(f"{path} -> {out}")
@@ -0,0 +1,242 @@
+"""
+Content-addressed on-disk cache for generated rig and body mesh artifacts.
+
+Two kinds of entries are stored as .npz files named after a SHA-256 of
+every input that affects them:
+
+    body    mesh arrays and skin weights, keyed on bone positions and
+            hierarchy, body part radii, segment counts, subdivision
+            settings, weighting and body mode and the source of body.py
+            and weights.py
+    clip    one clip sampled on every frame of its range, keyed on the
+            clip's key data and the source of fk.py and fcurve.py
+
+so editing a clip never invalidates the body, and the other way round. Any
+change to an input produces a new key, so stale entries are never returned;
+they simply age out.
+
+The cache is bounded in size with least-recently-used eviction: hits refresh
+an entry's modification time and the oldest entries are removed once the
+total size exceeds the limit.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+
+import body
+import fcurve
+import fk
+import weights
+
+# Bump when the layout of stored artifacts changes
+FORMAT_VERSION = 1
+
+DEFAULT_DIRECTORY = os.environ.get(
+    "BIPED_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "biped_rig"))
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Modules whose source takes part in the keys, so code changes invalidate entries
+BODY_GENERATORS = (body, weights)
+CLIP_GENERATORS = (fk, fcurve)
+
+
+def _source_digest(modules):
+    digest = hashlib.sha256()
+    for module in modules:
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def artifact_key(positions, parents, deform_bones, parts=body.BODY_PARTS,
+                 segments=body.CYLINDER_SEGMENTS, sphere_segments=body.SPHERE_SEGMENTS,
+                 sphere_rings=body.SPHERE_RINGS, subdivision_levels=2, weight_mode='ANALYTIC',
+                 body_mode='PARTS'):
+    """
+    Returns the hex cache key of the body artifacts for a set of generation
+    inputs. Bone positions are hashed at float32 precision, the precision
+    Blender stores them at.
+    """
+    digest = hashlib.sha256()
+    settings = {
+        "format": FORMAT_VERSION,
+        "parents": sorted((name, parent or "") for name, parent in parents.items()),
+        "deform": sorted(deform_bones),
+        "parts": [list(part) for part in parts],
+        "segments": segments,
+        "sphere_segments": sphere_segments,
+        "sphere_rings": sphere_rings,
+        "subdivision_levels": subdivision_levels,
+        "weight_mode": weight_mode,
+        "body_mode": body_mode,
+        "sources": _source_digest(BODY_GENERATORS),
+    }
+    digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    for name in sorted(positions):
+        head, tail = positions[name]
+        digest.update(name.encode("utf-8"))
+        digest.update(np.asarray([head, tail], dtype="<f4").tobytes())
+    return digest.hexdigest()
+
+
+def clip_key(clip):
+    """Returns the hex cache key of a clip's sampled tracks."""
+    digest = hashlib.sha256()
+    settings = {
+        "format": FORMAT_VERSION,
+        "clip": [clip.name, clip.frame_start, clip.frame_end, list(clip.bones), clip.data_path],
+        "sources": _source_digest(CLIP_GENERATORS),
+    }
+    digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    digest.update(np.ascontiguousarray(clip.frames, dtype="<f4").tobytes())
+    digest.update(np.ascontiguousarray(clip.values, dtype="<f4").tobytes())
+    return f"clip-{digest.hexdigest()}"
+
+
+class ArtifactCache:
+    """Directory of <key>.npz entries with size-bounded LRU eviction."""
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def get(self, key):
+        """Returns the stored arrays as a dict, or None on a miss."""
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files}
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            # Truncated or corrupt entry: drop it and rebuild
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        # Refresh the entry's position in the LRU order
+        os.utime(path)
+        return arrays
+
+    def put(self, key, arrays):
+        """Stores arrays under key (atomically) and evicts old entries if needed."""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.evict()
+
+    def entries(self):
+        """[(mtime, size, path)] of all cache entries, oldest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".npz"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            found.append((stat.st_mtime, stat.st_size, path))
+        return sorted(found)
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits max_bytes."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            os.remove(path)
+
+
+def build_artifacts(positions, parents, deform_bones, parts=body.BODY_PARTS,
+                    segments=body.CYLINDER_SEGMENTS, sphere_segments=body.SPHERE_SEGMENTS,
+                    sphere_rings=body.SPHERE_RINGS, weight_mode='ANALYTIC', body_mode='PARTS'):
+    """
+    Generates the body artifacts from scratch: geometry arrays and, unless
+    weight_mode is 'AUTO' (Blender computes those), skin weights.
+    """
+    geometry = body.build_body(positions, parts, segments, sphere_segments, sphere_rings, body_mode)
+    arrays = {
+        "vertices": geometry["vertices"],
+        "loop_vertices": geometry["loop_vertices"],
+        "loop_starts": geometry["loop_starts"],
+        "loop_totals": geometry["loop_totals"],
+        "part_index": geometry["part_index"],
+        "part_names": np.array(geometry["part_names"]),
+    }
+    if weight_mode != 'AUTO':
+        bone_names, vertex_weights = weights.compute_weights(geometry, positions, parents, deform_bones, parts)
+        arrays["weight_bones"] = np.array(bone_names)
+        arrays["weights"] = vertex_weights
+    return arrays
+
+
+def load_or_build(positions, parents, deform_bones, parts=body.BODY_PARTS,
+                  segments=body.CYLINDER_SEGMENTS, sphere_segments=body.SPHERE_SEGMENTS,
+                  sphere_rings=body.SPHERE_RINGS, subdivision_levels=2, weight_mode='ANALYTIC',
+                  cache=None, body_mode='PARTS'):
+    """
+    Returns (key, arrays, hit): cached body artifacts for these inputs,
+    building and storing them on a miss. Pass cache=False to bypass the cache.
+    """
+    key = artifact_key(positions, parents, deform_bones, parts, segments, sphere_segments,
+                       sphere_rings, subdivision_levels, weight_mode, body_mode)
+    return _load_or_store(key, cache, lambda: build_artifacts(
+        positions, parents, deform_bones, parts, segments, sphere_segments, sphere_rings, weight_mode, body_mode))
+
+
+def sample_tracks(clip):
+    """A clip sampled on every frame of its range: frames (F,), values (F, B, C) and bones."""
+    frames, values = fk.sample_clip(clip)
+    return {"frames": frames.astype(np.float32), "values": values.astype(np.float32), "bones": np.array(clip.bones)}
+
+
+def load_or_sample(clip, cache=None):
+    """Returns (key, tracks, hit) like load_or_build(), for sample_tracks() of one clip."""
+    return _load_or_store(clip_key(clip), cache, lambda: sample_tracks(clip))
+
+
+def _load_or_store(key, cache, build):
+    if cache is False:
+        return key, build(), False
+    cache = cache or ArtifactCache()
+    arrays = cache.get(key)
+    if arrays is not None:
+        return key, arrays, True
+    arrays = build()
+    cache.put(key, arrays)
+    return key, arrays, False
+
+
+def geometry_from_artifacts(arrays):
+    """The body.build_body()-style geometry dict stored in an artifact set."""
+    geometry = {name: arrays[name] for name in
+                ("vertices", "loop_vertices", "loop_starts", "loop_totals", "part_index")}
+    geometry["part_names"] = [str(name) for name in arrays["part_names"]]
+    return geometry
@@ -0,0 +1,232 @@
+"""
+Clip library file format for the biped animations (NumPy only, no bpy).
+
+A library file holds many named clips. Each clip stores its frame range, the
+frames of its keys and one contiguous float32 track per bone and channel, so
+a loader can memory-map the file and touch only the clips it is asked for.
+
+Layout (little endian):
+    8 bytes   magic b"BPCLIPS\\0"
+    uint32    format version
+    uint32    size of the JSON index in bytes
+    ...       JSON index, padded with spaces to a 16 byte boundary
+    ...       payload: per clip, frames (K,) float32 then tracks (B, C, K) float32
+
+The index lists, per clip: name, frame_start, frame_end, data_path, bones,
+channels, keys and the byte offsets of its frames and tracks in the payload.
+"""
+import json
+import math
+import os
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+MAGIC = b"BPCLIPS\0"
+VERSION = 1
+ALIGNMENT = 16
+
+# The library shipped next to this module, holding the walk, run and jump cycles
+DEFAULT_LIBRARY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "biped_clips.bpc")
+
+# name:        clip name
+# frame_start: first frame of the clip's range
+# frame_end:   last frame of the clip's range
+# frames:      (K,) key frames
+# bones:       bone names, one per track group
+# values:      (K, B, C) channel values per key and bone (radians for rotations)
+# data_path:   pose bone property the channels belong to
+Clip = namedtuple("Clip", "name frame_start frame_end frames bones values data_path")
+
+# Shape of a clip to be written by allocate_library(): `channels` values per
+# bone on each of `keys` keys, the other fields as in Clip
+ClipLayout = namedtuple("ClipLayout", "name frame_start frame_end bones channels keys data_path")
+
+# -------------------------------
+# Built-in cycles, in degrees around X for each key
+# -------------------------------
+CYCLE_BONES = ["Pelvis", "Left_Thigh", "Left_Shin", "Right_Thigh", "Right_Shin",
+               "Left_Upper_Arm", "Right_Upper_Arm"]
+
+BUILTIN_CYCLES = [
+    # Revised Walk Cycle (frames 1 to 25)
+    # 1: left leg forward (knee more bent), right leg extended, moderate arm swing
+    # 13: opposite pose, 25: return to the initial pose
+    ("walk", 1, 25, {
+        1: (5, 25, -20, -5, 5, -15, 15),
+        13: (-5, -5, 5, 25, -20, 15, -15),
+        25: (5, 25, -20, -5, 5, -15, 15),
+    }),
+    # Revised Run Cycle (frames 30 to 48)
+    # 30: start run pose, 39: legs swap roles, 48: loop back to the start
+    ("run", 30, 48, {
+        30: (10, 45, -25, -5, 5, -35, 35),
+        39: (-10, -5, 5, 45, -25, 35, -35),
+        48: (10, 45, -25, -5, 5, -35, 35),
+    }),
+    # Revised Jump Cycle (frames 60 to 80)
+    # 60: crouch, 65: takeoff, 70: mid-air with arms raised, 75: landing, 80: standing
+    ("jump", 60, 80, {
+        60: (-15, -50, 30, -50, 30, 25, -25),
+        65: (0, 0, 0, 0, 0, -10, 10),
+        70: (10, 30, -20, 30, -20, 40, 40),
+        75: (0, -20, 20, -20, 20, 0, 0),
+        80: (0, 0, 0, 0, 0, 0, 0),
+    }),
+]
+
+
+def builtin_clips():
+    """
+    Returns the walk, run and jump cycles as Clip tuples, with the exact key
+    frames and values of the original hand-set keys.
+    """
+    result = []
+    for name, frame_start, frame_end, keys in BUILTIN_CYCLES:
+        frames = np.array(sorted(keys), dtype=np.float32)
+        values = np.zeros((len(frames), len(CYCLE_BONES), 3), dtype=np.float32)
+        values[:, :, 0] = [[math.radians(angle) for angle in keys[int(f)]] for f in frames]
+        result.append(Clip(name, frame_start, frame_end, frames, list(CYCLE_BONES), values, "rotation_euler"))
+    return result
+
+
+def _padded(size):
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def allocate_library(path, layouts):
+    """
+    Creates a library file sized for clips that are not computed yet and
+    returns {clip name: (frames (K,), tracks (B, C, K))} as writable
+    memory-mapped float32 arrays, zero-filled, for streaming writers.
+    layouts: ClipLayout tuples, in library order.
+    """
+    entries = []
+    offset = 0
+    for layout in layouts:
+        frames_offset = offset
+        tracks_offset = _padded(frames_offset + 4 * layout.keys)
+        entries.append({
+            "name": layout.name,
+            "frame_start": layout.frame_start,
+            "frame_end": layout.frame_end,
+            "data_path": layout.data_path,
+            "bones": list(layout.bones),
+            "channels": layout.channels,
+            "keys": layout.keys,
+            "frames_offset": frames_offset,
+            "tracks_offset": tracks_offset,
+        })
+        offset = _padded(tracks_offset + 4 * len(layout.bones) * layout.channels * layout.keys)
+
+    index = json.dumps({"clips": entries}).encode("utf-8")
+    header_size = len(MAGIC) + 8
+    index += b" " * (_padded(header_size + len(index)) - header_size - len(index))
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<II", VERSION, len(index)))
+        f.write(index)
+        payload_start = f.tell()
+        f.truncate(payload_start + offset)
+
+    views = {}
+    if offset:
+        payload = np.memmap(path, dtype=np.uint8, mode="r+", offset=payload_start, shape=(offset,))
+        for entry in entries:
+            start = entry["frames_offset"]
+            frames = payload[start:start + 4 * entry["keys"]].view("<f4")
+            shape = (len(entry["bones"]), entry["channels"], entry["keys"])
+            start = entry["tracks_offset"]
+            tracks = payload[start:start + 4 * shape[0] * shape[1] * shape[2]].view("<f4").reshape(shape)
+            views[entry["name"]] = (frames, tracks)
+    return views
+
+
+def write_library(path, clips):
+    """
+    Writes clips to a library file. Tracks are stored bone-major and
+    channel-major so every (bone, channel) track is one contiguous run.
+    """
+    layouts = []
+    for clip in clips:
+        keys, bones, channels = np.shape(clip.values)
+        if keys != len(clip.frames) or bones != len(clip.bones):
+            raise ValueError(f"Clip '{clip.name}' has values of shape {np.shape(clip.values)} "
+                             f"for {len(clip.frames)} frames and {len(clip.bones)} bones")
+        layouts.append(ClipLayout(clip.name, clip.frame_start, clip.frame_end, list(clip.bones),
+                                  channels, keys, clip.data_path))
+
+    views = allocate_library(path, layouts)
+    for clip in clips:
+        frames, tracks = views[clip.name]
+        frames[:] = np.asarray(clip.frames, dtype=np.float32)
+        tracks[:] = np.transpose(np.asarray(clip.values, dtype=np.float32), (1, 2, 0))
+    for frames, tracks in views.values():
+        frames.base.flush()
+
+
+class ClipLibrary:
+    """
+    Read-only view of a clip library file. Only the JSON index is parsed on
+    open; the payload is memory-mapped and a clip's arrays are paged in when
+    that clip is requested.
+    """
+
+    def __init__(self, path=DEFAULT_LIBRARY):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"'{path}' is not a clip library")
+            version, index_size = struct.unpack("<II", f.read(8))
+            if version != VERSION:
+                raise ValueError(f"Unsupported clip library version {version} in '{path}'")
+            index = json.loads(f.read(index_size).decode("utf-8"))
+            self._payload_start = f.tell()
+        self._entries = {entry["name"]: entry for entry in index["clips"]}
+        self._payload = None
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def names(self):
+        return list(self._entries)
+
+    def frame_range(self, name):
+        entry = self._entries[name]
+        return entry["frame_start"], entry["frame_end"]
+
+    def _map(self):
+        if self._payload is None:
+            self._payload = np.memmap(self.path, dtype=np.uint8, mode="r", offset=self._payload_start)
+        return self._payload
+
+    def tracks(self, name):
+        """Returns the clip's (B, C, K) float32 tracks as a read-only memory-mapped view."""
+        entry = self._entries[name]
+        shape = (len(entry["bones"]), entry["channels"], entry["keys"])
+        start = entry["tracks_offset"]
+        return self._map()[start:start + 4 * shape[0] * shape[1] * shape[2]].view("<f4").reshape(shape)
+
+    def load(self, name):
+        """Returns one clip; values are a (K, B, C) view of the mapped tracks."""
+        entry = self._entries[name]
+        start = entry["frames_offset"]
+        frames = self._map()[start:start + 4 * entry["keys"]].view("<f4")
+        return Clip(name, entry["frame_start"], entry["frame_end"], frames, list(entry["bones"]),
+                    np.transpose(self.tracks(name), (2, 0, 1)), entry["data_path"])
+
+    def load_many(self, names=None):
+        """Returns the requested clips (all of them if names is None), in library order."""
+        wanted = self.names() if names is None else names
+        return [self.load(name) for name in wanted]
+
+
+if __name__ == "__main__":
+    # Regenerates the shipped library from the built-in cycles
+    write_library(DEFAULT_LIBRARY, builtin_clips())
+    print(f"Wrote {len(BUILTIN_CYCLES)} clips to {DEFAULT_LIBRARY}")
@@ -0,0 +1,216 @@
+import os
+import sys
+
+import bpy
+import numpy as np
+
+# Make the sibling modules importable when run from Blender's text editor or --python.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import clips
+import lod
+import mesh
+
+# Number of characters created when run as a script
+CROWD_SIZE = 100
+
+# Give every crowd member a level of detail chosen from its distance to the camera
+USE_LODS = True
+
+
+def ensure_clip_actions(rig_obj, clip_list):
+    """
+    Returns {clip name: Action}, one shared Action per clip named
+    'Clip_<name>'. Existing Actions are reused, so every crowd member (and
+    every later crowd) plays the same key data.
+    """
+    actions = {}
+    for clip in clip_list:
+        action_name = f"Clip_{clip.name}"
+        action = bpy.data.actions.get(action_name)
+        if action is None:
+            action = bpy.data.actions.new(action_name)
+            mesh.write_clip_fcurves(rig_obj, clip.bones, clip.frames, clip.values,
+                                    data_path=clip.data_path, action=action)
+            # Keep the clip when no object uses it directly (only NLA strips do)
+            action.use_fake_user = True
+        actions[clip.name] = action
+    return actions
+
+
+def crowd_layout(count, spacing=1.5, jitter=0.3, rate_range=(0.8, 1.2), clip_count=1, seed=None):
+    """
+    Draws the per-instance parameters for a crowd in one go: grid positions
+    with jitter (N, 3), yaw angles (N,), clip indices (N,), phase offsets in
+    frames (N,) and playback rates (N,).
+    """
+    rng = np.random.default_rng(seed)
+    columns = int(np.ceil(np.sqrt(count)))
+    grid = np.stack(np.divmod(np.arange(count), columns), axis=-1)[:, ::-1].astype(np.float64)
+    positions = np.zeros((count, 3))
+    positions[:, :2] = (grid - (columns - 1) / 2.0) * spacing + rng.uniform(-jitter, jitter, (count, 2))
+    return {
+        "positions": positions,
+        "yaw": rng.uniform(0.0, 2.0 * np.pi, count),
+        "clip": rng.integers(0, clip_count, count),
+        "offset": rng.uniform(0.0, 24.0, count),
+        "rate": rng.uniform(rate_range[0], rate_range[1], count),
+    }
+
+
+def strip_timing(offset, rate, frame_start, frame_end, scene_start, scene_end):
+    """
+    NLA strip timing of a crowd member playing a clip (frame_start ..
+    frame_end) at `rate`, `offset` scene frames into its cycle on the
+    scene's first frame. Returns (start, scale, repeat): the strip starts up
+    to one cycle before scene_start, so every member is already mid-cycle on
+    the first frame instead of holding its first pose, and repeats until
+    scene_end. Offsets of a cycle or more, or negative ones, wrap around it.
+    """
+    scale = 1.0 / rate
+    cycle = np.maximum((frame_end - frame_start) * scale, 1e-6)
+    start = scene_start - np.mod(offset, cycle)
+    repeat = np.maximum(1.0, np.ceil((scene_end - start) / cycle))
+    return start, scale, repeat
+
+
+def create_crowd(count=CROWD_SIZE, rig_obj=None, mesh_obj=None, clip_names=("walk", "run"),
+                 library_path=clips.DEFAULT_LIBRARY, collection_name="BipedCrowd", seed=None, **layout):
+    """
+    Creates `count` characters that share a single BipedArmature, a single
+    AlignedHumanMesh and one Action per clip. Every instance is a pair of
+    linked duplicates (armature object + mesh object) that only differ by
+    transform and by one NLA strip selecting its clip, phase offset and
+    playback rate, so the memory per character stays roughly constant no
+    matter how large the mesh or the clips are. Returns the rig instances.
+    """
+    rig_obj = rig_obj or bpy.data.objects.get("BipedRig")
+    mesh_obj = mesh_obj or bpy.data.objects.get("AlignedHumanMesh")
+    if rig_obj is None or mesh_obj is None:
+        raise Exception("BipedRig and AlignedHumanMesh are needed! Please run the rig and mesh scripts first.")
+
+    clip_list = clips.ClipLibrary(library_path).load_many(list(clip_names))
+    actions = ensure_clip_actions(rig_obj, clip_list)
+    params = crowd_layout(count, clip_count=len(clip_list), seed=seed, **layout)
+
+    collection = bpy.data.collections.get(collection_name)
+    if collection is None:
+        collection = bpy.data.collections.new(collection_name)
+        bpy.context.scene.collection.children.link(collection)
+
+    scene_start = bpy.context.scene.frame_start
+    scene_end = bpy.context.scene.frame_end
+    instances = []
+    for i in range(count):
+        # Linked duplicates: object.copy() shares the armature and mesh datablocks
+        rig_inst = rig_obj.copy()
+        rig_inst.name = f"{rig_obj.name}_{i:04d}"
+        rig_inst.location = params["positions"][i]
+        rig_inst.rotation_euler = (0.0, 0.0, params["yaw"][i])
+        collection.objects.link(rig_inst)
+
+        # The IK constraints live on the pose, so point them at this instance
+        for pose_bone in rig_inst.pose.bones:
+            for constraint in pose_bone.constraints:
+                if getattr(constraint, "target", None) == rig_obj:
+                    constraint.target = rig_inst
+                if getattr(constraint, "pole_target", None) == rig_obj:
+                    constraint.pole_target = rig_inst
+
+        mesh_inst = mesh_obj.copy()
+        mesh_inst.name = f"{mesh_obj.name}_{i:04d}"
+        mesh_inst.parent = rig_inst
+        for modifier in mesh_inst.modifiers:
+            if modifier.type == 'ARMATURE':
+                modifier.object = rig_inst
+        collection.objects.link(mesh_inst)
+
+        # Playback through a single NLA strip on the shared clip Action
+        clip = clip_list[params["clip"][i]]
+        anim_data = rig_inst.animation_data or rig_inst.animation_data_create()
+        anim_data.action = None
+        track = anim_data.nla_tracks.new()
+        track.name = "Crowd"
+        start, scale, repeat = strip_timing(params["offset"][i], params["rate"][i], clip.frame_start,
+                                            clip.frame_end, scene_start, scene_end)
+        strip = track.strips.new(clip.name, int(np.floor(start)), actions[clip.name])
+        strip.action_frame_start = clip.frame_start
+        strip.action_frame_end = clip.frame_end
+        strip.scale = scale
+        strip.repeat = repeat
+        if hasattr(strip, "frame_start_ui"):
+            # Moves the whole strip to the fractional start (Blender 3.3+)
+            strip.frame_start_ui = start
+        instances.append(rig_inst)
+    return instances
+
+
+def setup_lods(rig_obj, mesh_obj, lods=lod.LODS):
+    """
+    Builds the LOD meshes for the character (see lod.py) and records them on
+    mesh_obj as 'biped_lod_meshes', so linked duplicates made from it can
+    switch between them. Returns the mesh names, nearest first.
+    """
+    parents, deform = mesh.bone_hierarchy(rig_obj)
+    levels = lod.build_lods(mesh.bone_positions(rig_obj), parents, deform, lods)
+    names = mesh.build_lod_meshes(rig_obj, levels, base_name=mesh_obj.name)
+    mesh_obj["biped_lod_meshes"] = names
+    mesh_obj["biped_height"] = lod.character_height(levels[0]["geometry"])
+    return names
+
+
+def update_lods(mesh_objects, camera=None, lods=lod.LODS):
+    """
+    Chooses the LOD of every object (that has 'biped_lod_meshes') from its
+    projected height through the scene camera. Returns the LOD indices.
+    """
+    mesh_objects = [obj for obj in mesh_objects if obj.get("biped_lod_meshes")]
+    scene = bpy.context.scene
+    camera = camera or scene.camera
+    if camera is None or not mesh_objects:
+        return []
+    render = scene.render
+    resolution = render.resolution_y * render.resolution_percentage / 100.0
+    eye = np.array(camera.matrix_world.translation)
+    centres = np.array([obj.matrix_world.translation for obj in mesh_objects])
+    heights = np.array([obj.get("biped_height", 2.0) for obj in mesh_objects])
+    distances = np.linalg.norm(centres - eye, axis=1)
+    chosen = lod.select(lod.screen_height(distances, heights, camera.data.angle_y, resolution), lods)
+    for obj, index in zip(mesh_objects, chosen):
+        if obj.get("biped_lod") != index:
+            mesh.apply_lod(obj, int(index))
+    return chosen
+
+
+@bpy.app.handlers.persistent
+def lod_handler(scene, *args):
+    """
+    Frame change / render handler re-selecting the LODs of the crowd whose
+    collection is named by the scene's 'biped_lod_collection'. Persistent
+    and looked up by name on every call, so it keeps working after the
+    .blend file is saved and opened again.
+    """
+    collection = bpy.data.collections.get(scene.get("biped_lod_collection", "BipedCrowd"))
+    if collection is not None:
+        update_lods([obj for obj in collection.objects if obj.type == 'MESH'])
+
+
+def register_lod_handler(collection_name="BipedCrowd", scene=None):
+    """Re-selects the LODs of the crowd members on every frame change and before rendering."""
+    scene = scene or bpy.context.scene
+    scene["biped_lod_collection"] = collection_name
+    for handlers in (bpy.app.handlers.frame_change_pre, bpy.app.handlers.render_pre):
+        for existing in [h for h in handlers if getattr(h, "__name__", "") == lod_handler.__name__]:
+            handlers.remove(existing)
+        handlers.append(lod_handler)
+    return lod_handler
+
+
+if __name__ == "__main__":
+    if USE_LODS:
+        setup_lods(bpy.data.objects["BipedRig"], bpy.data.objects["AlignedHumanMesh"])
+    members = create_crowd()
+    if USE_LODS:
+        register_lod_handler()
+        update_lods([obj for obj in bpy.data.collections["BipedCrowd"].objects if obj.type == 'MESH'])
+    print(f"Crowd of {len(members)} bipeds created, sharing one armature, mesh and clip set!")
@@ -0,0 +1,135 @@
+"""
+NumPy evaluation of Blender F-curves with auto-clamped Bezier keys (no bpy).
+
+Mirrors Blender's handle calculation for F-curves (BKE_nurb_handle_calc with
+auto-clamped handles, auto smoothing 'NONE', constant extrapolation) so that
+curves written by mesh.write_clip_fcurves() can be sampled outside Blender.
+All curves of a clip share their key frames, so the Bezier parameter for each
+sample frame is solved once and reused for every curve.
+"""
+import numpy as np
+
+# Blender's handle length factor for auto handles
+HANDLE_FACTOR = 2.5614
+
+
+def handles_from_neighbors(xp, yp, x, y, xn, yn, has_prev, has_next):
+    """
+    Auto-clamped handles of keys (x, y) given their previous and next keys.
+    Every argument broadcasts together; has_prev / has_next flag whether a
+    real neighbour exists (end keys get flat handles, as with constant
+    extrapolation). Returns (left_x, left_y, right_x, right_y).
+    """
+    xp = np.where(has_prev, xp, 2.0 * x - xn)
+    yp = np.where(has_prev, yp, 2.0 * y - yn)
+    xn = np.where(has_next, xn, 2.0 * x - xp)
+    yn = np.where(has_next, yn, 2.0 * y - yp)
+
+    len_a = x - xp
+    len_b = xn - x
+    len_a = np.where(len_a == 0.0, 1.0, len_a)
+    len_b = np.where(len_b == 0.0, 1.0, len_b)
+
+    tvec_x = (xn - x) / len_b + (x - xp) / len_a
+    tvec_y = (yn - y) / len_b + (y - yp) / len_a
+    length = tvec_x * HANDLE_FACTOR
+    length = np.where(length == 0.0, 1.0, length)
+
+    len_a = np.minimum(len_a, 5.0 * len_b)
+    len_b = np.minimum(len_b, 5.0 * len_a)
+
+    left_x = x - tvec_x * len_a / length
+    left_y = y - tvec_y * len_a / length
+    right_x = x + tvec_x * len_b / length
+    right_y = y + tvec_y * len_b / length
+
+    # Clamping: extremes get flat handles, others may not overshoot their neighbours
+    interior = has_prev & has_next
+    ydiff1 = yp - y
+    ydiff2 = yn - y
+    extreme = ((ydiff1 <= 0.0) & (ydiff2 <= 0.0)) | ((ydiff1 >= 0.0) & (ydiff2 >= 0.0))
+    rising = ydiff1 <= 0.0
+
+    left_over = np.where(rising, yp > left_y, yp < left_y)
+    left_violate = interior & (extreme | left_over)
+    left_y = np.where(interior & extreme, y, np.where(left_violate, yp, left_y))
+
+    right_over = np.where(rising, yn < right_y, yn > right_y)
+    right_violate = interior & (extreme | right_over)
+    right_y = np.where(interior & extreme, y, np.where(right_violate, yn, right_y))
+
+    # Keep the two handles aligned after clamping one of them
+    h1_x = left_x - x
+    h2_x = x - right_x
+    with np.errstate(divide='ignore', invalid='ignore'):
+        aligned_right = y + ((y - left_y) / h1_x) * h2_x
+        aligned_left = y + ((y - right_y) / h2_x) * h1_x
+    right_y = np.where(left_violate, aligned_right, right_y)
+    left_y = np.where(right_violate & ~left_violate, aligned_left, left_y)
+
+    # End keys are flattened (constant extrapolation)
+    end = ~interior
+    left_y = np.where(end, y, left_y)
+    right_y = np.where(end, y, right_y)
+    return left_x, left_y, right_x, right_y
+
+
+def handles(x, y):
+    """
+    Auto-clamped handles for keys at frames x (K,) with values y (..., K).
+    Returns (left_x (K,), left_y (..., K), right_x (K,), right_y (..., K)).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    count = x.shape[-1]
+    idx = np.arange(count)
+    prev = np.maximum(idx - 1, 0)
+    nxt = np.minimum(idx + 1, count - 1)
+    has_prev = idx > 0
+    has_next = idx < count - 1
+    if count == 1:
+        return x.copy(), y.copy(), x.copy(), y.copy()
+    left_x, left_y, right_x, right_y = handles_from_neighbors(
+        x[prev], y[..., prev], x, y, x[nxt], y[..., nxt], has_prev, has_next)
+    return np.broadcast_to(left_x, x.shape), left_y, np.broadcast_to(right_x, x.shape), right_y
+
+
+def solve_bezier_t(x0, x1, x2, x3, f, iterations=40):
+    """
+    Solves x(t) = f on the Bezier segment with control x values x0..x3 (all
+    broadcasting together) for t in [0, 1], by bisection (x(t) is monotonic
+    for F-curve segments).
+    """
+    lo = np.zeros(np.broadcast(x0, x1, x2, x3, f).shape)
+    hi = np.ones_like(lo)
+    for _ in range(iterations):
+        t = 0.5 * (lo + hi)
+        u = 1.0 - t
+        xt = u * u * u * x0 + 3.0 * u * u * t * x1 + 3.0 * u * t * t * x2 + t * t * t * x3
+        below = xt < f
+        lo = np.where(below, t, lo)
+        hi = np.where(below, hi, t)
+    return 0.5 * (lo + hi)
+
+
+def bezier_value(y0, y1, y2, y3, t):
+    u = 1.0 - t
+    return u * u * u * y0 + 3.0 * u * u * t * y1 + 3.0 * u * t * t * y2 + t * t * t * y3
+
+
+def evaluate(x, y, frames):
+    """
+    Samples curves whose keys share the frames x (K,) with values y (..., K)
+    at the given frames (F,). Returns (..., F), constant outside the key range.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    frames = np.asarray(frames, dtype=np.float64)
+    if len(x) == 1:
+        return np.repeat(y, len(frames), axis=-1)
+
+    left_x, left_y, right_x, right_y = handles(x, y)
+    seg = np.clip(np.searchsorted(x, frames, side='right') - 1, 0, len(x) - 2)
+    clamped = np.clip(frames, x[0], x[-1])
+    t = solve_bezier_t(x[seg], right_x[seg], left_x[seg + 1], x[seg + 1], clamped)
+    return bezier_value(y[..., seg], right_y[..., seg], left_y[..., seg + 1], y[..., seg + 1], t)
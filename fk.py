@@ -0,0 +1,216 @@
+"""
+Forward kinematics for the BipedRig hierarchy in pure NumPy (no bpy).
+
+Rest matrices are built from the skeleton table the same way Blender builds
+them from edit bones (vec_roll_to_mat3 with roll 0, head as translation), and
+pose matrices follow Blender's pose evaluation for bones with default
+inheritance:
+
+    pose[bone] = pose[parent] @ inverse(rest[parent]) @ rest[bone] @ basis[bone]
+
+where basis is the local transform from the bone's keyed channels. Bones are
+processed level by level in parent-first order, each level vectorized over
+every frame and every bone at that depth, so there is no Python loop per
+frame or per bone.
+
+The results match Blender's pose for the keyed rotations when the IK
+constraints are muted; IK chains are solved separately by ik.py.
+"""
+import numpy as np
+
+import clips
+import fcurve
+import skeleton
+
+# Below this the bone direction counts as pointing straight down -Y (Blender's thresholds)
+SAFE_THRESHOLD = 6.1e-3
+CRITICAL_THRESHOLD = 2.5e-4
+
+
+def vec_roll_to_mat3(directions, rolls=0.0):
+    """
+    Blender's vec_roll_to_mat3: (N, 3) bone directions and rolls -> (N, 3, 3)
+    rotation matrices whose Y axis points along the bone.
+    """
+    d = np.asarray(directions, dtype=np.float64)
+    d = d / np.linalg.norm(d, axis=-1, keepdims=True)
+    x, y, z = d[..., 0], d[..., 1], d[..., 2]
+
+    theta = 1.0 + y
+    theta_alt = x * x + z * z
+    regular = (theta > SAFE_THRESHOLD) | (theta_alt > CRITICAL_THRESHOLD * CRITICAL_THRESHOLD)
+    theta = np.where(theta <= SAFE_THRESHOLD, theta_alt * 0.5 + theta_alt * theta_alt * 0.125, theta)
+    theta = np.where(regular, theta, 1.0)
+
+    mat = np.empty(d.shape[:-1] + (3, 3))
+    mat[..., 0, 0] = 1.0 - x * x / theta
+    mat[..., 1, 0] = -x
+    mat[..., 2, 0] = -x * z / theta
+    mat[..., 0, 1] = x
+    mat[..., 1, 1] = y
+    mat[..., 2, 1] = z
+    mat[..., 0, 2] = -x * z / theta
+    mat[..., 1, 2] = -z
+    mat[..., 2, 2] = 1.0 - z * z / theta
+    mat[~regular] = np.diag([-1.0, -1.0, 1.0])
+
+    rolls = np.broadcast_to(np.asarray(rolls, dtype=np.float64), d.shape[:-1])
+    return axis_angle_to_mat3(d, rolls) @ mat
+
+
+def axis_angle_to_mat3(axes, angles):
+    """Rotation matrices (..., 3, 3) for unit axes (..., 3) and angles (...)."""
+    axes = np.asarray(axes, dtype=np.float64)
+    angles = np.asarray(angles, dtype=np.float64)
+    x, y, z = axes[..., 0], axes[..., 1], axes[..., 2]
+    c, s = np.cos(angles), np.sin(angles)
+    t = 1.0 - c
+    return np.stack([
+        np.stack([t * x * x + c, t * x * y - s * z, t * x * z + s * y], axis=-1),
+        np.stack([t * x * y + s * z, t * y * y + c, t * y * z - s * x], axis=-1),
+        np.stack([t * x * z - s * y, t * y * z + s * x, t * z * z + c], axis=-1),
+    ], axis=-2)
+
+
+def euler_to_mat3(euler):
+    """
+    Euler XYZ rotations (..., 3) -> (..., 3, 3) matrices, Blender's
+    rotation_mode 'XYZ' (X applied first, so R = Rz @ Ry @ Rx).
+    """
+    euler = np.asarray(euler, dtype=np.float64)
+    cx, cy, cz = np.cos(euler[..., 0]), np.cos(euler[..., 1]), np.cos(euler[..., 2])
+    sx, sy, sz = np.sin(euler[..., 0]), np.sin(euler[..., 1]), np.sin(euler[..., 2])
+    return np.stack([
+        np.stack([cy * cz, sx * sy * cz - cx * sz, cx * sy * cz + sx * sz], axis=-1),
+        np.stack([cy * sz, sx * sy * sz + cx * cz, cx * sy * sz - sx * cz], axis=-1),
+        np.stack([-sy, sx * cy, cx * cy], axis=-1),
+    ], axis=-2)
+
+
+def mat3_to_euler(mat):
+    """Inverse of euler_to_mat3 for (..., 3, 3) rotation matrices."""
+    mat = np.asarray(mat, dtype=np.float64)
+    cy = np.hypot(mat[..., 0, 0], mat[..., 1, 0])
+    regular = cy > 16.0 * np.finfo(np.float32).eps
+    x = np.where(regular, np.arctan2(mat[..., 2, 1], mat[..., 2, 2]), np.arctan2(-mat[..., 1, 2], mat[..., 1, 1]))
+    y = np.arctan2(-mat[..., 2, 0], cy)
+    z = np.where(regular, np.arctan2(mat[..., 1, 0], mat[..., 0, 0]), 0.0)
+    return np.stack([x, y, z], axis=-1)
+
+
+def rest_matrices(heads, tails, rolls=0.0):
+    """(B, 4, 4) armature-space rest matrices from bone heads and tails."""
+    heads = np.asarray(heads, dtype=np.float64)
+    mats = np.zeros((len(heads), 4, 4))
+    mats[:, :3, :3] = vec_roll_to_mat3(np.asarray(tails, dtype=np.float64) - heads, rolls)
+    mats[:, :3, 3] = heads
+    mats[:, 3, 3] = 1.0
+    return mats
+
+
+def depth_levels(parents):
+    """Groups bone indices by hierarchy depth: [[roots], [children of roots], ...]."""
+    parents = np.asarray(parents)
+    depth = np.full(len(parents), -1)
+    depth[parents < 0] = 0
+    while (depth < 0).any():
+        ready = (depth < 0) & (depth[parents] >= 0) & (parents >= 0)
+        if not ready.any():
+            raise ValueError("Bone hierarchy has a cycle or an unknown parent")
+        depth[ready] = depth[parents[ready]] + 1
+    return [np.flatnonzero(depth == level) for level in range(depth.max() + 1)]
+
+
+class Rig:
+    """
+    Rest data of an armature prepared for batched FK: bone names, parent
+    indices, rest matrices, the parent-relative rest offsets and the depth
+    levels used to evaluate the hierarchy parent-first.
+    """
+
+    def __init__(self, bones=skeleton.BONES):
+        arrays = skeleton.as_arrays(bones)
+        self.names = arrays["names"]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.parents = arrays["parents"]
+        self.deform = arrays["deform"]
+        self.heads = arrays["heads"]
+        self.tails = arrays["tails"]
+        self.lengths = np.linalg.norm(self.tails - self.heads, axis=1)
+        self.rest = rest_matrices(self.heads, self.tails)
+        parent_rest = np.where((self.parents >= 0)[:, None, None], self.rest[self.parents], np.eye(4))
+        self.offsets = np.linalg.inv(parent_rest) @ self.rest
+        self.levels = depth_levels(self.parents)
+
+    def pose_matrices(self, basis):
+        """
+        basis: (F, B, 4, 4) local transforms per frame and bone (identity for
+        unkeyed bones). Returns (F, B, 4, 4) armature-space pose matrices.
+        """
+        local = self.offsets[None] @ basis
+        pose = np.empty_like(local)
+        for level in self.levels:
+            parents = self.parents[level]
+            roots = parents < 0
+            pose[:, level[roots]] = local[:, level[roots]]
+            if (~roots).any():
+                pose[:, level[~roots]] = pose[:, parents[~roots]] @ local[:, level[~roots]]
+        return pose
+
+    def basis_from_rotations(self, bone_names, euler):
+        """
+        Builds (F, B, 4, 4) basis matrices from Euler XYZ rotations (F, b, 3)
+        of the named bones; all other bones stay at their rest pose.
+        """
+        euler = np.asarray(euler, dtype=np.float64)
+        basis = np.broadcast_to(np.eye(4), (euler.shape[0], len(self.names), 4, 4)).copy()
+        columns = [self.index[name] for name in bone_names]
+        basis[:, columns, :3, :3] = euler_to_mat3(euler)
+        return basis
+
+    def heads_tails(self, pose):
+        """Armature-space head and tail positions (F, B, 3) of posed bones."""
+        heads = pose[..., :3, 3]
+        tails = heads + pose[..., :3, 1] * self.lengths[:, None]
+        return heads, tails
+
+
+def sample_clip(clip, frames=None):
+    """
+    Samples a clip's keyed channels at the given frames (default: every frame
+    of the clip's range) exactly as Blender evaluates the F-curves written by
+    mesh.write_clip_fcurves(). Returns (frames (F,), values (F, B, C)).
+    """
+    if frames is None:
+        frames = np.arange(clip.frame_start, clip.frame_end + 1)
+    frames = np.asarray(frames, dtype=np.float64)
+    tracks = np.transpose(np.asarray(clip.values, dtype=np.float64), (1, 2, 0))
+    values = fcurve.evaluate(np.asarray(clip.frames, dtype=np.float64), tracks, frames)
+    return frames, np.transpose(values, (2, 0, 1))
+
+
+def evaluate_clip(clip, frames=None, rig=None):
+    """
+    World-space (armature-space) bone matrices for every frame of a clip.
+    Returns (frames (F,), pose (F, B, 4, 4)) with bones in rig.names order.
+    """
+    rig = rig or Rig()
+    if clip.data_path != "rotation_euler":
+        raise ValueError(f"Unsupported clip data path '{clip.data_path}'")
+    frames, values = sample_clip(clip, frames)
+    return frames, rig.pose_matrices(rig.basis_from_rotations(clip.bones, values))
+
+
+def evaluate_library(library, names=None, rig=None):
+    """Evaluates several clips of a clips.ClipLibrary; returns {name: (frames, pose)}."""
+    rig = rig or Rig()
+    return {clip.name: evaluate_clip(clip, rig=rig) for clip in library.load_many(names)}
+
+
+if __name__ == "__main__":
+    rig = Rig()
+    for clip in clips.ClipLibrary().load_many():
+        frames, pose = evaluate_clip(clip, rig=rig)
+        heads, tails = rig.heads_tails(pose)
+        lowest = min(heads[:, rig.deform, 2].min(), tails[:, rig.deform, 2].min())
+        print(f"{clip.name}: {len(frames)} frames, lowest deform bone point z = {lowest:.3f}")
@@ -0,0 +1,108 @@
+"""
+Procedural gait generator for the biped (NumPy only, no bpy).
+
+The walk and run cycles are mirrored sinusoids: the left side follows the
+phase of the cycle and the right side runs half a cycle behind. The model
+reproduces the hand-set keys of both cycles exactly at their key frames:
+
+    Pelvis       pelvis_tilt * cos(phase)
+    Thigh        stride * (1 + cos(phase)) / 2 - THIGH_EXTENSION
+    Shin         SHIN_EXTENSION - knee_bend * (1 + cos(phase)) / 2
+    Upper_Arm    -arm_swing * cos(phase)
+
+with phase = 2 pi * (cadence * (frame - frame_start) / fps + phase_offset).
+Angles are in degrees, cadence in cycles per second and phase_offset in
+cycles. Everything is vectorized over frames and over parameter sets.
+"""
+import numpy as np
+
+import clips
+
+GAIT_BONES = list(clips.CYCLE_BONES)
+PARAMETERS = ("stride", "cadence", "knee_bend", "arm_swing", "pelvis_tilt", "phase_offset")
+
+# Backward swing of the trailing thigh and straightening of the trailing shin, in degrees
+THIGH_EXTENSION = 5.0
+SHIN_EXTENSION = 5.0
+
+FPS = 24.0
+
+# Parameter sets matching the walk (frames 1-25) and run (frames 30-48) cycles at 24 fps
+WALK = {"stride": 30.0, "cadence": 1.0, "knee_bend": 25.0, "arm_swing": 15.0,
+        "pelvis_tilt": 5.0, "phase_offset": 0.0}
+RUN = {"stride": 50.0, "cadence": 24.0 / 18.0, "knee_bend": 30.0, "arm_swing": 35.0,
+       "pelvis_tilt": 10.0, "phase_offset": 0.0}
+
+
+def _parameter_arrays(params):
+    missing = [name for name in PARAMETERS if name not in params]
+    if missing:
+        raise ValueError(f"Missing gait parameters: {missing}")
+    arrays = np.broadcast_arrays(*[np.asarray(params[name], dtype=np.float64) for name in PARAMETERS])
+    return dict(zip(PARAMETERS, (np.atleast_1d(a) for a in arrays)))
+
+
+def generate(params, frames, frame_start=None, fps=FPS):
+    """
+    Generates gait clips for many parameter sets at once.
+
+    params:      mapping of every name in PARAMETERS to a scalar or an (N,) array
+    frames:      (F,) frames to sample, usually np.arange(start, end + 1)
+    frame_start: frame where phase 0 lies (defaults to frames[0])
+    Returns (N, F, B, 3) float32 Euler XYZ rotations in radians for the bones
+    in GAIT_BONES, ready for mesh.write_clip_fcurves(rig, GAIT_BONES, frames, values[i]).
+    """
+    p = _parameter_arrays(params)
+    frames = np.asarray(frames, dtype=np.float64)
+    if frame_start is None:
+        frame_start = frames[0]
+
+    t = (frames - frame_start)[None, :] / fps
+    phase = 2.0 * np.pi * (p["cadence"][:, None] * t + p["phase_offset"][:, None])
+    left = np.cos(phase)
+    right = np.cos(phase + np.pi)
+
+    def col(name):
+        return p[name][:, None]
+
+    angles = np.stack([
+        col("pelvis_tilt") * left,
+        col("stride") * (1.0 + left) / 2.0 - THIGH_EXTENSION,
+        SHIN_EXTENSION - col("knee_bend") * (1.0 + left) / 2.0,
+        col("stride") * (1.0 + right) / 2.0 - THIGH_EXTENSION,
+        SHIN_EXTENSION - col("knee_bend") * (1.0 + right) / 2.0,
+        -col("arm_swing") * left,
+        -col("arm_swing") * right,
+    ], axis=-1)
+
+    values = np.zeros(angles.shape + (3,), dtype=np.float32)
+    values[..., 0] = np.radians(angles)
+    return values
+
+
+def random_params(count, base=WALK, spread=0.15, seed=None):
+    """
+    Draws `count` parameter sets around `base`, each parameter scaled by a
+    uniform factor in [1 - spread, 1 + spread]; phase offsets are uniform over
+    the whole cycle so a crowd does not step in sync.
+    """
+    rng = np.random.default_rng(seed)
+    params = {name: base[name] * rng.uniform(1.0 - spread, 1.0 + spread, count)
+              for name in PARAMETERS if name != "phase_offset"}
+    params["phase_offset"] = rng.uniform(0.0, 1.0, count)
+    return params
+
+
+def to_clips(prefix, params, frames, frame_start=None, fps=FPS):
+    """
+    Generates clips for every parameter set and wraps them as clips.Clip
+    tuples named '<prefix>_<index>', e.g. to store them with clips.write_library().
+    """
+    frames = np.asarray(frames, dtype=np.float32)
+    values = generate(params, frames, frame_start, fps)
+    width = len(str(len(values) - 1))
+    return [
+        clips.Clip(f"{prefix}_{i:0{width}d}", int(frames[0]), int(frames[-1]), frames,
+                   list(GAIT_BONES), values[i], "rotation_euler")
+        for i in range(len(values))
+    ]
@@ -0,0 +1,384 @@
+"""
+Headless glTF 2.0 binary (.glb) export of the rig, body mesh and clips
+(NumPy only, no bpy).
+
+One file holds the BipedRig skeleton as a node hierarchy, the body mesh
+skinned to it and one animation per clip:
+
+    BipedRig          root node turning the Z-up rig space into glTF's Y-up
+      Pelvis ...      one node per bone, rest pose as parent-relative TRS
+      BipedMesh       triangulated body with POSITION, NORMAL, JOINTS_0 and
+                      WEIGHTS_0, skinned with inverse bind matrices
+
+Bone animations are the clips with the rig's IK chains baked into plain FK
+rotations for the character's proportions (ik.bake_clip(); glTF has no
+constraints, so unbaked legs and arms would ignore their IK targets),
+sampled on every frame of their range (the way Blender evaluates the keyed
+F-curves, see fk.sample_clip()) and stored as LINEAR rotation quaternions,
+one channel per keyed bone, with the time of the clip's first frame at zero. The mesh is the subdivision cage; the
+Subdivision Surface levels mesh.py adds in Blender are not applied.
+
+Every accessor is backed by a contiguous NumPy array in its final binary
+layout (little endian, column-major matrices), and the BIN chunk is written
+straight from those arrays, so no value goes through a Python list.
+export_many() streams any number of characters to disk, one file at a time
+or on a process pool with a bounded number of characters in flight.
+"""
+import argparse
+import json
+import os
+import struct
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+import body
+import cache
+import clips
+import fk
+import gait
+import ik
+import skeleton
+
+GLB_MAGIC = b"glTF"
+GLB_VERSION = 2
+JSON_CHUNK = b"JSON"
+BIN_CHUNK = b"BIN\0"
+
+# Body mode of the exported mesh (the one mesh.py builds in Blender)
+BODY_MODE = 'PARTS'
+
+# Bake the IK chains into the exported clips (export_character())
+BAKE_IK = True
+
+# Characters queued per worker process in export_many()
+JOBS_PER_WORKER = 2
+
+# Bone influences per vertex (one JOINTS_0 / WEIGHTS_0 set)
+MAX_INFLUENCES = 4
+
+# Rotation of the root node, -90 degrees around X: rig Z-up -> glTF Y-up (x, y, z, w)
+Z_UP_TO_Y_UP = (-np.sqrt(0.5), 0.0, 0.0, np.sqrt(0.5))
+
+# Accessor component types and element types
+_COMPONENT_TYPES = {np.dtype("<f4"): 5126, np.dtype("u1"): 5121, np.dtype("<u2"): 5123, np.dtype("<u4"): 5125}
+_ELEMENT_TYPES = {(): "SCALAR", (2,): "VEC2", (3,): "VEC3", (4,): "VEC4", (4, 4): "MAT4"}
+_ARRAY_BUFFER = 34962
+_ELEMENT_ARRAY_BUFFER = 34963
+
+# name:      file name (without extension) and root node name
+# bones:     skeleton bone table, e.g. skeleton.BONES or skeleton.transformed(...)
+# body_mode: body.BODY_MODES entry the mesh is built with
+Character = namedtuple("Character", "name bones body_mode")
+
+
+def mat3_to_quat(mat):
+    """(..., 3, 3) rotation matrices -> (..., 4) unit quaternions in glTF order (x, y, z, w)."""
+    m = np.asarray(mat, dtype=np.float64)
+    m00, m11, m22 = m[..., 0, 0], m[..., 1, 1], m[..., 2, 2]
+    candidates = np.stack([
+        1.0 + m00 + m11 + m22,
+        1.0 + m00 - m11 - m22,
+        1.0 - m00 + m11 - m22,
+        1.0 - m00 - m11 + m22,
+    ], axis=-1)
+    case = np.argmax(candidates, axis=-1)
+    s = 2.0 * np.sqrt(np.maximum(np.take_along_axis(candidates, case[..., None], axis=-1)[..., 0], 1e-12))
+    d21, d02, d10 = m[..., 2, 1] - m[..., 1, 2], m[..., 0, 2] - m[..., 2, 0], m[..., 1, 0] - m[..., 0, 1]
+    s01, s02, s12 = m[..., 0, 1] + m[..., 1, 0], m[..., 0, 2] + m[..., 2, 0], m[..., 1, 2] + m[..., 2, 1]
+    quat = np.select([(case == k)[..., None] for k in range(4)], [
+        np.stack([d21 / s, d02 / s, d10 / s, 0.25 * s], axis=-1),
+        np.stack([0.25 * s, s01 / s, s02 / s, d21 / s], axis=-1),
+        np.stack([s01 / s, 0.25 * s, s12 / s, d02 / s], axis=-1),
+        np.stack([s02 / s, s12 / s, 0.25 * s, d10 / s], axis=-1),
+    ])
+    return quat / np.linalg.norm(quat, axis=-1, keepdims=True)
+
+
+def continuous_quats(quats):
+    """Flips signs along axis 0 so consecutive quaternions (F, ..., 4) lie in the same hemisphere."""
+    dots = np.sum(quats[1:] * quats[:-1], axis=-1)
+    signs = np.cumprod(np.where(dots < 0.0, -1.0, 1.0), axis=0)
+    quats = quats.copy()
+    quats[1:] *= signs[..., None]
+    return quats
+
+
+def triangulate(geometry):
+    """(T, 3) triangle fans of the polygons of a body.build_body()-style geometry."""
+    starts = np.asarray(geometry["loop_starts"], dtype=np.int64)
+    totals = np.asarray(geometry["loop_totals"], dtype=np.int64)
+    loops = np.asarray(geometry["loop_vertices"], dtype=np.int64)
+    counts = totals - 2
+    first = np.repeat(starts, counts)
+    step = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+    return loops[np.stack([first, first + step, first + step + 1], axis=-1)]
+
+
+def vertex_normals(vertices, triangles):
+    """Area-weighted (V, 3) unit vertex normals."""
+    v = np.asarray(vertices, dtype=np.float64)
+    face = np.cross(v[triangles[:, 1]] - v[triangles[:, 0]], v[triangles[:, 2]] - v[triangles[:, 0]])
+    normals = np.stack([np.bincount(triangles.ravel(), np.repeat(face[:, k], 3), minlength=len(v))
+                        for k in range(3)], axis=-1)
+    length = np.linalg.norm(normals, axis=-1, keepdims=True)
+    return np.where(length > 1e-12, normals / np.maximum(length, 1e-12), [0.0, 0.0, 1.0])
+
+
+def influences(vertex_weights, weight_bones, joint_names, count=MAX_INFLUENCES):
+    """
+    Keeps the `count` largest weights of every vertex. Returns joint indices
+    (V, count) into joint_names and the matching weights (V, count) summing to one.
+    """
+    vertex_weights = np.asarray(vertex_weights, dtype=np.float32)
+    joint_of = np.array([joint_names.index(str(name)) for name in weight_bones])
+    count = min(count, vertex_weights.shape[1])
+    order = np.argsort(-vertex_weights, axis=1, kind="stable")[:, :count]
+    values = np.take_along_axis(vertex_weights, order, axis=1)
+    joints = np.where(values > 0.0, joint_of[order], 0)
+    values = values / np.maximum(values.sum(axis=1, keepdims=True), 1e-12)
+    if count < MAX_INFLUENCES:
+        pad = MAX_INFLUENCES - count
+        joints = np.pad(joints, ((0, 0), (0, pad)))
+        values = np.pad(values, ((0, 0), (0, pad)))
+    return joints, values.astype(np.float32)
+
+
+# -------------------------------
+# Binary chunk
+# -------------------------------
+class _Binary:
+    """Buffer views and accessors over arrays kept as-is until write_glb() streams them."""
+
+    def __init__(self):
+        self.arrays = []      # (byte offset, contiguous array)
+        self.length = 0
+        self.views = []
+        self.accessors = []
+
+    def view(self, array, target=None):
+        """Adds an array as one buffer view; returns the view index."""
+        array = np.ascontiguousarray(array)
+        self.length += -self.length % 4
+        self.arrays.append((self.length, array))
+        view = {"buffer": 0, "byteOffset": self.length, "byteLength": array.nbytes}
+        if target is not None:
+            view["target"] = target
+        self.views.append(view)
+        self.length += array.nbytes
+        return len(self.views) - 1
+
+    def accessor(self, array, target=None, bounds=False, view=None, byte_offset=0):
+        """
+        Adds an accessor describing `array` (its first axis is the element
+        count); it gets its own buffer view unless `view` and the array's
+        `byte_offset` in that view are given. Returns the accessor index.
+        """
+        if view is None:
+            view = self.view(array, target)
+        accessor = {
+            "bufferView": view,
+            "componentType": _COMPONENT_TYPES[array.dtype],
+            "count": int(array.shape[0]),
+            "type": _ELEMENT_TYPES[array.shape[1:]],
+        }
+        if byte_offset:
+            accessor["byteOffset"] = int(byte_offset)
+        if bounds:
+            flat = array.reshape(len(array), -1)
+            accessor["min"] = flat.min(axis=0).tolist()
+            accessor["max"] = flat.max(axis=0).tolist()
+        self.accessors.append(accessor)
+        return len(self.accessors) - 1
+
+
+def write_glb(path, document, binary):
+    """Writes a GLB file: the JSON document, then the binary chunk straight from its arrays."""
+    document = dict(document, buffers=[{"byteLength": binary.length}],
+                    bufferViews=binary.views, accessors=binary.accessors)
+    text = json.dumps(document, separators=(",", ":")).encode("utf-8")
+    text += b" " * (-len(text) % 4)
+    bin_length = binary.length + (-binary.length % 4)
+    total = 12 + 8 + len(text) + 8 + bin_length
+
+    with open(path, "wb") as f:
+        f.write(GLB_MAGIC + struct.pack("<II", GLB_VERSION, total))
+        f.write(struct.pack("<I", len(text)) + JSON_CHUNK)
+        f.write(text)
+        f.write(struct.pack("<I", bin_length) + BIN_CHUNK)
+        position = 0
+        for offset, array in binary.arrays:
+            f.write(b"\0" * (offset - position))
+            f.write(array.data)
+            position = offset + array.nbytes
+        f.write(b"\0" * (bin_length - position))
+    return path
+
+
+# -------------------------------
+# Document
+# -------------------------------
+def build_document(rig, geometry, weight_bones, vertex_weights, clip_list=(), name="BipedRig", fps=gait.FPS,
+                   tracks=None):
+    """
+    Assembles the glTF document and its binary chunk for a fk.Rig, a body
+    geometry dict with its skin weights (weight_bones, (V, W) weights) and
+    clips. tracks optionally holds every clip already sampled on each frame,
+    as cache.sample_tracks() dicts in clip_list order.
+    Returns (document, binary) for write_glb().
+    """
+    binary = _Binary()
+    joint_names = list(rig.names)
+    bone_count = len(joint_names)
+
+    # Nodes: the root, one per bone (node index = bone index + 1), then the mesh
+    rest_rotations = rig.offsets[:, :3, :3]
+    rotations = mat3_to_quat(rest_rotations)
+    nodes = [{"name": name, "rotation": [float(v) for v in Z_UP_TO_Y_UP],
+              "children": [int(b) + 1 for b in np.flatnonzero(rig.parents < 0)] + [bone_count + 1]}]
+    for b, bone_name in enumerate(joint_names):
+        node = {"name": bone_name, "translation": rig.offsets[b, :3, 3].tolist(), "rotation": rotations[b].tolist()}
+        children = np.flatnonzero(rig.parents == b)
+        if len(children):
+            node["children"] = (children + 1).tolist()
+        nodes.append(node)
+
+    # Mesh
+    vertices = np.asarray(geometry["vertices"], dtype="<f4")
+    triangles = triangulate(geometry)
+    index_type = "<u2" if len(vertices) < 0xFFFF else "<u4"
+    joints, skin = influences(vertex_weights, weight_bones, joint_names)
+    attributes = {
+        "POSITION": binary.accessor(vertices, _ARRAY_BUFFER, bounds=True),
+        "NORMAL": binary.accessor(vertex_normals(vertices, triangles).astype("<f4"), _ARRAY_BUFFER),
+        "JOINTS_0": binary.accessor(joints.astype("u1" if bone_count <= 256 else "<u2"), _ARRAY_BUFFER),
+        "WEIGHTS_0": binary.accessor(skin.astype("<f4"), _ARRAY_BUFFER),
+    }
+    indices = binary.accessor(triangles.ravel().astype(index_type), _ELEMENT_ARRAY_BUFFER)
+    nodes.append({"name": "BipedMesh", "mesh": 0, "skin": 0})
+
+    # Inverse bind matrices, column-major
+    bind = np.ascontiguousarray(np.swapaxes(np.linalg.inv(rig.rest), -1, -2), dtype="<f4")
+    skins = [{"name": name, "joints": list(range(1, bone_count + 1)), "skeleton": 0,
+              "inverseBindMatrices": binary.accessor(bind)}]
+
+    # Animations: one input accessor per clip, all bone outputs in one view
+    animations = []
+    for c, clip in enumerate(clip_list):
+        if clip.data_path != "rotation_euler":
+            raise ValueError(f"Unsupported clip data path '{clip.data_path}'")
+        if tracks is None:
+            frames, values = fk.sample_clip(clip)
+        else:
+            frames, values = np.asarray(tracks[c]["frames"], dtype=np.float64), tracks[c]["values"]
+        bones = [rig.index[bone_name] for bone_name in clip.bones]
+        local = rest_rotations[bones] @ fk.euler_to_mat3(values)
+        quats = np.ascontiguousarray(np.swapaxes(continuous_quats(mat3_to_quat(local)), 0, 1), dtype="<f4")
+        times = ((frames - clip.frame_start) / fps).astype("<f4")
+        time_accessor = binary.accessor(times, bounds=True)
+        view = binary.view(quats)
+        samplers, channels = [], []
+        for k, b in enumerate(bones):
+            output = binary.accessor(quats[k], view=view, byte_offset=k * quats[k].nbytes)
+            samplers.append({"input": time_accessor, "output": output, "interpolation": "LINEAR"})
+            channels.append({"sampler": k, "target": {"node": b + 1, "path": "rotation"}})
+        animations.append({"name": clip.name, "samplers": samplers, "channels": channels})
+
+    document = {
+        "asset": {"version": "2.0", "generator": "biped gltf.py"},
+        "scene": 0,
+        "scenes": [{"name": name, "nodes": [0]}],
+        "nodes": nodes,
+        "meshes": [{"name": "BipedMesh", "primitives": [{"attributes": attributes, "indices": indices, "mode": 4}]}],
+        "skins": skins,
+    }
+    if animations:
+        document["animations"] = animations
+    return document, binary
+
+
+# -------------------------------
+# Export
+# -------------------------------
+def export_character(character, path, clip_list=(), artifact_cache=None, bake_ik=BAKE_IK):
+    """
+    Builds (or reuses from the artifact cache) the body and weights of a
+    Character and the sampled clips, with the IK chains baked for the
+    character's rig unless bake_ik is False, and writes them to a GLB file.
+    Returns the path.
+    """
+    rig = fk.Rig(character.bones)
+    positions = skeleton.rest_positions(character.bones)
+    parents = {bone.name: bone.parent for bone in character.bones}
+    deform = [bone.name for bone in character.bones if bone.deform]
+    _, arrays, _ = cache.load_or_build(positions, parents, deform, cache=artifact_cache,
+                                       body_mode=character.body_mode)
+    if bake_ik:
+        clip_list = [ik.bake_clip(clip, rig, name=clip.name) for clip in clip_list]
+    tracks = [cache.load_or_sample(clip, artifact_cache)[1] for clip in clip_list]
+    document, binary = build_document(rig, cache.geometry_from_artifacts(arrays), arrays["weight_bones"],
+                                      arrays["weights"], clip_list, character.name, tracks=tracks)
+    return write_glb(path, document, binary)
+
+
+def export_many(characters, out_dir, clip_names=None, library_path=clips.DEFAULT_LIBRARY, workers=1,
+                bake_ik=BAKE_IK):
+    """
+    Streams Characters (any iterable, consumed lazily) to <out_dir>/<name>.glb
+    with the named clips of the library (default: all). workers > 1 (or None
+    for all cores) exports on a process pool, with at most JOBS_PER_WORKER
+    characters per worker submitted ahead of the files written. Yields the
+    paths in input order as the files are written.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    if workers == 1:
+        clip_list = clips.ClipLibrary(library_path).load_many(clip_names)
+        for character in characters:
+            yield export_character(character, os.path.join(out_dir, f"{character.name}.glb"), clip_list,
+                                   bake_ik=bake_ik)
+        return
+    workers = workers or os.cpu_count() or 1
+    run = partial(_export_one, out_dir=out_dir, clip_names=clip_names, library_path=library_path, bake_ik=bake_ik)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for character in characters:
+            if len(pending) >= workers * JOBS_PER_WORKER:
+                yield pending.popleft().result()
+            pending.append(pool.submit(run, character))
+        while pending:
+            yield pending.popleft().result()
+
+
+def _export_one(character, out_dir, clip_names, library_path, bake_ik):
+    clip_list = clips.ClipLibrary(library_path).load_many(clip_names)
+    return export_character(character, os.path.join(out_dir, f"{character.name}.glb"), clip_list, bake_ik=bake_ik)
+
+
+def proportion_variants(count, spread=0.1, seed=None, body_mode=BODY_MODE):
+    """Yields `count` Characters with the rig uniformly scaled by 1 +- spread."""
+    rng = np.random.default_rng(seed)
+    for i in range(count):
+        yield Character(f"Biped_{i:04d}", skeleton.transformed(scale=1.0 + rng.uniform(-spread, spread)), body_mode)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the biped rig, body and clips to GLB.")
+    parser.add_argument("--out", default="BipedRig.glb", help="output file for a single character")
+    parser.add_argument("--count", type=int, default=0, help="export this many proportion variants instead")
+    parser.add_argument("--out-dir", default="biped_glb", help="directory for the variants")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for the variants (0: all cores)")
+    parser.add_argument("--body-mode", default=BODY_MODE, choices=body.BODY_MODES)
+    parser.add_argument("--no-ik", action="store_true", help="export the clips without baking the IK chains")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    if args.count:
+        written = export_many(proportion_variants(args.count, seed=args.seed, body_mode=args.body_mode),
+                              args.out_dir, workers=args.workers or None, bake_ik=not args.no_ik)
+        print(f"Wrote {sum(1 for _ in written)} characters to {os.path.abspath(args.out_dir)}")
+    else:
+        path = export_character(Character("BipedRig", skeleton.BONES, args.body_mode), args.out,
+                                clips.ClipLibrary().load_many(), bake_ik=not args.no_ik)
+        print(f"Wrote {os.path.abspath(path)}")
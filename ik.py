@@ -0,0 +1,197 @@
+"""
+Closed-form two-bone IK for the BipedRig limbs (NumPy only, no bpy).
+
+Mirrors the rig's IK constraints (skeleton.IK_CONSTRAINTS, chain_count = 2):
+the owner bone (shin / forearm) and its parent (thigh / upper arm) are solved
+so the owner's tail reaches the head of the IK target bone. The knee or
+elbow keeps the bend plane the chain has in its FK pose and the chain is
+turned around its root so the root bone's local X axis, rotated by the
+constraint's pole angle, faces the pole target, which is the convention of
+Blender's IK pole (solve_two_bone()). Targets out of reach leave the chain
+straight, pointing at the target, like Blender's solver without stretching.
+
+Everything is vectorized over frames: one call solves a whole clip.
+bake_clip() turns the solved chains back into plain FK rotations so exported
+clips no longer depend on the constraint solver.
+"""
+import numpy as np
+
+import clips
+import fk
+import skeleton
+
+
+def _normalized(v):
+    norm = np.linalg.norm(v, axis=-1, keepdims=True)
+    return v / np.where(norm == 0.0, 1.0, norm)
+
+
+def rotation_between(a, b):
+    """
+    Shortest-arc rotation matrices (..., 3, 3) taking unit vectors a onto b.
+    Opposite vectors get a half turn around an axis perpendicular to a.
+    """
+    a = _normalized(np.asarray(a, dtype=np.float64))
+    b = _normalized(np.asarray(b, dtype=np.float64))
+    v = np.cross(a, b)
+    c = np.einsum('...i,...i->...', a, b)
+    k = np.zeros(v.shape[:-1] + (3, 3))
+    k[..., 0, 1], k[..., 0, 2] = -v[..., 2], v[..., 1]
+    k[..., 1, 0], k[..., 1, 2] = v[..., 2], -v[..., 0]
+    k[..., 2, 0], k[..., 2, 1] = -v[..., 1], v[..., 0]
+    opposite = c < -1.0 + 1e-9
+    scale = 1.0 / np.where(opposite, 1.0, 1.0 + c)
+    rot = np.eye(3) + k + (k @ k) * scale[..., None, None]
+
+    if opposite.any():
+        helper = np.where(np.abs(a[..., :1]) < 0.9, [1.0, 0.0, 0.0], [0.0, 1.0, 0.0])
+        axis = _normalized(np.cross(a, helper))
+        flip = 2.0 * axis[..., :, None] * axis[..., None, :] - np.eye(3)
+        rot = np.where(opposite[..., None, None], flip, rot)
+    return rot
+
+
+def _frame(direction, up, fallback):
+    """
+    Orthonormal frames (..., 3, 3) with columns: direction, up made
+    perpendicular to it (fallback where up is parallel to direction), and
+    their cross product.
+    """
+    d = _normalized(direction)
+    u = up - np.einsum('...i,...i->...', up, d)[..., None] * d
+    f = fallback - np.einsum('...i,...i->...', fallback, d)[..., None] * d
+    u = np.where(np.linalg.norm(u, axis=-1, keepdims=True) < 1e-9, f, u)
+    u = _normalized(u)
+    return np.stack([d, u, np.cross(d, u)], axis=-1)
+
+
+def solve_two_bone(upper_rot, lower_rot, root, target, pole, upper_length, lower_length, pole_angle=0.0,
+                   bend_axis=(1.0, 0.0, 0.0)):
+    """
+    Solves two-bone chains the way Blender's IK solver places them with a
+    pole target. upper_rot and lower_rot (..., 3, 3) are the world rotations
+    of the chain bones before IK (their FK pose); root, target and pole are
+    positions (..., 3).
+
+    The lower bone keeps its bend plane relative to the upper bone and only
+    opens or closes the joint until the chain spans the root -> target
+    distance (around bend_axis, in the upper bone's local space, where the
+    FK pose is straight). The chain is then turned around its root so that
+    the root -> tip line points at the target and the upper bone's X axis,
+    rotated towards its Z axis by the pole angle, points at the pole, both
+    taken perpendicular to that line (Blender's pole convention: with a pole
+    angle of 0 the root bone's X axis faces the pole). Targets out of reach
+    leave the chain straight, pointing at the target, like Blender's solver
+    without stretching. Returns the solved world rotations (upper, lower).
+    """
+    upper_rot = np.asarray(upper_rot, dtype=np.float64)
+    lower_rot = np.asarray(lower_rot, dtype=np.float64)
+    root = np.asarray(root, dtype=np.float64)
+    a = float(upper_length)
+    b = float(lower_length)
+    y_axis = np.array([0.0, 1.0, 0.0])
+
+    # Lower bone in the upper bone's space and the current joint angle
+    relative = np.swapaxes(upper_rot, -1, -2) @ lower_rot
+    lower_dir = relative[..., 1]
+    normal = np.cross(y_axis, lower_dir)
+    current = np.arctan2(np.linalg.norm(normal, axis=-1), lower_dir[..., 1])
+    straight = np.linalg.norm(normal, axis=-1, keepdims=True) < 1e-9
+    normal = _normalized(np.where(straight, np.asarray(bend_axis, dtype=np.float64), normal))
+
+    # Law of cosines for the joint angle that spans the distance to the target
+    distance = np.linalg.norm(np.asarray(target, dtype=np.float64) - root, axis=-1)
+    reach = np.clip(distance, abs(a - b) + 1e-9, a + b)
+    joint = np.arccos(np.clip((reach * reach - a * a - b * b) / (2.0 * a * b), -1.0, 1.0))
+    relative = fk.axis_angle_to_mat3(normal, joint - current) @ relative
+    tip = a * y_axis + b * relative[..., 1]
+
+    # Turn the chain: tip -> target direction, pole axis -> pole direction
+    up = np.array([np.cos(pole_angle), 0.0, np.sin(pole_angle)])
+    tip_world = (upper_rot @ tip[..., None])[..., 0]
+    to_target = np.asarray(target, dtype=np.float64) - root
+    to_target = np.where(distance[..., None] < 1e-9, tip_world, to_target)
+    current_up = (upper_rot @ up)
+    local = _frame(tip, np.broadcast_to(up, tip.shape), np.broadcast_to([0.0, 0.0, 1.0], tip.shape))
+    world = _frame(to_target, np.asarray(pole, dtype=np.float64) - root, current_up)
+    upper = world @ np.swapaxes(local, -1, -2)
+    return upper, upper @ relative
+
+
+def chain_bones(rig, constraint):
+    """(upper, lower) bone indices of a chain_count = 2 IK constraint."""
+    if constraint.chain_count != 2:
+        raise ValueError(f"IK constraint '{constraint.name}' has chain_count {constraint.chain_count}, expected 2")
+    lower = rig.index[constraint.owner]
+    upper = int(rig.parents[lower])
+    if upper < 0:
+        raise ValueError(f"IK constraint '{constraint.name}' owner '{constraint.owner}' has no parent")
+    return upper, lower
+
+
+def rest_bend_axis(rig, lower):
+    """
+    Axis (3,) in the upper bone's space the chain ending in `lower` bends
+    around in the rest pose, or the upper bone's X axis if it is straight.
+    """
+    direction = rig.offsets[lower, :3, 1]
+    normal = np.cross([0.0, 1.0, 0.0], direction)
+    length = np.linalg.norm(normal)
+    return normal / length if length > 1e-9 else np.array([1.0, 0.0, 0.0])
+
+
+def solve_basis(rig, basis, ik_constraints=skeleton.IK_CONSTRAINTS, targets=None, poles=None):
+    """
+    Applies the IK constraints to FK basis matrices (F, B, 4, 4).
+
+    Target and pole positions default to the heads of the posed IK target and
+    pole bones; `targets` / `poles` map a constraint name to (F, 3) positions
+    in armature space to override them. The chains are solved from their FK
+    pose as in solve_two_bone(). Returns the new basis matrices (F, B, 4, 4).
+    """
+    targets = targets or {}
+    poles = poles or {}
+    basis = np.array(basis, dtype=np.float64)
+    pose = rig.pose_matrices(basis)
+
+    for constraint in ik_constraints:
+        upper, lower = chain_bones(rig, constraint)
+        parent = int(rig.parents[upper])
+        root = pose[:, upper, :3, 3]
+        target = targets.get(constraint.name, pose[:, rig.index[constraint.target], :3, 3])
+        pole = poles.get(constraint.name, pose[:, rig.index[constraint.pole], :3, 3])
+
+        # Upper bone frame before its own rotation, and the FK pose of the chain
+        parent_rot = pose[:, parent, :3, :3] if parent >= 0 else np.eye(3)
+        upper_frame = parent_rot @ rig.offsets[upper, :3, :3]
+        upper_rot = upper_frame @ basis[:, upper, :3, :3]
+        lower_rot = upper_rot @ rig.offsets[lower, :3, :3] @ basis[:, lower, :3, :3]
+        upper_rot, lower_rot = solve_two_bone(upper_rot, lower_rot, root, target, pole, rig.lengths[upper],
+                                              rig.lengths[lower], constraint.pole_angle, rest_bend_axis(rig, lower))
+
+        basis[:, upper, :3, :3] = np.swapaxes(upper_frame, -1, -2) @ upper_rot
+        lower_frame = upper_rot @ rig.offsets[lower, :3, :3]
+        basis[:, lower, :3, :3] = np.swapaxes(lower_frame, -1, -2) @ lower_rot
+    return basis
+
+
+def bake_clip(clip, rig=None, ik_constraints=skeleton.IK_CONSTRAINTS, targets=None, poles=None,
+              frames=None, name=None):
+    """
+    Samples a clip on every frame, solves the IK chains and returns a dense
+    clips.Clip with plain Euler XYZ rotations for the clip's bones and every
+    IK chain bone, ready for mesh.write_clip_fcurves() or clips.write_library().
+    """
+    rig = rig or fk.Rig()
+    frames, values = fk.sample_clip(clip, frames)
+    basis = solve_basis(rig, rig.basis_from_rotations(clip.bones, values), ik_constraints, targets, poles)
+
+    bones = list(clip.bones)
+    for constraint in ik_constraints:
+        for index in chain_bones(rig, constraint):
+            if rig.names[index] not in bones:
+                bones.append(rig.names[index])
+    columns = [rig.index[bone] for bone in bones]
+    euler = np.unwrap(fk.mat3_to_euler(basis[:, columns, :3, :3]), axis=0)
+    return clips.Clip(name or f"{clip.name}_baked", clip.frame_start, clip.frame_end,
+                      frames.astype(np.float32), bones, euler.astype(np.float32), "rotation_euler")
@@ -0,0 +1,293 @@
+"""
+Error-bounded keyframe reduction for densely baked clips (NumPy only, no bpy).
+
+Clips baked on every frame (ik.bake_clip(), gait.to_clips(), per-frame
+set_bone_rotation() loops) carry one key per frame and channel. The reducer
+keeps the fewest keys for which the auto-clamped Bezier curves Blender
+builds through them (see fcurve.py; mesh.write_clip_fcurves() sets the same
+handle mode) still pass within a tolerance of every baked sample.
+
+Keys are chosen per bone and shared by the bone's channels, as
+keyframe_insert() does, so the error can be measured as the real rotation
+angle between the baked and the reduced pose of the bone, in degrees, for
+'rotation_euler' and 'rotation_quaternion' clips (other channels use the
+largest absolute difference, in their own units). Reduction is greedy
+insertion, vectorized over all bones: starting from the two end keys, every
+segment with a sample over the tolerance gets a key at its worst sample,
+until no sample is over it. A pruning pass then drops the keys the curves
+turn out not to need once their neighbours are in place.
+
+Reduced clips can be archived in a quantized form (write_compact()): key
+frame indices as uint16 and values as 8 or 16 bit integers scaled per curve,
+which adds at most half a quantization step to the error.
+"""
+import json
+from collections import namedtuple
+
+import numpy as np
+
+import fcurve
+import fk
+
+# Default tolerance: degrees for rotations, channel units otherwise
+DEFAULT_TOLERANCE = 0.1
+
+# Bits per quantized value in the compact archive (8 or 16)
+DEFAULT_BITS = 16
+
+# A clips.Clip plus keys, a (B, F) mask of the frames kept for each bone.
+# values still holds a sample on every frame; only those under keys are written.
+ReducedClip = namedtuple("ReducedClip", "name frame_start frame_end frames bones values data_path keys")
+
+
+def _neighbours(keys):
+    """For every frame, the index of the last key before and the first key after it, (N, F) each."""
+    count = keys.shape[1]
+    index = np.arange(count)
+    before = np.maximum.accumulate(np.where(keys, index, -1), axis=1)
+    after = np.minimum.accumulate(np.where(keys, index, count)[:, ::-1], axis=1)[:, ::-1]
+    prev = np.concatenate([np.full((len(keys), 1), -1), before[:, :-1]], axis=1)
+    nxt = np.concatenate([after[:, 1:], np.full((len(keys), 1), count)], axis=1)
+    return prev, nxt
+
+
+def reconstruct(x, y, keys):
+    """
+    Evaluates the curves through a subset of the samples.
+
+    x:    (F,) frames
+    y:    (N, C, F) sample values, N key sets (bones) of C curves each
+    keys: (N, F) mask of the samples kept as keys (both ends included)
+    Returns (N, C, F): each curve of set n evaluated on every frame with only
+    the keys of keys[n], as Blender would.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    count = len(x)
+    prev, nxt = _neighbours(keys)
+    prev_c = np.clip(prev, 0, count - 1)
+    next_c = np.clip(nxt, 0, count - 1)
+
+    # Handles of every sample as if it were a key between its neighbouring keys
+    # (only evaluated at real keys below)
+    left_x, left_y, right_x, right_y = fcurve.handles_from_neighbors(
+        x[prev_c][:, None], np.take_along_axis(y, prev_c[:, None], axis=2),
+        x, y,
+        x[next_c][:, None], np.take_along_axis(y, next_c[:, None], axis=2),
+        (prev >= 0)[:, None], (nxt < count)[:, None])
+    left_x = np.broadcast_to(left_x, y.shape)[:, 0]
+    right_x = np.broadcast_to(right_x, y.shape)[:, 0]
+
+    # Segment (prev key, next key) of every sample that is not a key itself
+    t = fcurve.solve_bezier_t(x[prev_c], np.take_along_axis(right_x, prev_c, axis=1),
+                              np.take_along_axis(left_x, next_c, axis=1), x[next_c], x)
+    values = fcurve.bezier_value(
+        np.take_along_axis(y, prev_c[:, None], axis=2), np.take_along_axis(right_y, prev_c[:, None], axis=2),
+        np.take_along_axis(left_y, next_c[:, None], axis=2), np.take_along_axis(y, next_c[:, None], axis=2),
+        t[:, None])
+    return np.where(keys[:, None], y, values)
+
+
+def pose_error(a, b, data_path="rotation_euler"):
+    """
+    Error between two sets of channel values (N, C, F) for each set and frame,
+    (N, F): the rotation angle between them in degrees for Euler XYZ and
+    quaternion rotations, the largest channel difference otherwise.
+    """
+    if data_path == "rotation_euler":
+        diff = fk.euler_to_mat3(np.moveaxis(a, 1, -1)) - fk.euler_to_mat3(np.moveaxis(b, 1, -1))
+        chord = np.sqrt(np.sum(diff * diff, axis=(-2, -1))) / (2.0 * np.sqrt(2.0))
+        return np.degrees(2.0 * np.arcsin(np.minimum(chord, 1.0)))
+    if data_path == "rotation_quaternion":
+        a = a / np.linalg.norm(a, axis=1, keepdims=True)
+        b = b / np.linalg.norm(b, axis=1, keepdims=True)
+        chord = np.minimum(np.linalg.norm(a - b, axis=1), np.linalg.norm(a + b, axis=1))
+        return np.degrees(4.0 * np.arcsin(np.minimum(chord / 2.0, 1.0)))
+    return np.max(np.abs(a - b), axis=1)
+
+
+def prune_keys(x, y, keys, tolerance=DEFAULT_TOLERANCE, data_path="rotation_euler"):
+    """
+    Removes keys whose removal keeps every sample within tolerance. Removing
+    key r only changes the curve between keys r-2 and r+2, so keys four apart
+    are tried together and each sample over the tolerance is blamed on the
+    one removed key it depends on, which is put back. Repeats until a full
+    round removes nothing. Returns the new (N, F) key mask.
+    """
+    keys = keys.copy()
+    removed = True
+    while removed:
+        removed = False
+        for phase in range(4):
+            rank = np.cumsum(keys, axis=1) - 1
+            last = rank[:, -1:]
+            candidates = keys & (rank % 4 == phase) & (rank > 0) & (rank < last)
+            if not candidates.any():
+                continue
+            trial = keys & ~candidates
+            error = pose_error(reconstruct(x, y, trial), y, data_path)
+            bad_n, bad_f = np.nonzero(error > tolerance)
+            # Rank of the segment start each bad sample lies in, then the candidate it depends on
+            start = rank[bad_n, bad_f]
+            blamed = start - 1 + (phase - (start - 1)) % 4
+            positions = np.zeros_like(keys, dtype=np.int64)
+            key_n, key_f = np.nonzero(keys)
+            positions[key_n, rank[key_n, key_f]] = key_f
+            restore = np.zeros_like(keys)
+            restore[bad_n, positions[bad_n, np.clip(blamed, 0, keys.shape[1] - 1)]] = True
+            restore &= candidates
+            trial |= restore
+            if (trial != keys).any():
+                keys = trial
+                removed = True
+    return keys
+
+
+def reduce_keys(x, y, tolerance=DEFAULT_TOLERANCE, data_path="rotation_euler"):
+    """
+    Greedy key insertion followed by prune_keys(). x (F,) frames, y (N, C, F)
+    samples. Returns the (N, F) key mask whose curves stay within tolerance
+    of every sample.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    keys = np.zeros((y.shape[0], y.shape[2]), dtype=bool)
+    keys[:, [0, -1]] = True
+    while True:
+        error = pose_error(reconstruct(x, y, keys), y, data_path)
+        bad_n, bad_f = np.nonzero((error > tolerance) & ~keys)
+        if not len(bad_n):
+            return prune_keys(x, y, keys, tolerance, data_path)
+        # One new key per failing segment, at its worst sample
+        segment = _neighbours(keys)[0][bad_n, bad_f]
+        order = np.lexsort((-error[bad_n, bad_f], segment, bad_n))
+        bad_n, bad_f, segment = bad_n[order], bad_f[order], segment[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = (bad_n[1:] != bad_n[:-1]) | (segment[1:] != segment[:-1])
+        keys[bad_n[first], bad_f[first]] = True
+
+
+def reduce_clip(clip, tolerance=DEFAULT_TOLERANCE):
+    """
+    Reduces a densely keyed clips.Clip. Returns a ReducedClip whose keys
+    reproduce every frame of the clip within tolerance.
+    """
+    y = np.transpose(np.asarray(clip.values, dtype=np.float64), (1, 2, 0))
+    if len(clip.frames) < 3:
+        keys = np.ones((y.shape[0], len(clip.frames)), dtype=bool)
+    else:
+        keys = reduce_keys(clip.frames, y, tolerance, clip.data_path)
+    return ReducedClip(clip.name, clip.frame_start, clip.frame_end, clip.frames, list(clip.bones),
+                       clip.values, clip.data_path, keys)
+
+
+def evaluate(reduced):
+    """The reduced curves sampled on every frame of reduced.frames, (F, B, C)."""
+    y = np.transpose(np.asarray(reduced.values, dtype=np.float64), (1, 2, 0))
+    return np.transpose(reconstruct(reduced.frames, y, reduced.keys), (2, 0, 1))
+
+
+def curves(reduced):
+    """Yields (bone name, key frames (K,), key values (K, C)) for every bone."""
+    for b, bone in enumerate(reduced.bones):
+        kept = reduced.keys[b]
+        yield bone, np.asarray(reduced.frames)[kept], np.asarray(reduced.values)[kept, b]
+
+
+def report(reduced, reference=None):
+    """
+    Key counts, compression ratio and error of a reduced clip against the
+    dense values it was reduced from (default: its own values).
+    """
+    reference = reduced.values if reference is None else reference
+    channels = np.asarray(reduced.values).shape[2]
+    dense = reduced.keys.size * channels
+    kept = int(reduced.keys.sum()) * channels
+    error = pose_error(np.transpose(evaluate(reduced), (1, 2, 0)),
+                       np.transpose(np.asarray(reference, dtype=np.float64), (1, 2, 0)), reduced.data_path)
+    return {
+        "name": reduced.name,
+        "keys_before": dense,
+        "keys_after": kept,
+        "ratio": dense / max(kept, 1),
+        "max_error": float(error.max()),
+        "max_error_per_bone": dict(zip(reduced.bones, error.max(axis=1).tolist())),
+    }
+
+
+# -------------------------------
+# Compact archive
+# -------------------------------
+def write_compact(path, reduced, bits=DEFAULT_BITS):
+    """
+    Stores a reduced clip in quantized form (a compressed .npz): per bone the
+    key frame indices, and per curve an offset and scale mapping the key
+    values onto `bits`-bit integers.
+    """
+    if bits not in (8, 16):
+        raise ValueError(f"bits must be 8 or 16, got {bits}")
+    frames = np.asarray(reduced.frames)
+    values = np.asarray(reduced.values, dtype=np.float64)
+    index_type = np.uint16 if len(frames) <= np.iinfo(np.uint16).max + 1 else np.uint32
+    value_type = np.uint8 if bits == 8 else np.uint16
+
+    bone_index, key_index = np.nonzero(reduced.keys)
+    key_values = values[key_index, bone_index]                      # (total, C)
+    lo = values.min(axis=0)                                         # (B, C)
+    hi = values.max(axis=0)
+    scale = (hi - lo) / float(2 ** bits - 1)
+    scale[scale == 0.0] = 1.0
+    quantized = np.rint((key_values - lo[bone_index]) / scale[bone_index]).astype(value_type)
+
+    index = {"name": reduced.name, "frame_start": reduced.frame_start, "frame_end": reduced.frame_end,
+             "bones": list(reduced.bones), "data_path": reduced.data_path, "bits": bits}
+    np.savez_compressed(path, index=np.array(json.dumps(index)), frames=frames.astype(np.float32),
+                        key_counts=reduced.keys.sum(axis=1).astype(np.uint32),
+                        key_index=key_index.astype(index_type), lo=lo.astype(np.float32),
+                        scale=scale.astype(np.float32), values=quantized)
+
+
+def read_compact(path):
+    """
+    Reads an archive written by write_compact(). The returned ReducedClip
+    holds the dequantized key values; the values between keys are filled in
+    by evaluating the curves.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        index = json.loads(str(data["index"]))
+        frames = data["frames"]
+        counts = data["key_counts"].astype(np.int64)
+        key_index = data["key_index"].astype(np.int64)
+        lo, scale, quantized = data["lo"], data["scale"], data["values"]
+
+    bone_index = np.repeat(np.arange(len(counts)), counts)
+    keys = np.zeros((len(counts), len(frames)), dtype=bool)
+    keys[bone_index, key_index] = True
+    values = np.zeros((len(frames), len(counts), quantized.shape[1]), dtype=np.float64)
+    values[key_index, bone_index] = lo[bone_index] + quantized * scale[bone_index].astype(np.float64)
+
+    reduced = ReducedClip(index["name"], index["frame_start"], index["frame_end"], frames, index["bones"],
+                          values, index["data_path"], keys)
+    return reduced._replace(values=evaluate(reduced).astype(np.float32))
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+
+    import clips
+    import gait
+    import ik
+
+    rig = fk.Rig()
+    dense = [ik.bake_clip(clip, rig) for clip in clips.ClipLibrary().load_many()]
+    dense += gait.to_clips("gait_walk", gait.WALK, np.arange(1, 241))
+    with tempfile.TemporaryDirectory() as directory:
+        for clip in dense:
+            reduced = reduce_clip(clip)
+            stats = report(reduced)
+            path = os.path.join(directory, f"{clip.name}.npz")
+            write_compact(path, reduced)
+            archived = report(read_compact(path), clip.values)
+            print(f"{clip.name}: {stats['keys_before']} -> {stats['keys_after']} keys "
+                  f"({stats['ratio']:.1f}x), max error {stats['max_error']:.4f} deg, "
+                  f"archived {os.path.getsize(path)} bytes, max error {archived['max_error']:.4f} deg")
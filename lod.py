@@ -0,0 +1,178 @@
+"""
+Level-of-detail chain for the generated body mesh (NumPy only, no bpy).
+
+Each LOD is a 'SURFACE' body (see body.build_surface()) whose density is
+searched so that the mesh, once its own Subdivision Surface levels are
+applied, stays within a vertex budget. Only the nearest LOD keeps live
+subdivision; distant LODs are plain low-poly meshes, so they never pay for
+it at playback or render time.
+
+Skin weights are computed once on the densest LOD and transferred to the
+others from the nearest source vertices of the same body part (inverse
+distance blend of the k nearest), in chunks so memory stays bounded.
+
+A LOD is chosen by the character's projected height on screen, in pixels,
+which can be computed from the camera distance with screen_height().
+"""
+from collections import namedtuple
+
+import numpy as np
+
+import body
+import weights
+
+# name:        suffix of the mesh datablock
+# budget:      maximum vertex count after subdivision
+# subdivision: Subdivision Surface levels kept on the LOD
+# min_screen:  smallest projected character height (pixels) the LOD is used at
+Lod = namedtuple("Lod", "name budget subdivision min_screen")
+
+LODS = [
+    Lod("LOD0", 8000, 2, 400.0),
+    Lod("LOD1", 2000, 0, 150.0),
+    Lod("LOD2", 500, 0, 50.0),
+    Lod("LOD3", 150, 0, 0.0),
+]
+
+# Ring spacing along the tubes as a multiple of the edge length around them
+RING_RATIO = 2.5
+
+# Distance matrix entries computed at once during weight transfer
+CHUNK_ELEMENTS = 4_000_000
+
+# Nearest source vertices blended per transferred vertex
+TRANSFER_NEIGHBOURS = 4
+
+
+def subdivided_vertex_count(geometry, levels):
+    """Vertex count of the mesh after `levels` Catmull-Clark subdivisions."""
+    loops = geometry["loop_vertices"]
+    starts = geometry["loop_starts"]
+    totals = geometry["loop_totals"]
+    nxt = np.arange(len(loops)) + 1
+    nxt[starts + totals - 1] = starts
+    edges = np.sort(np.stack([loops, loops[nxt]], axis=-1), axis=-1)
+    v, e, f, corners = len(geometry["vertices"]), len(np.unique(edges, axis=0)), len(starts), len(loops)
+    for _ in range(levels):
+        # Every n-gon becomes n quads; every edge is split and gains one edge per adjacent face
+        v, e, f, corners = v + e + f, 2 * e + corners, corners, 4 * corners
+    return v
+
+
+def fit_budget(positions, budget, subdivision=0, parts=body.BODY_PARTS, segments=64, min_segments=4):
+    """
+    Builds the densest 'SURFACE' body whose subdivided vertex count fits the
+    budget (or the coarsest one if none does). Returns the geometry dict.
+    """
+    def build(edge_length):
+        return body.build_surface(positions, parts, segments, edge_length, edge_length * RING_RATIO, min_segments)
+
+    lo, hi = np.log(0.005), np.log(2.0)
+    best = build(np.exp(hi))
+    if subdivided_vertex_count(best, subdivision) > budget:
+        return best
+    for _ in range(24):
+        mid = 0.5 * (lo + hi)
+        geometry = build(np.exp(mid))
+        if subdivided_vertex_count(geometry, subdivision) <= budget:
+            best, hi = geometry, mid
+        else:
+            lo = mid
+    return best
+
+
+def transfer_weights(source_vertices, source_weights, target_vertices, source_parts=None, target_parts=None,
+                     neighbours=TRANSFER_NEIGHBOURS, max_influences=weights.MAX_INFLUENCES):
+    """
+    Transfers per-vertex weights (S, B) to target vertices (T, 3) by inverse
+    distance blending of the nearest source vertices, restricted to the same
+    part when part indices are given. Returns (T, B) float32 rows summing to one.
+    """
+    source = np.asarray(source_vertices, dtype=np.float64)
+    target = np.asarray(target_vertices, dtype=np.float64)
+    source_weights = np.asarray(source_weights, dtype=np.float64)
+    k = min(neighbours, len(source))
+    chunk = max(1, CHUNK_ELEMENTS // max(len(source), 1))
+    result = np.empty((len(target), source_weights.shape[1]), dtype=np.float64)
+
+    for start in range(0, len(target), chunk):
+        points = target[start:start + chunk]
+        dist_sq = np.sum((points[:, None, :] - source[None, :, :]) ** 2, axis=-1)
+        if source_parts is not None and target_parts is not None:
+            other = np.asarray(target_parts)[start:start + chunk, None] != np.asarray(source_parts)[None, :]
+            dist_sq[other] = np.inf
+        nearest = np.argpartition(dist_sq, k - 1, axis=1)[:, :k]
+        d = np.sqrt(np.take_along_axis(dist_sq, nearest, axis=1))
+        blend = 1.0 / np.maximum(d, 1e-9)
+        blend[~np.isfinite(d)] = 0.0
+        result[start:start + len(points)] = np.einsum('tk,tkb->tb', blend, source_weights[nearest])
+
+    result = weights.limit_influences(result, max_influences)
+    result /= np.maximum(result.sum(axis=1, keepdims=True), 1e-12)
+    return result.astype(np.float32)
+
+
+def build_lods(positions, parents, deform_bones, lods=LODS, parts=body.BODY_PARTS, skin_weights=None):
+    """
+    Builds every LOD in `lods` (nearest first). Weights are computed on the
+    LOD with the most vertices (or taken from skin_weights=(bone_names,
+    weights) matching it) and transferred to the others. Returns a list of
+    dicts with the LOD spec ('lod'), its 'geometry', 'bone_names' and 'weights'.
+    """
+    geometries = [fit_budget(positions, lod.budget, lod.subdivision, parts) for lod in lods]
+    densest = int(np.argmax([len(geometry["vertices"]) for geometry in geometries]))
+    reference = geometries[densest]
+    if skin_weights is None:
+        skin_weights = weights.compute_weights(reference, positions, parents, deform_bones, parts)
+    bone_names, reference_weights = skin_weights
+
+    levels = []
+    for i, (lod, geometry) in enumerate(zip(lods, geometries)):
+        if i == densest:
+            level_weights = np.asarray(reference_weights, dtype=np.float32)
+        else:
+            level_weights = transfer_weights(reference["vertices"], reference_weights, geometry["vertices"],
+                                             reference["part_index"], geometry["part_index"])
+        levels.append({"lod": lod, "geometry": geometry, "bone_names": list(bone_names), "weights": level_weights})
+    return levels
+
+
+def character_height(geometry):
+    """Height of the body (extent along Z) in rig units."""
+    z = np.asarray(geometry["vertices"])[:, 2]
+    return float(z.max() - z.min())
+
+
+def screen_height(distances, height, fov, resolution):
+    """
+    Projected height in pixels of a character `height` units tall seen from
+    `distances` away by a perspective camera with vertical field of view
+    `fov` (radians) rendering `resolution` pixels high.
+    """
+    distances = np.maximum(np.asarray(distances, dtype=np.float64), 1e-6)
+    return height / (2.0 * distances * np.tan(fov / 2.0)) * resolution
+
+
+def select(screen_heights, lods=LODS):
+    """LOD index for each projected height: the finest LOD whose min_screen it reaches."""
+    thresholds = np.array([lod.min_screen for lod in lods])
+    index = np.sum(np.asarray(screen_heights, dtype=np.float64)[..., None] < thresholds, axis=-1)
+    return np.minimum(index, len(lods) - 1)
+
+
+def select_by_distance(distances, height, fov, resolution, lods=LODS):
+    """LOD index for each camera distance (see screen_height())."""
+    return select(screen_height(distances, height, fov, resolution), lods)
+
+
+if __name__ == "__main__":
+    import skeleton
+
+    positions = skeleton.rest_positions()
+    parents = {bone.name: bone.parent for bone in skeleton.BONES}
+    deform = [bone.name for bone in skeleton.BONES if bone.deform]
+    for level in build_lods(positions, parents, deform):
+        lod, geometry = level["lod"], level["geometry"]
+        print(f"{lod.name}: {len(geometry['vertices'])} vertices, {len(geometry['loop_starts'])} faces, "
+              f"{subdivided_vertex_count(geometry, lod.subdivision)} after {lod.subdivision} subdivisions "
+              f"(budget {lod.budget})")
@@ -1,265 +1,336 @@
-import bpy
-import mathutils
-import math
-
-def create_cylinder_between_points(start, end, radius, name):
-    """
-    Creates a cylinder that spans between two 3D points.
-    The cylinder is created along the Z axis by default, then rotated
-    so that it aligns with the vector (end - start) and its origin is placed at the midpoint.
-    """
-    start_v = mathutils.Vector(start)
-    end_v = mathutils.Vector(end)
-    mid = (start_v + end_v) / 2.0
-    length = (end_v - start_v).length
-
-    bpy.ops.mesh.primitive_cylinder_add(radius=radius, depth=length, location=(0,0,0))
-    obj = bpy.context.active_object
-    obj.name = name
-
-    # The default cylinder is aligned along Z.
-    direction = end_v - start_v
-    up = mathutils.Vector((0, 0, 1))
-    quat = up.rotation_difference(direction.normalized())
-    obj.rotation_mode = 'QUATERNION'
-    obj.rotation_quaternion = quat
-
-    # Set the object's location to the midpoint between start and end.
-    obj.location = mid
-    return obj
-
-# -------------------------------
-# Ensure the rig exists and is available
-# -------------------------------
-rig_obj = bpy.data.objects.get("BipedRig")
-if rig_obj is None:
-    raise Exception("BipedRig not found! Please run the rig script first.")
-
-# Ensure we are in Object mode
-bpy.ops.object.mode_set(mode='OBJECT')
-
-# Access the rig’s pose bones to obtain their positions.
-bones = rig_obj.pose.bones
-
-# We'll store the created mesh parts in a list to join them later.
-parts = []
-
-# -------------------------------
-# Torso: from Pelvis head to Chest tail
-# -------------------------------
-pelvis_head = bones["Pelvis"].head.copy()
-chest_tail = bones["Chest"].tail.copy()
-torso = create_cylinder_between_points(pelvis_head, chest_tail, 0.2, "Torso")
-parts.append(torso)
-
-# -------------------------------
-# Head: create a sphere at the midpoint of the Head bone (using Neck tail to Head tail)
-# -------------------------------
-head_start = bones["Neck"].tail.copy()
-head_end = bones["Head"].tail.copy()
-head_mid = (head_start + head_end) / 2.0
-bpy.ops.mesh.primitive_uv_sphere_add(location=head_mid, radius=0.2)
-head_mesh = bpy.context.active_object
-head_mesh.name = "Head"
-parts.append(head_mesh)
-
-# -------------------------------
-# Left Arm: Upper Arm and Forearm
-# -------------------------------
-left_upper_arm = create_cylinder_between_points(bones["Left_Upper_Arm"].head, bones["Left_Upper_Arm"].tail, 0.08, "Left_Upper_Arm_Mesh")
-parts.append(left_upper_arm)
-left_forearm = create_cylinder_between_points(bones["Left_Forearm"].head, bones["Left_Forearm"].tail, 0.07, "Left_Forearm_Mesh")
-parts.append(left_forearm)
-
-# -------------------------------
-# Right Arm: Upper Arm and Forearm
-# -------------------------------
-right_upper_arm = create_cylinder_between_points(bones["Right_Upper_Arm"].head, bones["Right_Upper_Arm"].tail, 0.08, "Right_Upper_Arm_Mesh")
-parts.append(right_upper_arm)
-right_forearm = create_cylinder_between_points(bones["Right_Forearm"].head, bones["Right_Forearm"].tail, 0.07, "Right_Forearm_Mesh")
-parts.append(right_forearm)
-
-# -------------------------------
-# Left Leg: Thigh and Shin
-# -------------------------------
-left_thigh = create_cylinder_between_points(bones["Left_Thigh"].head, bones["Left_Thigh"].tail, 0.1, "Left_Thigh_Mesh")
-parts.append(left_thigh)
-left_shin = create_cylinder_between_points(bones["Left_Shin"].head, bones["Left_Shin"].tail, 0.09, "Left_Shin_Mesh")
-parts.append(left_shin)
-
-# -------------------------------
-# Right Leg: Thigh and Shin
-# -------------------------------
-right_thigh = create_cylinder_between_points(bones["Right_Thigh"].head, bones["Right_Thigh"].tail, 0.1, "Right_Thigh_Mesh")
-parts.append(right_thigh)
-right_shin = create_cylinder_between_points(bones["Right_Shin"].head, bones["Right_Shin"].tail, 0.09, "Right_Shin_Mesh")
-parts.append(right_shin)
-
-# -------------------------------
-# Optional: Feet (if your rig includes them)
-# -------------------------------
-if "Left_Foot" in bones.keys() and "Right_Foot" in bones.keys():
-    left_foot = create_cylinder_between_points(bones["Left_Foot"].head, bones["Left_Foot"].tail, 0.08, "Left_Foot_Mesh")
-    parts.append(left_foot)
-    right_foot = create_cylinder_between_points(bones["Right_Foot"].head, bones["Right_Foot"].tail, 0.08, "Right_Foot_Mesh")
-    parts.append(right_foot)
-
-# -------------------------------
-# Join all parts into one mesh
-# -------------------------------
-for obj in parts:
-    obj.select_set(True)
-bpy.context.view_layer.objects.active = parts[0]
-bpy.ops.object.join()
-human_mesh = bpy.context.active_object
-human_mesh.name = "AlignedHumanMesh"
-
-# Optional: Add a Subdivision Surface modifier for smoothness
-subsurf = human_mesh.modifiers.new("Subsurf", type='SUBSURF')
-subsurf.levels = 2
-
-# -------------------------------
-# Parent the mesh to the rig using automatic weights
-# -------------------------------
-bpy.ops.object.select_all(action='DESELECT')
-human_mesh.select_set(True)
-rig_obj.select_set(True)
-bpy.context.view_layer.objects.active = rig_obj
-bpy.ops.object.parent_set(type='ARMATURE_AUTO')
-
-print("Aligned human mesh created and parented to the rig!")
-
-# ========================================================
-# Revised Animation Section with Adjusted Shoulders and Knees
-# ========================================================
-def set_bone_rotation(pose_bones, bone_name, frame, rotation_euler, rotation_order='XYZ'):
-    bone = pose_bones.get(bone_name)
-    if bone is None:
-        print(f"Warning: Bone '{bone_name}' not found in rig.")
-        return
-    bone.rotation_mode = rotation_order
-    bone.rotation_euler = rotation_euler
-    bone.keyframe_insert(data_path="rotation_euler", frame=frame)
-
-# Switch to Pose mode on the rig for animation
-bpy.context.view_layer.objects.active = rig_obj
-bpy.ops.object.mode_set(mode='POSE')
-pose_bones = rig_obj.pose.bones
-
-# ---------------------------------------------------
-# Revised Walk Cycle (frames 1 to 25)
-# The knee (thigh/shin) angles and shoulder (upper arm) rotations have been adjusted.
-# ---------------------------------------------------
-# Frame 1: Left leg forward (knee more bent) and right leg extended
-set_bone_rotation(pose_bones, "Pelvis", 1, (math.radians(5), 0, 0))
-set_bone_rotation(pose_bones, "Left_Thigh", 1, (math.radians(25), 0, 0))
-set_bone_rotation(pose_bones, "Left_Shin", 1, (math.radians(-20), 0, 0))
-set_bone_rotation(pose_bones, "Right_Thigh", 1, (math.radians(-5), 0, 0))
-set_bone_rotation(pose_bones, "Right_Shin", 1, (math.radians(5), 0, 0))
-# Shoulders: moderate swing
-set_bone_rotation(pose_bones, "Left_Upper_Arm", 1, (math.radians(-15), 0, 0))
-set_bone_rotation(pose_bones, "Right_Upper_Arm", 1, (math.radians(15), 0, 0))
-
-# Frame 13: Opposite pose: now right leg forward with more bend and left leg extended
-set_bone_rotation(pose_bones, "Pelvis", 13, (math.radians(-5), 0, 0))
-set_bone_rotation(pose_bones, "Left_Thigh", 13, (math.radians(-5), 0, 0))
-set_bone_rotation(pose_bones, "Left_Shin", 13, (math.radians(5), 0, 0))
-set_bone_rotation(pose_bones, "Right_Thigh", 13, (math.radians(25), 0, 0))
-set_bone_rotation(pose_bones, "Right_Shin", 13, (math.radians(-20), 0, 0))
-# Shoulders swap swing direction
-set_bone_rotation(pose_bones, "Left_Upper_Arm", 13, (math.radians(15), 0, 0))
-set_bone_rotation(pose_bones, "Right_Upper_Arm", 13, (math.radians(-15), 0, 0))
-
-# Frame 25: Return to initial pose
-set_bone_rotation(pose_bones, "Pelvis", 25, (math.radians(5), 0, 0))
-set_bone_rotation(pose_bones, "Left_Thigh", 25, (math.radians(25), 0, 0))
-set_bone_rotation(pose_bones, "Left_Shin", 25, (math.radians(-20), 0, 0))
-set_bone_rotation(pose_bones, "Right_Thigh", 25, (math.radians(-5), 0, 0))
-set_bone_rotation(pose_bones, "Right_Shin", 25, (math.radians(5), 0, 0))
-set_bone_rotation(pose_bones, "Left_Upper_Arm", 25, (math.radians(-15), 0, 0))
-set_bone_rotation(pose_bones, "Right_Upper_Arm", 25, (math.radians(15), 0, 0))
-
-# ---------------------------------------------------
-# Revised Run Cycle (frames 30 to 48)
-# More exaggerated poses with adjusted knee and shoulder rotations.
-# ---------------------------------------------------
-# Frame 30: Start run pose
-set_bone_rotation(pose_bones, "Pelvis", 30, (math.radians(10), 0, 0))
-set_bone_rotation(pose_bones, "Left_Thigh", 30, (math.radians(45), 0, 0))
-set_bone_rotation(pose_bones, "Left_Shin", 30, (math.radians(-25), 0, 0))
-set_bone_rotation(pose_bones, "Right_Thigh", 30, (math.radians(-5), 0, 0))
-set_bone_rotation(pose_bones, "Right_Shin", 30, (math.radians(5), 0, 0))
-set_bone_rotation(pose_bones, "Left_Upper_Arm", 30, (math.radians(-35), 0, 0))
-set_bone_rotation(pose_bones, "Right_Upper_Arm", 30, (math.radians(35), 0, 0))
-
-# Frame 39: Mid-run pose with legs swapping roles
-set_bone_rotation(pose_bones, "Pelvis", 39, (math.radians(-10), 0, 0))
-set_bone_rotation(pose_bones, "Left_Thigh", 39, (math.radians(-5), 0, 0))
-set_bone_rotation(pose_bones, "Left_Shin", 39, (math.radians(5), 0, 0))
-set_bone_rotation(pose_bones, "Right_Thigh", 39, (math.radians(45), 0, 0))
-set_bone_rotation(pose_bones, "Right_Shin", 39, (math.radians(-25), 0, 0))
-set_bone_rotation(pose_bones, "Left_Upper_Arm", 39, (math.radians(35), 0, 0))
-set_bone_rotation(pose_bones, "Right_Upper_Arm", 39, (math.radians(-35), 0, 0))
-
-# Frame 48: Loop back to the start of run pose
-set_bone_rotation(pose_bones, "Pelvis", 48, (math.radians(10), 0, 0))
-set_bone_rotation(pose_bones, "Left_Thigh", 48, (math.radians(45), 0, 0))
-set_bone_rotation(pose_bones, "Left_Shin", 48, (math.radians(-25), 0, 0))
-set_bone_rotation(pose_bones, "Right_Thigh", 48, (math.radians(-5), 0, 0))
-set_bone_rotation(pose_bones, "Right_Shin", 48, (math.radians(5), 0, 0))
-set_bone_rotation(pose_bones, "Left_Upper_Arm", 48, (math.radians(-35), 0, 0))
-set_bone_rotation(pose_bones, "Right_Upper_Arm", 48, (math.radians(35), 0, 0))
-
-# ---------------------------------------------------
-# Revised Jump Cycle (frames 60 to 80)
-# Adjusted crouch and recovery with more dynamic knee bends.
-# ---------------------------------------------------
-# Frame 60: Crouch before jump
-set_bone_rotation(pose_bones, "Pelvis", 60, (math.radians(-15), 0, 0))
-set_bone_rotation(pose_bones, "Left_Thigh", 60, (math.radians(-50), 0, 0))
-set_bone_rotation(pose_bones, "Left_Shin", 60, (math.radians(30), 0, 0))
-set_bone_rotation(pose_bones, "Right_Thigh", 60, (math.radians(-50), 0, 0))
-set_bone_rotation(pose_bones, "Right_Shin", 60, (math.radians(30), 0, 0))
-set_bone_rotation(pose_bones, "Left_Upper_Arm", 60, (math.radians(25), 0, 0))
-set_bone_rotation(pose_bones, "Right_Upper_Arm", 60, (math.radians(-25), 0, 0))
-
-# Frame 65: Takeoff – legs extend
-set_bone_rotation(pose_bones, "Pelvis", 65, (math.radians(0), 0, 0))
-set_bone_rotation(pose_bones, "Left_Thigh", 65, (math.radians(0), 0, 0))
-set_bone_rotation(pose_bones, "Left_Shin", 65, (math.radians(0), 0, 0))
-set_bone_rotation(pose_bones, "Right_Thigh", 65, (math.radians(0), 0, 0))
-set_bone_rotation(pose_bones, "Right_Shin", 65, (math.radians(0), 0, 0))
-set_bone_rotation(pose_bones, "Left_Upper_Arm", 65, (math.radians(-10), 0, 0))
-set_bone_rotation(pose_bones, "Right_Upper_Arm", 65, (math.radians(10), 0, 0))
-
-# Frame 70: Mid-air pose – knees slightly bent for clearance, arms raised
-set_bone_rotation(pose_bones, "Pelvis", 70, (math.radians(10), 0, 0))
-set_bone_rotation(pose_bones, "Left_Thigh", 70, (math.radians(30), 0, 0))
-set_bone_rotation(pose_bones, "Left_Shin", 70, (math.radians(-20), 0, 0))
-set_bone_rotation(pose_bones, "Right_Thigh", 70, (math.radians(30), 0, 0))
-set_bone_rotation(pose_bones, "Right_Shin", 70, (math.radians(-20), 0, 0))
-set_bone_rotation(pose_bones, "Left_Upper_Arm", 70, (math.radians(40), 0, 0))
-set_bone_rotation(pose_bones, "Right_Upper_Arm", 70, (math.radians(40), 0, 0))
-
-# Frame 75: Landing pose – legs bend to absorb impact
-set_bone_rotation(pose_bones, "Pelvis", 75, (math.radians(0), 0, 0))
-set_bone_rotation(pose_bones, "Left_Thigh", 75, (math.radians(-20), 0, 0))
-set_bone_rotation(pose_bones, "Left_Shin", 75, (math.radians(20), 0, 0))
-set_bone_rotation(pose_bones, "Right_Thigh", 75, (math.radians(-20), 0, 0))
-set_bone_rotation(pose_bones, "Right_Shin", 75, (math.radians(20), 0, 0))
-set_bone_rotation(pose_bones, "Left_Upper_Arm", 75, (math.radians(0), 0, 0))
-set_bone_rotation(pose_bones, "Right_Upper_Arm", 75, (math.radians(0), 0, 0))
-
-# Frame 80: Recovery to standing pose
-set_bone_rotation(pose_bones, "Pelvis", 80, (math.radians(0), 0, 0))
-set_bone_rotation(pose_bones, "Left_Thigh", 80, (math.radians(0), 0, 0))
-set_bone_rotation(pose_bones, "Left_Shin", 80, (math.radians(0), 0, 0))
-set_bone_rotation(pose_bones, "Right_Thigh", 80, (math.radians(0), 0, 0))
-set_bone_rotation(pose_bones, "Right_Shin", 80, (math.radians(0), 0, 0))
-set_bone_rotation(pose_bones, "Left_Upper_Arm", 80, (math.radians(0), 0, 0))
-set_bone_rotation(pose_bones, "Right_Upper_Arm", 80, (math.radians(0), 0, 0))
-
-# Return to Object mode when finished
-bpy.ops.object.mode_set(mode='OBJECT')
-
-print("Aligned human mesh created, parented to the rig, and revised animations added!")
+import os
+import sys
+
+import bpy
+import numpy as np
+
+# Make the sibling modules importable when run from Blender's text editor or --python.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import cache
+import clips
+import keyreduce
+import profiling
+import weights
+
+# 'ANALYTIC' computes closed-form weights from the bone segments (fast),
+# 'AUTO' uses Blender's heat-diffusion automatic weights (ARMATURE_AUTO).
+WEIGHT_MODE = 'ANALYTIC'
+
+# Subdivision Surface levels of the body mesh
+SUBDIVISION_LEVELS = 2
+
+# 'PARTS' builds one closed primitive per body part, 'SURFACE' one closed
+# surface with the limbs and head joined to the torso (no interior caps or
+# overlapping faces, but a different mesh than before)
+BODY_MODE = 'PARTS'
+
+
+def bone_positions(rig_obj):
+    """
+    Reads the rest-pose head and tail of every bone of the rig in one
+    foreach_get per attribute. Returns {bone name: (head, tail)}.
+    """
+    bones = rig_obj.data.bones
+    heads = np.empty(len(bones) * 3, dtype=np.float32)
+    tails = np.empty(len(bones) * 3, dtype=np.float32)
+    bones.foreach_get("head_local", heads)
+    bones.foreach_get("tail_local", tails)
+    heads = heads.reshape(-1, 3)
+    tails = tails.reshape(-1, 3)
+    return {bone.name: (heads[i], tails[i]) for i, bone in enumerate(bones)}
+
+
+def create_mesh_from_arrays(name, geometry):
+    """
+    Writes the arrays produced by body.build_body() into a new mesh datablock
+    with one foreach_set per attribute, and links it as a new object.
+    """
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(geometry["vertices"]))
+    mesh.vertices.foreach_set("co", geometry["vertices"].ravel())
+    mesh.loops.add(len(geometry["loop_vertices"]))
+    mesh.loops.foreach_set("vertex_index", geometry["loop_vertices"])
+    mesh.polygons.add(len(geometry["loop_starts"]))
+    mesh.polygons.foreach_set("loop_start", geometry["loop_starts"])
+    try:
+        mesh.polygons.foreach_set("loop_total", geometry["loop_totals"])
+    except (AttributeError, TypeError):
+        # Blender 4.0+ derives loop_total from the loop starts.
+        pass
+    mesh.update(calc_edges=True)
+    mesh.validate()
+
+    obj = bpy.data.objects.new(name, mesh)
+    bpy.context.collection.objects.link(obj)
+    return obj
+
+
+def bone_hierarchy(rig_obj):
+    """
+    Returns ({bone name: parent name or None}, [deform bone names]) for the rig.
+    """
+    bones = rig_obj.data.bones
+    parents = {bone.name: (bone.parent.name if bone.parent else None) for bone in bones}
+    deform = [bone.name for bone in bones if bone.use_deform]
+    return parents, deform
+
+
+def assign_analytic_weights(mesh_obj, rig_obj, geometry, skin_weights=None):
+    """
+    Computes closed-form weights with weights.compute_weights() (unless
+    precomputed (bone_names, weights) are passed in skin_weights) and writes
+    them to one vertex group per deform bone. Weights are quantized so each
+    group is filled with one VertexGroup.add() call per distinct weight value.
+    """
+    if skin_weights is None:
+        parents, deform = bone_hierarchy(rig_obj)
+        skin_weights = weights.compute_weights(geometry, bone_positions(rig_obj), parents, deform)
+    bone_names, vertex_weights = skin_weights
+    groups = [mesh_obj.vertex_groups.new(name=name) for name in bone_names]
+    for b, value, verts in weights.quantized_groups(vertex_weights):
+        groups[b].add(verts.tolist(), value, 'REPLACE')
+
+
+def parent_to_rig(mesh_obj, rig_obj, geometry, mode=WEIGHT_MODE, skin_weights=None):
+    """
+    Parents the mesh to the rig with an Armature modifier.
+    mode='ANALYTIC' writes closed-form weights without any operator;
+    mode='AUTO' falls back to bpy.ops.object.parent_set(type='ARMATURE_AUTO').
+    """
+    if mode == 'AUTO':
+        bpy.ops.object.select_all(action='DESELECT')
+        mesh_obj.select_set(True)
+        rig_obj.select_set(True)
+        bpy.context.view_layer.objects.active = rig_obj
+        bpy.ops.object.parent_set(type='ARMATURE_AUTO')
+        return
+    if mode != 'ANALYTIC':
+        raise ValueError(f"Unknown weight mode '{mode}'")
+
+    assign_analytic_weights(mesh_obj, rig_obj, geometry, skin_weights)
+    mesh_obj.parent = rig_obj
+    modifier = mesh_obj.modifiers.new("Armature", type='ARMATURE')
+    modifier.object = rig_obj
+
+
+def build_lod_meshes(rig_obj, levels, base_name="AlignedHumanMesh"):
+    """
+    Writes the LODs from lod.build_lods() as weighted mesh datablocks named
+    '<base_name>_<LOD name>' (kept with a fake user, since only the object
+    showing a LOD uses it) and returns their names, nearest first. Vertex
+    group names live on the mesh (Blender 3.0+), so the LODs can be swapped
+    on any object parented to the rig with apply_lod().
+    """
+    names = []
+    for level in levels:
+        spec = level["lod"]
+        name = f"{base_name}_{spec.name}"
+        old = bpy.data.meshes.get(name)
+        if old is not None:
+            bpy.data.meshes.remove(old)
+        holder = create_mesh_from_arrays(name, level["geometry"])
+        assign_analytic_weights(holder, rig_obj, level["geometry"], (level["bone_names"], level["weights"]))
+        data = holder.data
+        data.use_fake_user = True
+        data["biped_subdivision"] = spec.subdivision
+        data["biped_min_screen"] = spec.min_screen
+        bpy.data.objects.remove(holder)
+        names.append(name)
+    return names
+
+
+def apply_lod(mesh_obj, index):
+    """
+    Shows LOD `index` of the object's 'biped_lod_meshes' on it and sets its
+    Subsurf modifier to that LOD's levels, disabling it entirely (viewport
+    and render) on LODs without subdivision.
+    """
+    data = bpy.data.meshes[mesh_obj["biped_lod_meshes"][index]]
+    if mesh_obj.data != data:
+        mesh_obj.data = data
+    levels = data.get("biped_subdivision", 0)
+    subsurf = mesh_obj.modifiers.get("Subsurf")
+    if subsurf is None and levels:
+        subsurf = mesh_obj.modifiers.new("Subsurf", type='SUBSURF')
+    if subsurf is not None:
+        subsurf.levels = levels
+        subsurf.render_levels = levels
+        subsurf.show_viewport = levels > 0
+        subsurf.show_render = levels > 0
+    mesh_obj["biped_lod"] = index
+
+
+# ========================================================
+# Revised Animation Section with Adjusted Shoulders and Knees
+# ========================================================
+def set_bone_rotation(pose_bones, bone_name, frame, rotation_euler, rotation_order='XYZ'):
+    bone = pose_bones.get(bone_name)
+    if bone is None:
+        print(f"Warning: Bone '{bone_name}' not found in rig.")
+        return
+    bone.rotation_mode = rotation_order
+    bone.rotation_euler = rotation_euler
+    bone.keyframe_insert(data_path="rotation_euler", frame=frame)
+    profiling.count("keyframe_insert")
+
+
+def write_clip_fcurves(rig_obj, bone_names, frames, values, data_path="rotation_euler",
+                       rotation_order='XYZ', action_name="BipedAction", action=None):
+    """
+    Writes a whole clip into the rig's Action in bulk.
+
+    frames:  (F,) frame numbers
+    values:  (F, B, C) array, one row of channel values per frame and bone
+    For every bone and channel the F-curve gets all its keys through one
+    keyframe_points.add() plus one foreach_set for the coordinates and one for
+    the interpolation, so the cost stays flat per curve however many keys the
+    clip has. Existing keys on the curves are kept, except those on frames the
+    clip writes again, which are replaced. Keys go to the rig's active Action
+    (created if needed) unless an explicit action is passed. Returns the Action.
+    """
+    frames = np.asarray(frames, dtype=np.float32)
+    values = np.asarray(values, dtype=np.float32)
+    if values.shape[:2] != (len(frames), len(bone_names)):
+        raise ValueError(f"Expected values of shape ({len(frames)}, {len(bone_names)}, channels), got {values.shape}")
+
+    if action is None:
+        anim_data = rig_obj.animation_data or rig_obj.animation_data_create()
+        action = anim_data.action
+        if action is None:
+            action = bpy.data.actions.new(action_name)
+            anim_data.action = action
+
+    pose_bones = rig_obj.pose.bones
+    bezier = bpy.types.Keyframe.bl_rna.properties["interpolation"].enum_items["BEZIER"].value
+    for b, bone_name in enumerate(bone_names):
+        bone = pose_bones.get(bone_name)
+        if bone is None:
+            print(f"Warning: Bone '{bone_name}' not found in rig.")
+            continue
+        bone.rotation_mode = rotation_order
+        path = f'pose.bones["{bone_name}"].{data_path}'
+        for c in range(values.shape[2]):
+            fcurve = action.fcurves.find(path, index=c)
+            if fcurve is None:
+                fcurve = action.fcurves.new(path, index=c, action_group=bone_name)
+                # Fixed handle smoothing keeps the curve shape independent of the
+                # user preferences, so it can be reproduced outside Blender.
+                fcurve.auto_smoothing = 'NONE'
+            points = fcurve.keyframe_points
+            existing = len(points)
+            co = np.empty(existing * 2, dtype=np.float32)
+            interpolation = np.empty(existing, dtype=np.int32)
+            points.foreach_get("co", co)
+            points.foreach_get("interpolation", interpolation)
+
+            new_co = np.stack([frames, values[:, b, c]], axis=-1)
+            keep = ~np.isin(co[0::2], frames)
+            if not keep.all():
+                # Re-keyed frames replace the old keys: rebuild the curve once
+                co = co.reshape(-1, 2)[keep].ravel()
+                interpolation = interpolation[keep]
+                points.clear()
+                points.add(len(interpolation) + len(frames))
+            else:
+                points.add(len(frames))
+            points.foreach_set("co", np.concatenate([co, new_co.ravel()]))
+            points.foreach_set("interpolation", np.concatenate(
+                [interpolation, np.full(len(frames), bezier, dtype=np.int32)]))
+            # Sorts the keys and recalculates the auto-clamped handles
+            fcurve.update()
+    return action
+
+
+def write_reduced_fcurves(rig_obj, reduced, rotation_order='XYZ', action=None):
+    """
+    Writes a keyreduce.ReducedClip: each bone gets only its own kept keys,
+    through write_clip_fcurves(). Returns the Action.
+    """
+    for bone_name, frames, values in keyreduce.curves(reduced):
+        action = write_clip_fcurves(rig_obj, [bone_name], frames, values[:, None], data_path=reduced.data_path,
+                                    rotation_order=rotation_order, action=action)
+    return action
+
+
+def add_revised_animations(rig_obj, clip_names=None, library_path=clips.DEFAULT_LIBRARY, clip_list=None):
+    """
+    Keys clips onto the rig, by default the revised walk (1-25), run (30-48)
+    and jump (60-80) cycles. Only the requested clips are read from the
+    memory-mapped library; already loaded clips can be passed as clip_list.
+    """
+    if clip_list is None:
+        clip_list = clips.ClipLibrary(library_path).load_many(clip_names)
+    for clip in clip_list:
+        with profiling.stage(f"mesh.keys.{clip.name}"):
+            write_clip_fcurves(rig_obj, clip.bones, clip.frames, clip.values, data_path=clip.data_path)
+
+
+if __name__ == "__main__":
+    # Set BIPED_PROFILE=1 (or a trace path) to profile the build
+    profiling.enable_from_environment()
+
+    # -------------------------------
+    # Ensure the rig exists and is available
+    # -------------------------------
+    rig_obj = bpy.data.objects.get("BipedRig")
+    if rig_obj is None:
+        raise Exception("BipedRig not found! Please run the rig script first.")
+
+    # Ensure we are in Object mode
+    bpy.ops.object.mode_set(mode='OBJECT')
+
+    # -------------------------------
+    # Fetch the body arrays and weights from the artifact cache (generated
+    # and stored on a miss); the clips do not take part in its key
+    # -------------------------------
+    with profiling.stage("mesh.artifacts"):
+        positions = bone_positions(rig_obj)
+        parents, deform = bone_hierarchy(rig_obj)
+        key, artifacts, hit = cache.load_or_build(
+            positions, parents, deform, subdivision_levels=SUBDIVISION_LEVELS,
+            weight_mode=WEIGHT_MODE, body_mode=BODY_MODE)
+    print(f"Body artifacts {'reused from' if hit else 'stored in'} the cache ({key[:12]})")
+
+    human_mesh = bpy.data.objects.get("AlignedHumanMesh")
+    if human_mesh is not None and human_mesh.get("biped_cache_key") == key:
+        # Nothing that affects the geometry changed: keep the existing mesh
+        print("AlignedHumanMesh is up to date, skipping the rebuild")
+    else:
+        if human_mesh is not None:
+            old_mesh = human_mesh.data
+            bpy.data.objects.remove(human_mesh)
+            if old_mesh.users == 0:
+                bpy.data.meshes.remove(old_mesh)
+
+        # -------------------------------
+        # Write the cached body parts (in rig space) into one mesh
+        # -------------------------------
+        with profiling.stage("mesh.create_mesh"):
+            geometry = cache.geometry_from_artifacts(artifacts)
+            human_mesh = create_mesh_from_arrays("AlignedHumanMesh", geometry)
+            human_mesh["biped_cache_key"] = key
+
+        # -------------------------------
+        # Parent the mesh to the rig (analytic or automatic weights)
+        # -------------------------------
+        with profiling.stage("mesh.parent_to_rig"):
+            skin_weights = None
+            if "weights" in artifacts:
+                skin_weights = ([str(name) for name in artifacts["weight_bones"]], artifacts["weights"])
+            parent_to_rig(human_mesh, rig_obj, geometry, skin_weights=skin_weights)
+
+        # Optional: Add a Subdivision Surface modifier for smoothness.
+        # Added after parenting so it stays behind the Armature modifier.
+        subsurf = human_mesh.modifiers.new("Subsurf", type='SUBSURF')
+        subsurf.levels = SUBDIVISION_LEVELS
+
+    print("Aligned human mesh created and parented to the rig!")
+
+    # Key the walk, run and jump cycles from the clip library
+    with profiling.stage("mesh.animations"):
+        add_revised_animations(rig_obj)
+
+    print("Aligned human mesh created, parented to the rig, and revised animations added!")
+
+    profiling.finish()
@@ -0,0 +1,213 @@
+"""
+Opt-in instrumentation for the build scripts.
+
+Stages are marked with `with profiling.stage("name"):`. While profiling is
+enabled every stage records its wall time, the bpy operators called inside it
+(bpy.ops is swapped for a counting proxy), how many of the mode_set calls
+actually switched mode, and how many bones, vertices, faces and keyframes the
+scene gained. Stages nest; counts are inclusive, like the wall times.
+At the end a summary table is printed and a trace in the Chrome trace-event
+format is written, which chrome://tracing or https://ui.perfetto.dev can open.
+
+Profiling is off unless enable() is called, or the BIPED_PROFILE environment
+variable is set for scripts that call enable_from_environment() (its value
+is the trace path, or 1 for the default path). When off, stage() returns a
+shared no-op context manager and count() returns immediately, so leaving the
+markers in costs next to nothing.
+"""
+import contextlib
+import json
+import os
+import time
+
+ENV_VAR = "BIPED_PROFILE"
+DEFAULT_TRACE = "biped_profile.json"
+
+_NULL_STAGE = contextlib.nullcontext()
+_session = None
+
+
+class _Session:
+    def __init__(self, bpy, trace_path):
+        self.bpy = bpy
+        self.trace_path = trace_path
+        self.origin = time.perf_counter()
+        self.open = []       # stack of stage records
+        self.stages = {}     # name -> aggregated record
+        self.events = []     # trace events
+        self.real_ops = bpy.ops
+
+    def now_us(self):
+        return (time.perf_counter() - self.origin) * 1e6
+
+    def add(self, counter, amount=1):
+        for record in self.open:
+            counts = record["counts"]
+            counts[counter] = counts.get(counter, 0) + amount
+
+
+# -------------------------------
+# bpy.ops proxy
+# -------------------------------
+class _CountedOperator:
+    def __init__(self, operator, name):
+        self._operator = operator
+        self._name = name
+
+    def __call__(self, *args, **kwargs):
+        session = _session
+        if session is None:
+            return self._operator(*args, **kwargs)
+        active = session.bpy.context.object if self._name == "object.mode_set" else None
+        mode_before = getattr(active, "mode", None)
+        start = session.now_us()
+        try:
+            return self._operator(*args, **kwargs)
+        finally:
+            session.events.append({"name": self._name, "cat": "operator", "ph": "X",
+                                   "ts": start, "dur": session.now_us() - start, "pid": 0, "tid": 0})
+            session.add(f"ops.{self._name}")
+            if active is not None and active.mode != mode_before:
+                session.add("mode switches")
+
+    def __getattr__(self, attr):
+        return getattr(self._operator, attr)
+
+
+class _CountedSubmodule:
+    def __init__(self, submodule, name):
+        self._submodule = submodule
+        self._name = name
+
+    def __getattr__(self, attr):
+        return _CountedOperator(getattr(self._submodule, attr), f"{self._name}.{attr}")
+
+
+class _CountedOps:
+    def __init__(self, ops):
+        self._ops = ops
+
+    def __getattr__(self, attr):
+        return _CountedSubmodule(getattr(self._ops, attr), attr)
+
+
+# -------------------------------
+# Scene totals
+# -------------------------------
+def _scene_totals(bpy):
+    data = bpy.data
+    keys = 0
+    for action in data.actions:
+        for fcurve in action.fcurves:
+            keys += len(fcurve.keyframe_points)
+    return {
+        "bones": sum(len(armature.bones) for armature in data.armatures),
+        "vertices": sum(len(mesh.vertices) for mesh in data.meshes),
+        "faces": sum(len(mesh.polygons) for mesh in data.meshes),
+        "keys": keys,
+    }
+
+
+# -------------------------------
+# Public API
+# -------------------------------
+def enable(trace_path=DEFAULT_TRACE):
+    """Starts a profiling session (ends any running one)."""
+    global _session
+    import bpy
+    disable()
+    _session = _Session(bpy, trace_path)
+    bpy.ops = _CountedOps(_session.real_ops)
+
+
+def enable_from_environment():
+    """Enables profiling if BIPED_PROFILE is set; returns whether it did."""
+    value = os.environ.get(ENV_VAR)
+    if not value or value == "0":
+        return False
+    enable(DEFAULT_TRACE if value == "1" else value)
+    return True
+
+
+def disable():
+    """Ends the session without reporting and restores bpy.ops."""
+    global _session
+    if _session is not None:
+        _session.bpy.ops = _session.real_ops
+        _session = None
+
+
+def enabled():
+    return _session is not None
+
+
+def stage(name):
+    """Context manager marking a profiled stage (a shared no-op when disabled)."""
+    if _session is None:
+        return _NULL_STAGE
+    return _stage(_session, name)
+
+
+@contextlib.contextmanager
+def _stage(session, name):
+    before = _scene_totals(session.bpy)
+    record = {"counts": {}}
+    session.open.append(record)
+    start = session.now_us()
+    try:
+        yield
+    finally:
+        duration = session.now_us() - start
+        session.open.pop()
+        after = _scene_totals(session.bpy)
+        counts = record["counts"]
+        for key, value in after.items():
+            if value != before[key]:
+                counts[f"+{key}"] = value - before[key]
+
+        total = session.stages.setdefault(name, {"calls": 0, "seconds": 0.0, "counts": {}})
+        total["calls"] += 1
+        total["seconds"] += duration / 1e6
+        for key, value in counts.items():
+            total["counts"][key] = total["counts"].get(key, 0) + value
+        session.events.append({"name": name, "cat": "stage", "ph": "X", "ts": start, "dur": duration,
+                               "pid": 0, "tid": 0, "args": dict(counts)})
+
+
+def count(counter, amount=1):
+    """Adds to a named counter of every open stage (no-op when disabled)."""
+    if _session is None:
+        return
+    _session.add(counter, amount)
+
+
+def summary():
+    """The per-stage results as a text table."""
+    if _session is None:
+        return ""
+    lines = [f"{'stage':<36}{'calls':>6}{'seconds':>10}  counts"]
+    for name, total in _session.stages.items():
+        counts = ", ".join(f"{key} {value}" for key, value in sorted(total["counts"].items()))
+        lines.append(f"{name:<36}{total['calls']:>6}{total['seconds']:>10.4f}  {counts}")
+    return "\n".join(lines)
+
+
+def write_trace(path=None):
+    """Writes the trace events of the session; returns the path written."""
+    if _session is None:
+        return None
+    path = path or _session.trace_path
+    with open(path, "w") as f:
+        json.dump({"traceEvents": _session.events, "displayTimeUnit": "ms",
+                   "otherData": {"stages": _session.stages}}, f)
+    return path
+
+
+def finish():
+    """Prints the summary, writes the trace and ends the session (no-op when disabled)."""
+    if _session is None:
+        return
+    print(summary())
+    path = write_trace()
+    print(f"Profile trace written to {os.path.abspath(path)}")
+    disable()
@@ -0,0 +1,201 @@
+"""
+Declarative description of the biped skeleton used by rig.py.
+
+Everything in this module is plain Python / NumPy data, so the rig layout can
+be inspected, validated and transformed without Blender running. rig.py turns
+the table into the BipedRig armature in a single Edit-mode session.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+# name:    bone name in the armature
+# head:    head position in armature space
+# tail:    tail position in armature space
+# parent:  name of the parent bone, or None for a root bone
+# deform:  whether the bone deforms the body mesh
+# ik_role: None for regular bones, 'TARGET' or 'POLE' for IK control bones
+Bone = namedtuple("Bone", "name head tail parent deform ik_role")
+
+# name:         constraint name
+# owner:        bone that carries the IK constraint (end of the chain)
+# target:       IK target bone
+# pole:         pole target bone
+# chain_count:  number of bones affected by the constraint
+# pole_angle:   pole angle in radians
+IKConstraint = namedtuple("IKConstraint", "name owner target pole chain_count pole_angle")
+
+# -------------------------------
+# Basic rig bones
+# -------------------------------
+BONES = [
+    Bone("Pelvis", (0, 0, 0), (0, 0, 0.2), None, True, None),
+    Bone("Spine", (0, 0, 0.2), (0, 0, 0.8), "Pelvis", True, None),
+    Bone("Chest", (0, 0, 0.8), (0, 0, 1.2), "Spine", True, None),
+    Bone("Neck", (0, 0, 1.2), (0, 0, 1.4), "Chest", True, None),
+    Bone("Head", (0, 0, 1.4), (0, 0, 1.6), "Neck", True, None),
+
+    # Left Arm (head of the upper arm is the approximate shoulder position)
+    Bone("Left_Upper_Arm", (0, 0, 1.15), (-0.3, 0, 1.0), "Chest", True, None),
+    Bone("Left_Forearm", (-0.3, 0, 1.0), (-0.5, 0, 0.8), "Left_Upper_Arm", True, None),
+    Bone("Left_Hand", (-0.5, 0, 0.8), (-0.6, 0, 0.7), "Left_Forearm", True, None),
+
+    # Right Arm
+    Bone("Right_Upper_Arm", (0, 0, 1.15), (0.3, 0, 1.0), "Chest", True, None),
+    Bone("Right_Forearm", (0.3, 0, 1.0), (0.5, 0, 0.8), "Right_Upper_Arm", True, None),
+    Bone("Right_Hand", (0.5, 0, 0.8), (0.6, 0, 0.7), "Right_Forearm", True, None),
+
+    # Left Leg (head of the thigh is at pelvis level)
+    Bone("Left_Thigh", (0, 0, 0), (-0.2, 0, -0.6), "Pelvis", True, None),
+    Bone("Left_Shin", (-0.2, 0, -0.6), (-0.2, 0, -1.2), "Left_Thigh", True, None),
+    Bone("Left_Foot", (-0.2, 0, -1.2), (-0.2, 0.2, -1.2), "Left_Shin", True, None),
+
+    # Right Leg
+    Bone("Right_Thigh", (0, 0, 0), (0.2, 0, -0.6), "Pelvis", True, None),
+    Bone("Right_Shin", (0.2, 0, -0.6), (0.2, 0, -1.2), "Right_Thigh", True, None),
+    Bone("Right_Foot", (0.2, 0, -1.2), (0.2, 0.2, -1.2), "Right_Shin", True, None),
+
+    # IK control bones for legs: targets sit at the foot tip, poles in front of the knee
+    Bone("Left_IK_Target", (-0.2, 0.2, -1.2), (-0.2, 0.2, -1.4), "Pelvis", False, 'TARGET'),
+    Bone("Left_Knee_Pole", (-0.2, 0.3, -0.6), (-0.2, 0.3, -0.5), "Pelvis", False, 'POLE'),
+    Bone("Right_IK_Target", (0.2, 0.2, -1.2), (0.2, 0.2, -1.4), "Pelvis", False, 'TARGET'),
+    Bone("Right_Knee_Pole", (0.2, 0.3, -0.6), (0.2, 0.3, -0.5), "Pelvis", False, 'POLE'),
+
+    # IK control bones for arms: targets sit at the hand tip, poles in front of the elbow
+    Bone("Left_IK_Arm", (-0.6, 0, 0.7), (-0.7, -0.1, 0.7), "Chest", False, 'TARGET'),
+    Bone("Left_Elbow_Pole", (-0.3, 0.3, 1.0), (-0.3, 0.3, 1.1), "Chest", False, 'POLE'),
+    Bone("Right_IK_Arm", (0.6, 0, 0.7), (0.7, -0.1, 0.7), "Chest", False, 'TARGET'),
+    Bone("Right_Elbow_Pole", (0.3, 0.3, 1.0), (0.3, 0.3, 1.1), "Chest", False, 'POLE'),
+]
+
+# -------------------------------
+# IK constraints (chain_count = 2 affects the owner and its parent)
+# -------------------------------
+IK_CONSTRAINTS = [
+    IKConstraint("LeftLeg_IK", "Left_Shin", "Left_IK_Target", "Left_Knee_Pole", 2, 0.0),
+    IKConstraint("RightLeg_IK", "Right_Shin", "Right_IK_Target", "Right_Knee_Pole", 2, 0.0),
+    IKConstraint("LeftArm_IK", "Left_Forearm", "Left_IK_Arm", "Left_Elbow_Pole", 2, 0.0),
+    IKConstraint("RightArm_IK", "Right_Forearm", "Right_IK_Arm", "Right_Elbow_Pole", 2, 0.0),
+]
+
+
+def topological_order(bones):
+    """
+    Returns the bones sorted so that every parent comes before its children.
+    Bones keep their table order wherever the hierarchy allows it.
+    Raises ValueError on unknown parents or cycles.
+    """
+    by_name = {bone.name: bone for bone in bones}
+    ordered = []
+    placed = set()
+    visiting = set()
+
+    def visit(bone):
+        if bone.name in placed:
+            return
+        if bone.name in visiting:
+            raise ValueError(f"Cycle in bone hierarchy at '{bone.name}'")
+        visiting.add(bone.name)
+        if bone.parent is not None:
+            parent = by_name.get(bone.parent)
+            if parent is None:
+                raise ValueError(f"Bone '{bone.name}' has unknown parent '{bone.parent}'")
+            visit(parent)
+        visiting.discard(bone.name)
+        placed.add(bone.name)
+        ordered.append(bone)
+
+    for bone in bones:
+        visit(bone)
+    return ordered
+
+
+def validate(bones=BONES, ik_constraints=IK_CONSTRAINTS):
+    """
+    Checks the skeleton table for problems Blender would silently paper over:
+    duplicate names, zero-length bones (removed when leaving Edit mode),
+    broken parent links and IK constraints pointing at missing bones.
+    Raises ValueError describing the first problem found.
+    """
+    names = [bone.name for bone in bones]
+    if len(set(names)) != len(names):
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        raise ValueError(f"Duplicate bone names: {duplicates}")
+
+    arrays = as_arrays(bones)
+    lengths = np.linalg.norm(arrays["tails"] - arrays["heads"], axis=1)
+    short = [names[i] for i in np.flatnonzero(lengths < 1e-6)]
+    if short:
+        raise ValueError(f"Zero-length bones: {short}")
+
+    topological_order(bones)
+
+    known = set(names)
+    for constraint in ik_constraints:
+        for bone_name in (constraint.owner, constraint.target, constraint.pole):
+            if bone_name not in known:
+                raise ValueError(f"IK constraint '{constraint.name}' references unknown bone '{bone_name}'")
+        if constraint.chain_count < 1:
+            raise ValueError(f"IK constraint '{constraint.name}' needs a chain_count of at least 1")
+
+
+def as_arrays(bones=BONES):
+    """
+    Converts the bone table into NumPy arrays:
+    names (list), heads and tails (N, 3), parents (N,) as indices with -1 for
+    roots, deform (N,) bool and ik_roles (list).
+    """
+    names = [bone.name for bone in bones]
+    index = {name: i for i, name in enumerate(names)}
+    return {
+        "names": names,
+        "heads": np.array([bone.head for bone in bones], dtype=np.float64).reshape(-1, 3),
+        "tails": np.array([bone.tail for bone in bones], dtype=np.float64).reshape(-1, 3),
+        "parents": np.array([index.get(bone.parent, -1) for bone in bones], dtype=np.int64),
+        "deform": np.array([bone.deform for bone in bones], dtype=bool),
+        "ik_roles": [bone.ik_role for bone in bones],
+    }
+
+
+def from_arrays(arrays):
+    """
+    Inverse of as_arrays(): rebuilds a bone table from (possibly transformed) arrays.
+    """
+    names = arrays["names"]
+    bones = []
+    for i, name in enumerate(names):
+        parent = int(arrays["parents"][i])
+        bones.append(Bone(
+            name,
+            tuple(float(v) for v in arrays["heads"][i]),
+            tuple(float(v) for v in arrays["tails"][i]),
+            names[parent] if parent >= 0 else None,
+            bool(arrays["deform"][i]),
+            arrays["ik_roles"][i],
+        ))
+    return bones
+
+
+def transformed(bones=BONES, matrix=None, scale=1.0, offset=(0, 0, 0)):
+    """
+    Returns a new bone table with every head and tail mapped through
+    p' = matrix @ (p * scale) + offset. Useful for generating proportion
+    variants of the rig without touching Blender.
+    """
+    arrays = as_arrays(bones)
+    linear = np.eye(3) if matrix is None else np.asarray(matrix, dtype=np.float64)
+    for key in ("heads", "tails"):
+        arrays[key] = (arrays[key] * scale) @ linear.T + np.asarray(offset, dtype=np.float64)
+    return from_arrays(arrays)
+
+
+def rest_positions(bones=BONES):
+    """
+    Returns {bone name: (head, tail)} with NumPy vectors, the same layout as
+    reading bone.head / bone.tail from the rest pose in Blender.
+    """
+    arrays = as_arrays(bones)
+    return {
+        name: (arrays["heads"][i], arrays["tails"][i])
+        for i, name in enumerate(arrays["names"])
+    }
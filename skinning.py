@@ -0,0 +1,104 @@
+"""
+Linear-blend skinning of the body mesh in NumPy, streamed to a point cache.
+
+Deforms the AlignedHumanMesh vertices (body.build_body()) with per-bone
+weights (weights.compute_weights()) and per-frame pose matrices (fk.py), the
+same way Blender's Armature modifier does without volume preservation:
+
+    v' = sum_b w_b * pose[b] @ inverse(rest[b]) @ v
+
+Frames are processed in chunks and each chunk is a single matrix product of
+the (V, B) weights with the chunk's (B, 12) skin matrices, so memory stays
+bounded by the chunk size. Results are written to a memory-mapped PC2 point
+cache (the format read by Blender's Mesh Cache modifier), so long clips never
+need to fit in RAM.
+"""
+import struct
+
+import numpy as np
+
+import fk
+
+PC2_MAGIC = b"POINTCACHE2\0"
+PC2_VERSION = 1
+PC2_HEADER = struct.Struct("<12siiffi")
+
+# Frames deformed per batch
+CHUNK_FRAMES = 64
+
+
+def skin_matrices(rig, pose, bone_names):
+    """(F, B, 3, 4) skin matrices pose @ inverse(rest) for the weighted bones."""
+    columns = [rig.index[name] for name in bone_names]
+    skin = pose[:, columns] @ np.linalg.inv(rig.rest[columns])[None]
+    return skin[..., :3, :]
+
+
+def deform(vertices, weights, skin):
+    """
+    Deforms rest vertices (V, 3) with weights (V, B) and skin matrices
+    (F, B, 3, 4). Returns (F, V, 3) float32 positions.
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    frames, bones = skin.shape[:2]
+    blended = (weights @ skin.reshape(frames, bones, 12)).reshape(frames, -1, 3, 4)
+    positions = np.einsum('fvij,vj->fvi', blended[..., :3], vertices) + blended[..., 3]
+    return positions.astype(np.float32)
+
+
+def deform_clip(vertices, bone_names, weights, clip, rig=None, frames=None, chunk=CHUNK_FRAMES):
+    """
+    Yields (first frame index, positions (C, V, 3)) for consecutive chunks of
+    the clip's frames. Bone matrices are evaluated per chunk as well, so only
+    one chunk of poses and positions is alive at a time.
+    """
+    rig = rig or fk.Rig()
+    if frames is None:
+        frames = np.arange(clip.frame_start, clip.frame_end + 1)
+    frames = np.asarray(frames, dtype=np.float64)
+    for start in range(0, len(frames), chunk):
+        _, pose = fk.evaluate_clip(clip, frames[start:start + chunk], rig)
+        yield start, deform(vertices, weights, skin_matrices(rig, pose, bone_names))
+
+
+def create_pc2(path, vertex_count, frame_count, start_frame=0.0, sample_rate=1.0):
+    """
+    Creates a PC2 file of the right size and returns a writable (F, V, 3)
+    float32 memory map of its sample data.
+    """
+    with open(path, "wb") as f:
+        f.write(PC2_HEADER.pack(PC2_MAGIC, PC2_VERSION, vertex_count, float(start_frame),
+                                float(sample_rate), frame_count))
+        f.truncate(PC2_HEADER.size + frame_count * vertex_count * 3 * 4)
+    return np.memmap(path, dtype="<f4", mode="r+", offset=PC2_HEADER.size,
+                     shape=(frame_count, vertex_count, 3))
+
+
+def read_pc2(path):
+    """Returns (start_frame, sample_rate, read-only (F, V, 3) memory map) of a PC2 file."""
+    with open(path, "rb") as f:
+        magic, version, vertex_count, start_frame, sample_rate, frame_count = PC2_HEADER.unpack(
+            f.read(PC2_HEADER.size))
+    if magic != PC2_MAGIC:
+        raise ValueError(f"'{path}' is not a PC2 point cache")
+    samples = np.memmap(path, dtype="<f4", mode="r", offset=PC2_HEADER.size,
+                        shape=(frame_count, vertex_count, 3))
+    return start_frame, sample_rate, samples
+
+
+def bake_clip_to_pc2(path, vertices, bone_names, weights, clip, rig=None, frames=None, chunk=CHUNK_FRAMES):
+    """
+    Skins a whole clip and streams the deformed positions chunk by chunk into
+    a PC2 point cache at `path`. Returns the number of frames written.
+    """
+    if frames is None:
+        frames = np.arange(clip.frame_start, clip.frame_end + 1)
+    frames = np.asarray(frames, dtype=np.float64)
+    step = float(frames[1] - frames[0]) if len(frames) > 1 else 1.0
+    cache = create_pc2(path, len(vertices), len(frames), frames[0], step)
+    for start, positions in deform_clip(vertices, bone_names, weights, clip, rig, frames, chunk):
+        cache[start:start + len(positions)] = positions
+    cache.flush()
+    del cache
+    return len(frames)
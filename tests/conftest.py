@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Make the modules at the repository root importable, like the scripts do when run from Blender.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+import body
+import lod
+import skeleton
+
+
+def edges(geometry):
+    """(E, 2) directed edges of every polygon, in winding order."""
+    loops = geometry["loop_vertices"].astype(np.int64)
+    starts, totals = geometry["loop_starts"], geometry["loop_totals"]
+    following = np.arange(len(loops)) + 1
+    last = starts + totals - 1
+    following[last] = starts
+    return np.stack([loops, loops[following]], axis=-1)
+
+
+def shells(vertex_count, pairs):
+    """Connected components of the vertices used by the edges."""
+    parent = np.arange(vertex_count)
+    changed = True
+    while changed:
+        low = np.minimum(parent[pairs[:, 0]], parent[pairs[:, 1]])
+        changed = False
+        for column in (0, 1):
+            smaller = low < parent[pairs[:, column]]
+            if smaller.any():
+                np.minimum.at(parent, pairs[smaller, column], low[smaller])
+                changed = True
+        parent = parent[parent]
+    return len(np.unique(parent[np.unique(pairs)]))
+
+
+@pytest.fixture(scope="module")
+def positions():
+    return skeleton.rest_positions()
+
+
+@pytest.mark.parametrize("edge_length", [0.02, body.EDGE_LENGTH, 0.3, 2.0])
+def test_surface_is_one_closed_genus_zero_shell(positions, edge_length):
+    geometry = body.build_surface(positions, edge_length=edge_length, ring_spacing=edge_length * 2.5, min_segments=4)
+    directed = edges(geometry)
+    # Closed and consistently wound: every edge is used once in each direction
+    forward = {tuple(edge) for edge in directed}
+    assert len(forward) == len(directed)
+    assert all((b, a) in forward for a, b in forward)
+
+    vertex_count = len(geometry["vertices"])
+    assert np.array_equal(np.unique(geometry["loop_vertices"]), np.arange(vertex_count))
+    assert shells(vertex_count, directed) == 1
+    euler = vertex_count - len(directed) // 2 + len(geometry["loop_totals"])
+    assert euler == 2
+
+
+def test_surface_faces_outwards(positions):
+    geometry = body.build_surface(positions)
+    vertices = geometry["vertices"].astype(np.float64)
+    triangles = []
+    for start, total in zip(geometry["loop_starts"], geometry["loop_totals"]):
+        face = geometry["loop_vertices"][start:start + total]
+        triangles.extend((face[0], face[k], face[k + 1]) for k in range(1, total - 1))
+    a, b, c = (vertices[np.array(triangles)[:, k]] for k in range(3))
+    assert np.einsum('ij,ij->i', a, np.cross(b, c)).sum() > 0.0
+
+
+def test_no_limb_vertex_inside_the_torso(positions):
+    geometry = body.build_surface(positions)
+    torso = next(part for part in body.BODY_PARTS if part.name == "Torso")
+    names = geometry["part_names"]
+    limb = np.array([names[p] not in ("Torso", "Head") for p in geometry["part_index"]])
+    x, y, z = geometry["vertices"][limb].T
+    bottom, top = positions["Pelvis"][0][2], positions["Chest"][1][2]
+    inside = (np.hypot(x, y) < torso.radius - 1e-4) & (z > bottom + 1e-4) & (z < top - 1e-4)
+    assert not inside.any()
+
+
+def test_build_body_passes_the_surface_density(positions):
+    coarse = body.build_body(positions, mode='SURFACE', edge_length=0.2)
+    fine = body.build_body(positions, mode='SURFACE', edge_length=0.05)
+    assert len(coarse["vertices"]) < len(body.build_body(positions, mode='SURFACE')["vertices"]) < len(fine["vertices"])
+
+
+@pytest.mark.parametrize("budget, subdivision", [(150, 0), (500, 0), (2000, 0), (8000, 2)])
+def test_fit_budget_meets_the_vertex_budget(positions, budget, subdivision):
+    geometry = lod.fit_budget(positions, budget, subdivision)
+    assert lod.subdivided_vertex_count(geometry, subdivision) <= budget
@@ -0,0 +1,145 @@
+"""
+bvh.py on a small synthetic take: a Mixamo-named hierarchy built from the
+rig's rest pose with the arms held out in a T-pose, in BVH's Y-up axes,
+with random joint rotations on every frame.
+"""
+import numpy as np
+import pytest
+
+import bvh
+import clips
+import fk
+
+FRAMES = 37
+
+# Rig bone -> BVH joint name of the fixture
+JOINT_NAMES = {
+    "Pelvis": "Hips", "Spine": "Spine", "Chest": "Spine2", "Neck": "Neck", "Head": "Head",
+    "Left_Upper_Arm": "LeftArm", "Left_Forearm": "LeftForeArm", "Left_Hand": "LeftHand",
+    "Right_Upper_Arm": "RightArm", "Right_Forearm": "RightForeArm", "Right_Hand": "RightHand",
+    "Left_Thigh": "LeftUpLeg", "Left_Shin": "LeftLeg", "Left_Foot": "LeftFoot",
+    "Right_Thigh": "RightUpLeg", "Right_Shin": "RightLeg", "Right_Foot": "RightFoot",
+}
+
+
+def t_pose(rig):
+    """Rig-space (heads, tails) of the deform bones with the arm chains straightened out sideways."""
+    heads, tails = rig.heads.copy(), rig.tails.copy()
+    for side, sign in (("Left", -1.0), ("Right", 1.0)):
+        head = heads[rig.index[f"{side}_Upper_Arm"]]
+        for bone in ("Upper_Arm", "Forearm", "Hand"):
+            b = rig.index[f"{side}_{bone}"]
+            heads[b] = head
+            tails[b] = head = head + [sign * rig.lengths[b], 0.0, 0.0]
+    return heads, tails
+
+
+def write_bvh(path, rig, frame_time, frames=FRAMES, seed=0):
+    """Writes the fixture take and returns its motion rows (frames, channels)."""
+    heads, tails = t_pose(rig)
+    to_bvh = bvh.BVH_TO_RIG.T
+    lines, channels = ["HIERARCHY"], 0
+
+    def joint(b, depth):
+        nonlocal channels
+        parent = rig.parents[b]
+        offset = to_bvh @ (heads[b] - (heads[parent] if parent >= 0 else 0.0))
+        pad = "  " * depth
+        lines.append(f"{pad}{'ROOT' if parent < 0 else 'JOINT'} {JOINT_NAMES[rig.names[b]]}")
+        lines.append(pad + "{")
+        lines.append(f"{pad}  OFFSET {offset[0]:.9f} {offset[1]:.9f} {offset[2]:.9f}")
+        if parent < 0:
+            lines.append(f"{pad}  CHANNELS 6 Xposition Yposition Zposition Zrotation Xrotation Yrotation")
+            channels += 6
+        else:
+            lines.append(f"{pad}  CHANNELS 3 Zrotation Xrotation Yrotation")
+            channels += 3
+        children = [c for c in range(len(rig.names)) if rig.parents[c] == b and rig.names[c] in JOINT_NAMES]
+        for c in children:
+            joint(c, depth + 1)
+        if not children:
+            end = to_bvh @ (tails[b] - heads[b])
+            lines.extend([f"{pad}  End Site", pad + "  {", f"{pad}    OFFSET {end[0]:.9f} {end[1]:.9f} {end[2]:.9f}",
+                          pad + "  }"])
+        lines.append(pad + "}")
+
+    joint(rig.index["Pelvis"], 0)
+    rows = np.random.default_rng(seed).uniform(-40.0, 40.0, size=(frames, channels))
+    rows[:, :3] = 0.0
+    lines += ["MOTION", f"Frames: {frames}", f"Frame Time: {frame_time}"]
+    lines += [" ".join(f"{v:.6f}" for v in row) for row in rows]
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return rows
+
+
+@pytest.fixture(scope="module")
+def rig():
+    return fk.Rig()
+
+
+@pytest.fixture(scope="module")
+def take(tmp_path_factory, rig):
+    path = str(tmp_path_factory.mktemp("bvh") / "take.bvh")
+    rows = write_bvh(path, rig, 0.0416667)
+    return path, rows
+
+
+def test_read_motion_in_chunks_matches_whole(take):
+    path, rows = take
+    with open(path) as f:
+        header = bvh.read_header(f)
+        chunks = list(bvh.read_motion(f, header, chunk_frames=5))
+    assert header.frames == FRAMES and header.channels == rows.shape[1]
+    assert [start for start, _ in chunks] == list(range(0, FRAMES, 5))
+    np.testing.assert_array_equal(np.concatenate([chunk for _, chunk in chunks]), np.round(rows, 6))
+
+
+def test_chunked_import_matches_whole(take, tmp_path):
+    path, _ = take
+    whole = clips.ClipLibrary(bvh.import_bvh(path, str(tmp_path / "whole.bpc"))).load_many()[0]
+    chunked = clips.ClipLibrary(bvh.import_bvh(path, str(tmp_path / "chunked.bpc"), chunk_frames=4)).load_many()[0]
+    assert chunked.bones == whole.bones == [name for name in JOINT_NAMES]
+    np.testing.assert_array_equal(chunked.frames, whole.frames)
+    np.testing.assert_array_equal(chunked.values, whole.values)
+
+
+def test_key_times_snap_to_frames():
+    # 0.0416667 s is 1/24 s written with 7 digits: keys stay on whole frames
+    np.testing.assert_array_equal(bvh.key_times(1000, 0.0416667, fps=24), np.arange(1000))
+    # 30 fps onto 24 fps: every fifth key is on a whole frame, the others between
+    times = bvh.key_times(11, 1.0 / 30.0, fps=24)
+    np.testing.assert_allclose(times, np.arange(11) * 0.8)
+    assert np.array_equal(times[::5], [0.0, 4.0, 8.0])
+
+
+@pytest.mark.parametrize("frame_time, frame_end", [(0.0416667, 1 + FRAMES - 1), (1.0 / 30.0, 1 + 29)])
+def test_import_frame_range(rig, tmp_path, frame_time, frame_end):
+    # The 37 frames of a 30 fps take span 28.8 scene frames at 24 fps: the range ends on the next whole frame
+    path = str(tmp_path / "take.bvh")
+    write_bvh(path, rig, frame_time)
+    library = clips.ClipLibrary(bvh.import_bvh(path, fps=24))
+    assert library.frame_range("take") == (1, frame_end)
+    clip = library.load_many()[0]
+    assert len(clip.frames) == FRAMES and clip.frames[-1] <= frame_end
+
+
+def test_retargeted_directions_follow_bvh(take, rig, tmp_path):
+    path, _ = take
+    clip = clips.ClipLibrary(bvh.import_bvh(path, str(tmp_path / "take.bpc"))).load_many()[0]
+    _, pose = fk.evaluate_clip(clip, clip.frames, rig)
+    heads, tails = rig.heads_tails(pose)
+
+    with open(path) as f:
+        header = bvh.read_header(f)
+        rows = np.concatenate([chunk for _, chunk in bvh.read_motion(f, header)])
+    world = bvh.Skeleton(header).world_rotations(rows)
+
+    # A joint's segment is its T-pose bone turned by the joint's world rotation
+    rest_heads, rest_tails = t_pose(rig)
+    names = [joint.name for joint in header.joints]
+    for bone, name in JOINT_NAMES.items():
+        b = rig.index[bone]
+        segment = world[:, names.index(name)] @ (bvh.BVH_TO_RIG.T @ (rest_tails[b] - rest_heads[b]))
+        expected = segment @ bvh.BVH_TO_RIG.T / rig.lengths[b]
+        np.testing.assert_allclose((tails[:, b] - heads[:, b]) / rig.lengths[b], expected, atol=1e-5, err_msg=bone)
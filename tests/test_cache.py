@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+import cache
+import clips
+import skeleton
+
+
+@pytest.fixture(scope="module")
+def inputs():
+    positions = skeleton.rest_positions()
+    parents = {bone.name: bone.parent for bone in skeleton.BONES}
+    deform = [bone.name for bone in skeleton.BONES if bone.deform]
+    return positions, parents, deform
+
+
+def test_body_hit_after_miss(inputs, tmp_path):
+    store = cache.ArtifactCache(str(tmp_path))
+    key, built, hit = cache.load_or_build(*inputs, cache=store)
+    assert not hit
+    again, loaded, hit = cache.load_or_build(*inputs, cache=store)
+    assert hit and again == key
+    for name, array in built.items():
+        np.testing.assert_array_equal(loaded[name], array)
+
+
+def test_body_key_ignores_clips_and_follows_body_inputs(inputs):
+    key = cache.artifact_key(*inputs)
+    assert cache.artifact_key(*inputs) == key
+    assert cache.artifact_key(*inputs, body_mode='SURFACE') != key
+    positions = dict(inputs[0], Head=(inputs[0]["Head"][0], inputs[0]["Head"][1] + 0.01))
+    assert cache.artifact_key(positions, *inputs[1:]) != key
+
+
+def test_clip_key_follows_key_data():
+    walk = clips.ClipLibrary().load("walk")
+    values = np.array(walk.values)
+    values[0, 0, 0] += 0.01
+    assert cache.clip_key(walk) == cache.clip_key(clips.ClipLibrary().load("walk"))
+    assert cache.clip_key(walk._replace(values=values)) != cache.clip_key(walk)
+
+
+def test_auto_weights_are_not_computed(inputs):
+    _, arrays, _ = cache.load_or_build(*inputs, weight_mode='AUTO', cache=False)
+    assert "weights" not in arrays and "vertices" in arrays
+
+
+def test_clip_tracks_round_trip(tmp_path):
+    store = cache.ArtifactCache(str(tmp_path))
+    walk = clips.ClipLibrary().load("walk")
+    _, tracks, hit = cache.load_or_sample(walk, store)
+    assert not hit
+    _, loaded, hit = cache.load_or_sample(walk, store)
+    assert hit
+    np.testing.assert_array_equal(loaded["values"], tracks["values"])
+    assert list(loaded["bones"]) == list(walk.bones)
+    assert len(loaded["frames"]) == walk.frame_end - walk.frame_start + 1
+
+
+def test_corrupt_entry_is_a_miss(inputs, tmp_path):
+    store = cache.ArtifactCache(str(tmp_path))
+    key, _, _ = cache.load_or_build(*inputs, cache=store)
+    with open(store._path(key), "r+b") as f:
+        f.truncate(100)
+    assert store.get(key) is None
+    assert not cache.load_or_build(*inputs, cache=store)[2]
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+import clips
+
+
+def assert_same_clip(loaded, clip):
+    assert (loaded.name, loaded.frame_start, loaded.frame_end) == (clip.name, clip.frame_start, clip.frame_end)
+    assert loaded.bones == list(clip.bones)
+    assert loaded.data_path == clip.data_path
+    np.testing.assert_array_equal(loaded.frames, np.asarray(clip.frames, dtype=np.float32))
+    np.testing.assert_array_equal(loaded.values, np.asarray(clip.values, dtype=np.float32))
+
+
+def test_write_library_round_trip(tmp_path):
+    path = tmp_path / "clips.bpc"
+    written = clips.builtin_clips()
+    written.append(clips.Clip("quat", 5, 9, np.arange(5, 10, dtype=np.float32), ["Pelvis", "Chest"],
+                              np.random.default_rng(0).normal(size=(5, 2, 4)), "rotation_quaternion"))
+    clips.write_library(str(path), written)
+
+    library = clips.ClipLibrary(str(path))
+    assert library.names() == [clip.name for clip in written]
+    assert len(library) == len(written) and "quat" in library
+    assert library.frame_range("quat") == (5, 9)
+    for loaded, clip in zip(library.load_many(), written):
+        assert_same_clip(loaded, clip)
+        assert library.tracks(clip.name).shape == (len(clip.bones), np.shape(clip.values)[2], len(clip.frames))
+
+
+def test_shipped_library_matches_builtin_clips():
+    library = clips.ClipLibrary()
+    for clip in clips.builtin_clips():
+        assert_same_clip(library.load(clip.name), clip)
+
+
+def test_write_library_rejects_mismatched_values(tmp_path):
+    clip = clips.Clip("bad", 1, 3, np.arange(1, 4), ["Pelvis"], np.zeros((2, 1, 3)), "rotation_euler")
+    with pytest.raises(ValueError):
+        clips.write_library(str(tmp_path / "bad.bpc"), [clip])
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bpc"
+    path.write_bytes(b"not a clip library")
+    with pytest.raises(ValueError):
+        clips.ClipLibrary(str(path))
@@ -0,0 +1,59 @@
+"""
+crowd.py under bpy_stub: the LOD handler is a single persistent module-level
+function that finds the crowd collection by name, and phase offsets of any
+size or sign map onto the clip's cycle.
+"""
+import numpy as np
+import pytest
+
+import bpy_stub
+
+bpy = bpy_stub.install()
+
+import crowd  # noqa: E402  (needs the stub installed as 'bpy')
+
+
+def test_lod_handler_is_persistent_and_registered_once():
+    bpy_stub.reset()
+    scene = bpy_stub.context.scene
+    for _ in range(2):
+        assert crowd.register_lod_handler("Extras", scene) is crowd.lod_handler
+    for handlers in (bpy.app.handlers.frame_change_pre, bpy.app.handlers.render_pre):
+        assert handlers.count(crowd.lod_handler) == 1
+    assert getattr(crowd.lod_handler, "_bpy_persistent", False)
+    assert scene["biped_lod_collection"] == "Extras"
+    # No such collection in the scene: nothing to update
+    crowd.lod_handler(scene)
+
+
+def phase(offset, rate=1.0, frame_start=1, frame_end=25, scene_start=1, scene_end=250):
+    """Fraction of the cycle played on the scene's first frame, and the strip timing."""
+    start, scale, repeat = crowd.strip_timing(offset, rate, frame_start, frame_end, scene_start, scene_end)
+    cycle = (frame_end - frame_start) * scale
+    return (scene_start - start) / cycle, start, cycle, repeat
+
+
+@pytest.mark.parametrize("rate", [0.8, 1.0, 1.2])
+@pytest.mark.parametrize("offset", [0.0, 5.0, 23.5])
+def test_offset_maps_to_phase(offset, rate):
+    fraction, start, cycle, repeat = phase(offset, rate)
+    assert 0.0 <= fraction < 1.0
+    assert fraction == pytest.approx((offset % cycle) / cycle)
+    assert start <= 1 and start + repeat * cycle >= 250
+
+
+@pytest.mark.parametrize("offset", [10.0, 13.0])
+def test_offsets_wrap_around_the_cycle(offset):
+    fraction, _, cycle, _ = phase(offset, 1.2)
+    for k in (1, 2, 7):
+        assert phase(offset + k * cycle, 1.2)[0] == pytest.approx(fraction)
+    # A negative offset lands as far before the end of the cycle as it is below zero
+    assert phase(-offset, 1.2)[0] == pytest.approx(1.0 - fraction)
+    assert 0.0 <= phase(-offset - 3 * cycle, 1.2)[0] < 1.0
+
+
+def test_strip_timing_is_vectorized():
+    offsets = np.array([-30.0, -1.0, 0.0, 7.5, 24.0, 100.0])
+    start, scale, repeat = crowd.strip_timing(offsets, 1.0, 1, 25, 1, 250)
+    np.testing.assert_allclose(1 - start, np.mod(offsets, 24.0))
+    assert np.all(start + repeat * 24.0 >= 250)
@@ -0,0 +1,84 @@
+"""
+fk.py against a per-bone reference that follows Blender's pose evaluation
+one bone and one frame at a time, with rest matrices and Euler rotations
+built without fk.py.
+"""
+import numpy as np
+import pytest
+
+import clips
+import fk
+
+CLIP_NAMES = ["walk", "run", "jump"]
+
+
+def rotation_between(a, b):
+    """Shortest-arc rotation taking the unit vector a onto b (Rodrigues)."""
+    axis = np.cross(a, b)
+    cos = np.dot(a, b)
+    k = np.array([[0.0, -axis[2], axis[1]], [axis[2], 0.0, -axis[0]], [-axis[1], axis[0], 0.0]])
+    return np.eye(3) + k + k @ k / (1.0 + cos)
+
+
+def euler_xyz(x, y, z):
+    """Blender's 'XYZ' Euler matrix, X applied first."""
+    cx, sx, cy, sy, cz, sz = np.cos(x), np.sin(x), np.cos(y), np.sin(y), np.cos(z), np.sin(z)
+    rx = np.array([[1.0, 0.0, 0.0], [0.0, cx, -sx], [0.0, sx, cx]])
+    ry = np.array([[cy, 0.0, sy], [0.0, 1.0, 0.0], [-sy, 0.0, cy]])
+    rz = np.array([[cz, -sz, 0.0], [sz, cz, 0.0], [0.0, 0.0, 1.0]])
+    return rz @ ry @ rx
+
+
+def reference_rest(rig):
+    """Edit-bone matrices with roll 0: +Y turned onto the bone, head as translation."""
+    rest = np.tile(np.eye(4), (len(rig.names), 1, 1))
+    for b, (head, tail) in enumerate(zip(rig.heads, rig.tails)):
+        rest[b, :3, :3] = rotation_between(np.array([0.0, 1.0, 0.0]), (tail - head) / np.linalg.norm(tail - head))
+        rest[b, :3, 3] = head
+    return rest
+
+
+def reference_pose(rig, rest, clip, key):
+    """Pose matrices (B, 4, 4) at one key of a clip, one bone at a time."""
+    basis = {name: np.eye(4) for name in rig.names}
+    for b, name in enumerate(clip.bones):
+        basis[name][:3, :3] = euler_xyz(*np.asarray(clip.values[key, b], dtype=np.float64))
+    pose = {}
+
+    def evaluate(i):
+        if i not in pose:
+            parent = rig.parents[i]
+            local = rest[i] @ basis[rig.names[i]]
+            pose[i] = local if parent < 0 else evaluate(parent) @ np.linalg.inv(rest[parent]) @ local
+        return pose[i]
+
+    return np.array([evaluate(i) for i in range(len(rig.names))])
+
+
+@pytest.fixture(scope="module")
+def rig():
+    return fk.Rig()
+
+
+@pytest.fixture(scope="module")
+def library():
+    return clips.ClipLibrary()
+
+
+def test_rest_matrices_match_edit_bones(rig):
+    np.testing.assert_allclose(rig.rest, reference_rest(rig), atol=1e-12)
+
+
+def test_unkeyed_rig_stays_at_rest(rig):
+    basis = rig.basis_from_rotations([], np.zeros((3, 0, 3)))
+    np.testing.assert_allclose(rig.pose_matrices(basis), np.broadcast_to(rig.rest, (3,) + rig.rest.shape), atol=1e-12)
+
+
+@pytest.mark.parametrize("name", CLIP_NAMES)
+def test_matches_per_bone_reference(rig, library, name):
+    clip = library.load(name)
+    _, pose = fk.evaluate_clip(clip, clip.frames, rig)
+    rest = reference_rest(rig)
+    for key in range(len(clip.frames)):
+        np.testing.assert_allclose(pose[key], reference_pose(rig, rest, clip, key), atol=1e-6)
+
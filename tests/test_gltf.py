@@ -0,0 +1,146 @@
+import json
+import struct
+
+import numpy as np
+import pytest
+
+import body
+import clips
+import fk
+import gltf
+import ik
+import skeleton
+import weights
+
+_NUMPY_TYPES = {5121: "u1", 5123: "<u2", 5125: "<u4", 5126: "<f4"}
+_WIDTHS = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT4": 16}
+
+
+def read_glb(path):
+    """Returns (document, BIN chunk bytes) of a GLB file, checking its header and chunk layout."""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, total = struct.unpack_from("<4sII", data)
+    assert (magic, version, total) == (gltf.GLB_MAGIC, gltf.GLB_VERSION, len(data))
+    json_length, json_type = struct.unpack_from("<I4s", data, 12)
+    assert json_type == gltf.JSON_CHUNK and json_length % 4 == 0
+    document = json.loads(data[20:20 + json_length])
+    bin_length, bin_type = struct.unpack_from("<I4s", data, 20 + json_length)
+    assert bin_type == gltf.BIN_CHUNK and bin_length % 4 == 0
+    return document, data[28 + json_length:28 + json_length + bin_length]
+
+
+def accessor_data(document, binary, index):
+    """An accessor's elements as a (count, width) array read from the BIN chunk."""
+    accessor = document["accessors"][index]
+    view = document["bufferViews"][accessor["bufferView"]]
+    width = _WIDTHS[accessor["type"]]
+    dtype = np.dtype(_NUMPY_TYPES[accessor["componentType"]])
+    start = view.get("byteOffset", 0) + accessor.get("byteOffset", 0)
+    assert start + accessor["count"] * width * dtype.itemsize <= view.get("byteOffset", 0) + view["byteLength"]
+    return np.frombuffer(binary, dtype, accessor["count"] * width, start).reshape(-1, width)
+
+
+@pytest.fixture(scope="module")
+def exported(tmp_path_factory):
+    rig = fk.Rig()
+    positions = skeleton.rest_positions()
+    parents = {bone.name: bone.parent for bone in skeleton.BONES}
+    deform = [bone.name for bone in skeleton.BONES if bone.deform]
+    geometry = body.build_body(positions, mode=gltf.BODY_MODE)
+    bone_names, vertex_weights = weights.compute_weights(geometry, positions, parents, deform)
+    clip_list = clips.ClipLibrary().load_many()
+    path = str(tmp_path_factory.mktemp("glb") / "biped.glb")
+    gltf.write_glb(path, *gltf.build_document(rig, geometry, bone_names, vertex_weights, clip_list))
+    document, binary = read_glb(path)
+    return document, binary, geometry, clip_list
+
+
+def test_accessor_bounds_match_data(exported):
+    document, binary, _, _ = exported
+    bounded = [i for i, accessor in enumerate(document["accessors"]) if "min" in accessor]
+    assert bounded
+    for i in bounded:
+        data = accessor_data(document, binary, i)
+        accessor = document["accessors"][i]
+        np.testing.assert_array_equal(accessor["min"], data.min(axis=0))
+        np.testing.assert_array_equal(accessor["max"], data.max(axis=0))
+
+
+def test_required_bounds_are_present(exported):
+    # glTF 2.0 requires min / max on POSITION and on every animation sampler input
+    document, _, _, clip_list = exported
+    accessors = document["accessors"]
+    assert "min" in accessors[document["meshes"][0]["primitives"][0]["attributes"]["POSITION"]]
+    for animation in document["animations"]:
+        for sampler in animation["samplers"]:
+            assert "min" in accessors[sampler["input"]] and "max" in accessors[sampler["input"]]
+    assert [animation["name"] for animation in document["animations"]] == [clip.name for clip in clip_list]
+
+
+def test_mesh_attributes(exported):
+    document, binary, geometry, _ = exported
+    attributes = document["meshes"][0]["primitives"][0]["attributes"]
+    np.testing.assert_array_equal(accessor_data(document, binary, attributes["POSITION"]), geometry["vertices"])
+    normals = accessor_data(document, binary, attributes["NORMAL"])
+    np.testing.assert_allclose(np.linalg.norm(normals, axis=1), 1.0, atol=1e-5)
+    skin = accessor_data(document, binary, attributes["WEIGHTS_0"])
+    np.testing.assert_allclose(skin.sum(axis=1), 1.0, atol=1e-5)
+    joints = accessor_data(document, binary, attributes["JOINTS_0"])
+    assert joints.max() < len(document["skins"][0]["joints"])
+
+
+def test_inverse_bind_matrices_invert_rest(exported):
+    document, binary, _, _ = exported
+    bind = accessor_data(document, binary, document["skins"][0]["inverseBindMatrices"])
+    bind = np.swapaxes(bind.reshape(-1, 4, 4), -1, -2)
+    np.testing.assert_allclose(bind @ fk.Rig().rest, np.broadcast_to(np.eye(4), bind.shape), atol=1e-5)
+
+
+def quat_to_mat3(q):
+    """Rotation matrices (..., 3, 3) of glTF (x, y, z, w) quaternions."""
+    x, y, z, w = np.moveaxis(np.asarray(q, dtype=np.float64), -1, 0)
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)], axis=-1),
+        np.stack([2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)], axis=-1),
+        np.stack([2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)], axis=-1),
+    ], axis=-2)
+
+
+def animated_tails(document, binary, rig, animation):
+    """Bone tails (F, B, 3) in rig space posed from the node rest TRS and one animation's rotations."""
+    nodes = document["nodes"]
+    rotation = np.array([nodes[b + 1].get("rotation", [0.0, 0.0, 0.0, 1.0]) for b in range(len(rig.names))])
+    frames = None
+    for channel in animation["channels"]:
+        output = accessor_data(document, binary, animation["samplers"][channel["sampler"]]["output"])
+        if frames is None:
+            frames = len(output)
+            rotation = np.repeat(rotation[None], frames, axis=0)
+        rotation[:, channel["target"]["node"] - 1] = output
+    local = np.tile(np.eye(4), (frames, len(rig.names), 1, 1))
+    local[..., :3, :3] = quat_to_mat3(rotation)
+    local[..., :3, 3] = [nodes[b + 1].get("translation", [0.0, 0.0, 0.0]) for b in range(len(rig.names))]
+    world = np.empty_like(local)
+    for b in range(len(rig.names)):
+        parent = rig.parents[b]
+        world[:, b] = local[:, b] if parent < 0 else world[:, parent] @ local[:, b]
+    return world[..., :3, :3] @ np.array([0.0, 1.0, 0.0]) * rig.lengths[:, None] + world[..., :3, 3]
+
+
+@pytest.mark.parametrize("bake_ik", [True, False])
+def test_export_character_bakes_ik(tmp_path, bake_ik):
+    rig = fk.Rig()
+    walk = clips.builtin_clips()[0]
+    character = gltf.Character("biped", skeleton.BONES, gltf.BODY_MODE)
+    path = gltf.export_character(character, str(tmp_path / "biped.glb"), [walk], artifact_cache=False,
+                                 bake_ik=bake_ik)
+    document, binary = read_glb(path)
+    tails = animated_tails(document, binary, rig, document["animations"][0])
+
+    _, values = fk.sample_clip(walk)
+    basis = rig.basis_from_rotations(walk.bones, values)
+    _, solved = rig.heads_tails(rig.pose_matrices(ik.solve_basis(rig, basis)))
+    _, unsolved = rig.heads_tails(rig.pose_matrices(basis))
+    assert np.abs(solved - unsolved).max() > 1e-2
+    np.testing.assert_allclose(tails, solved if bake_ik else unsolved, atol=1e-4)
@@ -0,0 +1,100 @@
+"""
+ik.py: two-bone chains reach targets in range, straighten towards targets
+out of range, follow Blender's pole convention, and bake_clip() produces
+plain FK rotations that reproduce the solved pose.
+"""
+import numpy as np
+import pytest
+
+import clips
+import fk
+import ik
+import skeleton
+
+LEG = skeleton.IK_CONSTRAINTS[0]
+ARM = skeleton.IK_CONSTRAINTS[2]
+
+
+@pytest.fixture(scope="module")
+def rig():
+    return fk.Rig()
+
+
+def solve(rig, constraint, target, pole=None):
+    """Posed heads and tails (F, B, 3) of the rest pose with one chain solved towards target (F, 3)."""
+    basis = np.tile(np.eye(4), (len(target), len(rig.names), 1, 1))
+    poles = {constraint.name: pole} if pole is not None else None
+    basis = ik.solve_basis(rig, basis, [constraint], {constraint.name: target}, poles)
+    return rig.heads_tails(rig.pose_matrices(basis))
+
+
+@pytest.mark.parametrize("constraint", [LEG, ARM])
+def test_reachable_targets_are_hit(rig, constraint):
+    upper, lower = ik.chain_bones(rig, constraint)
+    root = rig.heads[upper]
+    reach = rig.lengths[upper] + rig.lengths[lower]
+    rng = np.random.default_rng(1)
+    direction = rng.normal(size=(64, 3))
+    direction /= np.linalg.norm(direction, axis=1, keepdims=True)
+    target = root + direction * rng.uniform(0.2, 0.98, size=(64, 1)) * reach
+
+    heads, tails = solve(rig, constraint, target)
+    np.testing.assert_allclose(tails[:, lower], target, atol=1e-6)
+    np.testing.assert_allclose(heads[:, upper], np.broadcast_to(root, target.shape), atol=1e-9)
+    np.testing.assert_allclose(np.linalg.norm(tails[:, upper] - heads[:, upper], axis=1), rig.lengths[upper])
+
+
+@pytest.mark.parametrize("constraint", [LEG, ARM])
+def test_unreachable_targets_straighten_towards_target(rig, constraint):
+    upper, lower = ik.chain_bones(rig, constraint)
+    root = rig.heads[upper]
+    direction = np.array([[0.3, -0.2, -1.0], [1.0, 0.5, 0.2], [-0.4, 1.0, 0.6]])
+    direction /= np.linalg.norm(direction, axis=1, keepdims=True)
+    target = root + 3.0 * direction
+
+    heads, tails = solve(rig, constraint, target)
+    upper_dir = (tails[:, upper] - heads[:, upper]) / rig.lengths[upper]
+    lower_dir = (tails[:, lower] - heads[:, lower]) / rig.lengths[lower]
+    np.testing.assert_allclose(upper_dir, direction, atol=1e-6)
+    np.testing.assert_allclose(lower_dir, direction, atol=1e-6)
+
+
+@pytest.mark.parametrize("pole_angle", [0.0, np.pi / 2, -np.pi / 2])
+def test_pole_angle_convention(pole_angle):
+    # FK pose with the knee sticking out along the upper bone's X axis turned
+    # by the pole angle towards Z (the lower bone bends the other way):
+    # Blender turns that axis onto the pole, so the knee ends up facing it
+    bend = np.array([np.cos(pole_angle), 0.0, np.sin(pole_angle)])
+    axis = np.cross([0.0, 1.0, 0.0], bend)
+    upper_rot = np.eye(3)
+    lower_rot = fk.axis_angle_to_mat3(axis, -0.4)
+    root = np.zeros(3)
+    target = np.array([0.2, -0.3, -0.7])
+    pole = np.array([0.5, 1.0, -0.2])
+
+    upper, lower = ik.solve_two_bone(upper_rot, lower_rot, root, target, pole, 0.5, 0.5, pole_angle)
+    knee = 0.5 * upper[:, 1]
+    tip = knee + 0.5 * lower[:, 1]
+    np.testing.assert_allclose(tip, target, atol=1e-9)
+
+    line = target / np.linalg.norm(target)
+
+    def across(v):
+        v = v - np.dot(v, line) * line
+        return v / np.linalg.norm(v)
+
+    assert np.dot(across(upper @ bend), across(pole)) == pytest.approx(1.0)
+    assert np.dot(across(knee), across(pole)) == pytest.approx(1.0)
+
+
+def test_bake_clip_reproduces_solved_pose(rig):
+    walk = clips.builtin_clips()[0]
+    frames, values = fk.sample_clip(walk)
+    solved = rig.pose_matrices(ik.solve_basis(rig, rig.basis_from_rotations(walk.bones, values)))
+
+    baked = ik.bake_clip(walk, rig)
+    for constraint in skeleton.IK_CONSTRAINTS:
+        assert {rig.names[b] for b in ik.chain_bones(rig, constraint)} <= set(baked.bones)
+    baked_frames, pose = fk.evaluate_clip(baked, frames, rig)
+    np.testing.assert_array_equal(baked_frames, frames)
+    np.testing.assert_allclose(pose, solved, atol=1e-5)
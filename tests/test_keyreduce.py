@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+import clips
+import gait
+import keyreduce
+
+
+@pytest.fixture(scope="module")
+def baked():
+    """Gait clips baked on every frame, the input keyreduce is meant for."""
+    return gait.to_clips("gait", gait.random_params(2, seed=7), np.arange(1, 97))
+
+
+@pytest.mark.parametrize("tolerance", [0.05, 0.1, 1.0])
+def test_max_error_within_tolerance(baked, tolerance):
+    for clip in baked:
+        stats = keyreduce.report(keyreduce.reduce_clip(clip, tolerance))
+        assert stats["max_error"] <= tolerance
+        assert stats["keys_after"] < stats["keys_before"]
+
+
+def test_looser_tolerance_keeps_fewer_keys(baked):
+    counts = [keyreduce.reduce_clip(baked[0], tolerance).keys.sum() for tolerance in (0.05, 0.5, 5.0)]
+    assert counts[0] >= counts[1] >= counts[2]
+
+
+def test_shipped_clip_within_tolerance():
+    reduced = keyreduce.reduce_clip(clips.ClipLibrary().load("walk"), 1e-4)
+    assert keyreduce.report(reduced)["max_error"] <= 1e-4
+
+
+@pytest.mark.parametrize("bits", [8, 16])
+def test_compact_archive_round_trip(baked, tmp_path, bits):
+    reduced = keyreduce.reduce_clip(baked[0], 0.1)
+    path = tmp_path / "gait.npz"
+    keyreduce.write_compact(str(path), reduced, bits)
+    loaded = keyreduce.read_compact(str(path))
+    np.testing.assert_array_equal(loaded.keys, reduced.keys)
+    assert loaded.bones == list(reduced.bones)
+
+    # Each key moves by at most half a quantization step of its curve
+    values = np.asarray(reduced.values, dtype=np.float64)
+    step = (values.max(axis=0) - values.min(axis=0)) / (2 ** bits - 1)
+    bone, key = np.nonzero(reduced.keys)
+    error = np.abs(np.asarray(loaded.values, dtype=np.float64)[key, bone] - values[key, bone])
+    assert np.all(error <= step[bone] / 2.0 + 1e-6)
@@ -0,0 +1,56 @@
+"""
+lod.py: every LOD select() can pick stays within its vertex budget, finer
+LODs are picked for taller projections, and transferred weights are
+normalized, non-negative and stay on their body part.
+"""
+import numpy as np
+import pytest
+
+import lod
+import skeleton
+import weights
+
+
+@pytest.fixture(scope="module")
+def levels():
+    positions = skeleton.rest_positions()
+    parents = {bone.name: bone.parent for bone in skeleton.BONES}
+    deform = [bone.name for bone in skeleton.BONES if bone.deform]
+    return lod.build_lods(positions, parents, deform)
+
+
+def test_selected_lods_meet_their_budgets(levels):
+    heights = np.array([1000.0, 400.0, 399.0, 150.0, 149.0, 50.0, 49.0, 0.0])
+    chosen = lod.select(heights)
+    np.testing.assert_array_equal(chosen, [0, 0, 1, 1, 2, 2, 3, 3])
+    counts = [lod.subdivided_vertex_count(levels[i]["geometry"], lod.LODS[i].subdivision) for i in chosen]
+    for i, count in zip(chosen, counts):
+        assert count <= lod.LODS[i].budget
+    assert counts == sorted(counts, reverse=True)
+
+
+def test_select_by_distance_coarsens_with_distance():
+    distances = np.linspace(0.5, 200.0, 50)
+    chosen = lod.select_by_distance(distances, 1.8, np.radians(40.0), 1080)
+    assert chosen[0] == 0 and chosen[-1] == len(lod.LODS) - 1
+    assert np.all(np.diff(chosen) >= 0)
+
+
+def test_transferred_weights_are_normalized(levels):
+    for level in levels:
+        level_weights = level["weights"]
+        assert level_weights.shape == (len(level["geometry"]["vertices"]), len(level["bone_names"]))
+        assert level_weights.min() >= 0.0
+        assert (np.count_nonzero(level_weights, axis=1) <= weights.MAX_INFLUENCES).all()
+        np.testing.assert_allclose(level_weights.sum(axis=1), 1.0, atol=1e-6)
+
+
+def test_transfer_weights_stay_on_the_part():
+    source = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [1.0, 1.0, 0.0]])
+    source_weights = np.array([[1.0, 0.0, 0.0], [0.5, 0.5, 0.0], [0.0, 0.0, 1.0], [0.0, 0.2, 0.8]])
+    target = np.array([[0.1, 0.9, 0.0], [0.9, 0.1, 0.0], [0.5, 0.5, 0.0]])
+    result = lod.transfer_weights(source, source_weights, target, [0, 0, 1, 1], [0, 1, 0])
+    np.testing.assert_allclose(result.sum(axis=1), 1.0, atol=1e-6)
+    # Target 0 sits next to part 1's vertices but only blends part 0's
+    assert result[0, 2] == 0.0 and result[2, 2] == 0.0
+    assert result[1, 0] == 0.0
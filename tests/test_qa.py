@@ -0,0 +1,65 @@
+"""
+qa.py self-contact checks on hand-posed frames: clean poses report nothing,
+while legs crossed below the hips and an upper arm swung into the torso are
+reported even though those pairs already overlap at the hips and shoulders.
+"""
+import numpy as np
+import pytest
+
+import qa
+
+
+@pytest.fixture(scope="module")
+def checker():
+    return qa.Checker()
+
+
+def posed(checker, bone, euler):
+    """Posed heads and tails (1, B, 3) with one bone rotated by an Euler XYZ triple."""
+    rig = checker.rig
+    basis = rig.basis_from_rotations([bone], np.array([[euler]], dtype=float))
+    return rig.heads_tails(rig.pose_matrices(basis))
+
+
+def contact_pairs(checker, heads, tails):
+    (frame, first, second, depth), _ = checker.check_frames(heads, tails)
+    names = checker.capsules.names
+    return {(names[i], names[j]) for i, j in zip(first, second)}
+
+
+def test_joint_pairs_excluded_and_rest_overlaps_trimmed(checker):
+    index = {name: c for c, name in enumerate(checker.capsules.names)}
+    assert checker.excluded[index["Left_Thigh"], index["Left_Shin"]]
+    assert checker.excluded[index["Left_Upper_Arm"], index["Left_Forearm"]]
+    for a, b in [("Left_Thigh", "Right_Thigh"), ("Left_Upper_Arm", "Pelvis-Chest")]:
+        i, j = sorted([index[a], index[b]])
+        assert not checker.excluded[i, j]
+        assert 0.0 < np.ptp(checker.span[i, j]) < 1.0
+        assert 0.0 < np.ptp(checker.span[j, i]) < 1.0
+
+
+def test_rest_pose_is_clean(checker):
+    rig = checker.rig
+    heads, tails = rig.heads_tails(rig.pose_matrices(np.tile(np.eye(4), (1, len(rig.names), 1, 1))))
+    assert contact_pairs(checker, heads, tails) == set()
+
+
+@pytest.mark.parametrize("bone, euler", [
+    ("Left_Thigh", [0.6, 0.0, 0.0]),
+    ("Left_Thigh", [-0.6, 0.0, 0.0]),
+    ("Left_Upper_Arm", [0.6, 0.0, 0.0]),
+])
+def test_clean_pose(checker, bone, euler):
+    assert contact_pairs(checker, *posed(checker, bone, euler)) == set()
+
+
+def test_crossed_legs_reported(checker):
+    heads, tails = posed(checker, "Left_Thigh", [0.0, 0.0, -0.6])
+    rig = checker.rig
+    assert tails[0, rig.index["Left_Thigh"], 0] > 0.0  # the left knee is past the midline
+    assert ("Left_Thigh", "Right_Thigh") in contact_pairs(checker, heads, tails)
+
+
+def test_arm_into_torso_reported(checker):
+    heads, tails = posed(checker, "Left_Upper_Arm", [-0.6, 0.0, 0.0])
+    assert ("Pelvis-Chest", "Left_Upper_Arm") in contact_pairs(checker, heads, tails)
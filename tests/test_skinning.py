@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+import body
+import clips
+import fk
+import skeleton
+import skinning
+import weights
+
+
+@pytest.fixture(scope="module", params=body.BODY_MODES)
+def skinned(request):
+    """Rest vertices, weighted bone names and weights of the default body."""
+    positions = skeleton.rest_positions()
+    parents = {bone.name: bone.parent for bone in skeleton.BONES}
+    deform = [bone.name for bone in skeleton.BONES if bone.deform]
+    geometry = body.build_body(positions, mode=request.param)
+    bone_names, vertex_weights = weights.compute_weights(geometry, positions, parents, deform)
+    return geometry["vertices"], bone_names, vertex_weights
+
+
+def test_rest_pose_returns_input_vertices(skinned):
+    vertices, bone_names, vertex_weights = skinned
+    rig = fk.Rig()
+    skin = skinning.skin_matrices(rig, rig.rest[None], bone_names)
+    np.testing.assert_allclose(skinning.deform(vertices, vertex_weights, skin)[0], vertices, atol=1e-5)
+
+
+def test_rigid_motion_moves_every_vertex_alike(skinned):
+    vertices, bone_names, vertex_weights = skinned
+    rig = fk.Rig()
+    motion = np.eye(4)
+    motion[:3, :3] = fk.euler_to_mat3(np.array([0.3, -0.2, 1.1]))
+    motion[:3, 3] = (0.5, -1.0, 2.0)
+    skin = skinning.skin_matrices(rig, (motion @ rig.rest)[None], bone_names)
+    expected = vertices @ motion[:3, :3].T + motion[:3, 3]
+    np.testing.assert_allclose(skinning.deform(vertices, vertex_weights, skin)[0], expected, atol=1e-5)
+
+
+def test_pc2_bake_matches_deform(skinned, tmp_path):
+    vertices, bone_names, vertex_weights = skinned
+    clip = clips.ClipLibrary().load("walk")
+    frames = np.arange(clip.frame_start, clip.frame_start + 10)
+    path = str(tmp_path / "walk.pc2")
+    assert skinning.bake_clip_to_pc2(path, vertices, bone_names, vertex_weights, clip, frames=frames, chunk=4) == 10
+
+    start, rate, samples = skinning.read_pc2(path)
+    assert (start, rate, samples.shape) == (frames[0], 1.0, (10, len(vertices), 3))
+    rig = fk.Rig()
+    _, pose = fk.evaluate_clip(clip, frames, rig)
+    expected = skinning.deform(vertices, vertex_weights, skinning.skin_matrices(rig, pose, bone_names))
+    np.testing.assert_array_equal(samples, expected)
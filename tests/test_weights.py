@@ -0,0 +1,62 @@
+"""
+weights.py: every vertex of the body keeps at most MAX_INFLUENCES bones and
+sums to one, including vertices where candidate bones tie, and a part left
+without a deform bone is an error instead of NaN weights.
+"""
+import numpy as np
+import pytest
+
+import body
+import skeleton
+import weights
+
+
+@pytest.fixture(scope="module")
+def rig_tables():
+    positions = skeleton.rest_positions()
+    parents = {bone.name: bone.parent for bone in skeleton.BONES}
+    deform = [bone.name for bone in skeleton.BONES if bone.deform]
+    return positions, parents, deform
+
+
+def assert_normalized(vertex_weights, max_influences=weights.MAX_INFLUENCES):
+    assert np.isfinite(vertex_weights).all() and vertex_weights.min() >= 0.0
+    assert (np.count_nonzero(vertex_weights, axis=1) <= max_influences).all()
+    np.testing.assert_allclose(vertex_weights.sum(axis=1), 1.0, atol=1e-6)
+
+
+@pytest.mark.parametrize("mode", body.BODY_MODES)
+def test_body_weights_are_limited_and_normalized(rig_tables, mode):
+    positions, parents, deform = rig_tables
+    geometry = body.build_body(positions, mode=mode)
+    bone_names, vertex_weights = weights.compute_weights(geometry, positions, parents, deform)
+    assert vertex_weights.shape == (len(geometry["vertices"]), len(bone_names))
+    assert_normalized(vertex_weights)
+
+
+def test_tied_weights_keep_max_influences(rig_tables):
+    # Torso points on the symmetry plane are as close to the left bones as to
+    # the right ones, so the fourth largest weight is a left / right tie
+    positions, parents, deform = rig_tables
+    z = np.linspace(-0.1, 1.5, 17)
+    geometry = {"vertices": np.stack([np.zeros_like(z), np.full_like(z, 0.2), z], axis=1),
+                "part_names": ["Torso"], "part_index": np.zeros(len(z), dtype=np.int64)}
+    _, unlimited = weights.compute_weights(geometry, positions, parents, deform, blend=2.0, max_influences=0)
+    fourth = -np.partition(-unlimited, 3, axis=1)[:, 3:4]
+    assert ((unlimited == fourth).sum(axis=1) > 1).any()
+
+    _, vertex_weights = weights.compute_weights(geometry, positions, parents, deform, blend=2.0)
+    assert_normalized(vertex_weights)
+
+
+def test_limit_influences_breaks_ties_by_bone_order():
+    row = np.array([[0.1, 0.3, 0.3, 0.3, 0.3, 0.3]])
+    np.testing.assert_array_equal(weights.limit_influences(row, 4), [[0.0, 0.3, 0.3, 0.3, 0.3, 0.0]])
+
+
+def test_part_without_deform_bone_raises(rig_tables):
+    positions, parents, deform = rig_tables
+    geometry = body.build_body(positions)
+    deform = [name for name in deform if name not in ("Chest", "Neck", "Head")]
+    with pytest.raises(ValueError, match="Head"):
+        weights.compute_weights(geometry, positions, parents, deform)
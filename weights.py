@@ -0,0 +1,166 @@
+"""
+Closed-form skin weights for the generated body mesh (NumPy only, no bpy).
+
+Each body part is generated from known bones (Torso from Pelvis to Chest,
+Left_Thigh_Mesh from Left_Thigh, ...), so instead of heat diffusion the
+weights are computed from the distance of every vertex to the bone segments
+of its part and their direct neighbours. The nearest bone gets full weight
+and every other candidate fades out smoothly over a blend distance, so joints
+blend between the two bones that meet there. Neighbouring bones are kept
+slightly behind the part's own bones so a limb root does not pull the torso
+wall along with it.
+"""
+import numpy as np
+
+import body
+
+# Default number of bone influences kept per vertex
+MAX_INFLUENCES = 4
+
+# Distance handicap of neighbouring bones, as a fraction of the blend width
+NEIGHBOUR_BIAS = 0.5
+
+
+def distance_to_segments(points, heads, tails):
+    """
+    Returns the (V, B) distances of every point to every head -> tail segment.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    heads = np.asarray(heads, dtype=np.float64)
+    axis = np.asarray(tails, dtype=np.float64) - heads
+    length_sq = np.maximum(np.einsum('bi,bi->b', axis, axis), 1e-12)
+    rel = points[:, None, :] - heads[None, :, :]
+    t = np.clip(np.einsum('vbi,bi->vb', rel, axis) / length_sq, 0.0, 1.0)
+    closest = heads[None, :, :] + t[..., None] * axis[None, :, :]
+    return np.linalg.norm(points[:, None, :] - closest, axis=-1)
+
+
+def _chain(bone_name, ancestor, parents):
+    """Bones from bone_name up to and including ancestor (or just bone_name)."""
+    chain = [bone_name]
+    current = bone_name
+    while current != ancestor and parents.get(current) is not None:
+        current = parents[current]
+        chain.append(current)
+    return chain if current == ancestor else [bone_name]
+
+
+def part_bones(parts, parents):
+    """
+    Returns {part name: bones the part follows}. A part spanning several bones
+    (the torso runs from the Pelvis head to the Chest tail) follows every
+    bone on the chain between its start and end bones.
+    """
+    return {
+        part.name: _chain(part.end[0], part.start[0], parents)[::-1]
+        for part in parts
+    }
+
+
+def candidate_mask(part_names, parts, bone_names, parents, deform):
+    """
+    Returns (allowed, own), two (P, B) bool masks: the bones allowed to
+    influence each part (its own bones plus their parents and children) and
+    the part's own bones. Only deform bones are ever allowed.
+    """
+    index = {name: i for i, name in enumerate(bone_names)}
+    children = {}
+    for child, parent in parents.items():
+        children.setdefault(parent, []).append(child)
+
+    follows = part_bones(parts, parents)
+    allowed_mask = np.zeros((len(part_names), len(bone_names)), dtype=bool)
+    own_mask = np.zeros_like(allowed_mask)
+    for p, part_name in enumerate(part_names):
+        own = follows[part_name]
+        allowed = set(own)
+        for bone_name in own:
+            if parents.get(bone_name) is not None:
+                allowed.add(parents[bone_name])
+            allowed.update(children.get(bone_name, ()))
+        for bone_name in allowed:
+            if bone_name in index:
+                allowed_mask[p, index[bone_name]] = True
+                own_mask[p, index[bone_name]] = bone_name in own
+    deform = np.asarray(deform, dtype=bool)[None, :]
+    return allowed_mask & deform, own_mask & deform
+
+
+def limit_influences(weights, max_influences=MAX_INFLUENCES):
+    """
+    Zeroes all but the max_influences largest entries of every row of a
+    (V, B) weight array; equal weights are kept in bone order, so a row
+    never keeps more than max_influences bones. Rows are not renormalized.
+    """
+    if not max_influences or max_influences >= weights.shape[1]:
+        return weights
+    order = np.argsort(-weights, axis=1, kind="stable")[:, :max_influences]
+    keep = np.zeros(weights.shape, dtype=bool)
+    np.put_along_axis(keep, order, True, axis=1)
+    return np.where(keep, weights, 0.0)
+
+
+def compute_weights(geometry, positions, parents, deform_bones, parts=body.BODY_PARTS,
+                    blend=None, max_influences=MAX_INFLUENCES):
+    """
+    Computes normalized skin weights for the arrays returned by body.build_body().
+
+    positions:     {bone name: (head, tail)}
+    parents:       {bone name: parent name or None}
+    deform_bones:  names of the bones that may receive weights
+    blend:         width of the joint blend zone; defaults to each part's radius
+    Returns (bone_names, weights) with weights of shape (V, B), rows summing
+    to one and at most max_influences non-zero entries per row. Raises
+    ValueError if a part of the geometry has no deform bone it may use.
+    """
+    bone_names = [name for name in positions if name in set(deform_bones)]
+    heads = np.array([positions[name][0] for name in bone_names], dtype=np.float64)
+    tails = np.array([positions[name][1] for name in bone_names], dtype=np.float64)
+    deform = np.ones(len(bone_names), dtype=bool)
+
+    part_names = geometry["part_names"]
+    part_index = geometry["part_index"]
+    allowed, own = candidate_mask(part_names, parts, bone_names, parents, deform)
+    unweighted = [name for p, name in enumerate(part_names) if not allowed[p].any() and np.any(part_index == p)]
+    if unweighted:
+        raise ValueError(f"Body parts with no deform bone to weight to: {unweighted}")
+    allowed, own = allowed[part_index], own[part_index]
+
+    if blend is None:
+        radius = {part.name: part.radius for part in parts}
+        width = np.array([radius[name] for name in part_names])[part_index][:, None]
+    else:
+        width = np.full((len(part_index), 1), float(blend))
+
+    dist = distance_to_segments(geometry["vertices"], heads, tails)
+    dist = np.where(own, dist, dist + NEIGHBOUR_BIAS * width)
+    dist = np.where(allowed, dist, np.inf)
+    nearest = dist.min(axis=1, keepdims=True)
+
+    # Smoothstep falloff from the nearest bone: 1 at the nearest, 0 beyond the blend width
+    x = np.clip(1.0 - (dist - nearest) / width, 0.0, 1.0)
+    weights = x * x * (3.0 - 2.0 * x)
+
+    weights = limit_influences(weights, max_influences)
+    weights /= np.maximum(weights.sum(axis=1, keepdims=True), 1e-12)
+    return bone_names, weights.astype(np.float32)
+
+
+def quantized_groups(weights, levels=255):
+    """
+    Groups the non-zero weights of every bone by value after rounding to
+    `levels` steps, so they can be written with one VertexGroup.add() call
+    per distinct value. Yields (bone index, weight, vertex indices).
+    """
+    q = np.rint(np.asarray(weights) * levels).astype(np.int32)
+    for b in range(q.shape[1]):
+        column = q[:, b]
+        nonzero = np.flatnonzero(column)
+        if len(nonzero) == 0:
+            continue
+        values = column[nonzero]
+        order = np.argsort(values, kind='stable')
+        values, nonzero = values[order], nonzero[order]
+        splits = np.flatnonzero(np.diff(values)) + 1
+        for value, verts in zip(values[np.r_[0, splits]], np.split(nonzero, splits)):
+            yield b, float(value) / levels, verts